@@ -1,8 +1,17 @@
-import openpyxl
+import os
+import sys
+
+try:
+    import workbook_guard
+except ImportError:
+    # Run from the archive directory: the guard lives at the repository root
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    import workbook_guard
 
 path = '経歴書_Updated_20251124.xlsx'
 try:
-    wb = openpyxl.load_workbook(path)
+    # Rejects huge or malformed workbooks before openpyxl parses them
+    wb = workbook_guard.load_workbook(path)
     print(f"Sheets in {path}: {wb.sheetnames}")
 except Exception as e:
     print(f"Error: {e}")
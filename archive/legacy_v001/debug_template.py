@@ -1,7 +1,19 @@
-import openpyxl
+import os
+import sys
+
+try:
+    import workbook_guard
+except ImportError:
+    # Run from the archive directory: the guard lives at the repository root
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    import workbook_guard
 
 path = '経歴書_Updated_20251124.xlsx'
-wb = openpyxl.load_workbook(path)
+try:
+    # Rejects huge or malformed workbooks before openpyxl parses them
+    wb = workbook_guard.load_workbook(path)
+except workbook_guard.ResourceLimitError as e:
+    sys.exit(f"Error: {path} rejected: {e}")
 ws = wb['_Template']
 
 print("Merges in _Template (Rows 1-5):")
@@ -8,6 +8,13 @@ import copy
 import config
 import sys
 
+try:
+    import workbook_guard
+except ImportError:
+    # Run from the archive directory: the guard lives at the repository root
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    import workbook_guard
+
 # Configuration for this script
 MASTER_JSON_PATH = config.OUTPUT_FILE
 UPDATE_JSON_PATH = os.path.join('005_ToolOutput', '02_ResumeUpdate', 'Data', 'resume_update.json')
@@ -307,10 +314,13 @@ def main():
 
     # 3. Excel Manipulation
     try:
-        wb = openpyxl.load_workbook(TEMPLATE_EXCEL_PATH)
+        wb = workbook_guard.load_workbook(TEMPLATE_EXCEL_PATH)
     except FileNotFoundError:
         print(f"Error loading Excel: {TEMPLATE_EXCEL_PATH}")
         return
+    except workbook_guard.ResourceLimitError as e:
+        print(f"Excel rejected: {TEMPLATE_EXCEL_PATH}: {e}")
+        return
         
     if TARGET_SHEET_NAME not in wb.sheetnames or TEMPLATE_SHEET_NAME not in wb.sheetnames:
         print(f"Sheet {TARGET_SHEET_NAME} or {TEMPLATE_SHEET_NAME} not found.")
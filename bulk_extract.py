@@ -0,0 +1,152 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import extract_master_json
+import master_store
+import skill_index
+
+# Bulk onboarding: many CSV/xlsx skill sheets -> one master JSON each, parsed in a process pool
+INPUT_SUFFIXES = ('.csv',) + extract_master_json.XLSX_SUFFIXES
+BULK_OUTPUT_DIR = os.path.join('005_ToolOutput', '01_ResumeUpdater', 'Masters')
+REPORT_NAME = 'extract_report.json'
+
+def collect_inputs(patterns):
+    """Expands directories (non-recursive) and glob patterns to a sorted list of input files."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern)
+        for path in candidates:
+            name = os.path.basename(path)
+            # Skip Office lock files (~$foo.xlsx) and anything that is not a skill sheet
+            if os.path.isfile(path) and name.lower().endswith(INPUT_SUFFIXES) and not name.startswith('~$'):
+                found.add(os.path.normpath(path))
+    return sorted(found)
+
+def plan_outputs(inputs, output_dir):
+    """One master path per input: <stem>.json, disambiguated when two inputs share a stem."""
+    outputs = {}
+    used = set()
+    for path in inputs:
+        stem, ext = os.path.splitext(os.path.basename(path))
+        name = stem
+        if name in used:
+            name = f"{stem}_{ext.lstrip('.').lower()}"
+        suffix = 2
+        while name in used:
+            name = f"{stem}_{suffix}"
+            suffix += 1
+        used.add(name)
+        outputs[path] = os.path.join(output_dir, f"{name}.json")
+    return outputs
+
+def extract_one(input_path, output_path):
+    """Worker: parses one sheet and replaces its master. Never raises; returns a result dict.
+
+    A sheet that parses to no work_history entries (wrong layout, undecodable text) is
+    'skipped': its master is not written, so an existing one is kept.
+    """
+    started = time.perf_counter()
+    result = {"input": input_path, "output": output_path, "status": "ok", "encoding": None, "entries": 0, "error": None}
+    try:
+        rows, encoding = extract_master_json.read_rows(input_path)
+        result["encoding"] = encoding
+        master_data = extract_master_json.parse_rows(rows, input_path)
+        if not master_data["work_history"]:
+            result["status"] = "skipped"
+            result["error"] = "no work_history entries found"
+        else:
+            # Unique per batch even when two inputs share a stem (a.csv / a.xlsx)
+            master_data["meta"]["candidate_id"] = os.path.splitext(os.path.basename(output_path))[0]
+            master_store.MasterStore(output_path).replace(master_data)
+            result["entries"] = len(master_data["work_history"])
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+def run(inputs, output_dir, workers=None, index_path=skill_index.SKILL_INDEX_PATH):
+    """Extracts every input, then re-indexes all produced masters in one pass. Returns the report."""
+    outputs = plan_outputs(inputs, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    results = []
+
+    def record(result):
+        results.append(result)
+        detail = result["error"] or f"{result['entries']} entries, {result['encoding']}"
+        print(f"[{len(results)}/{len(inputs)}] {result['status']}: {result['input']} ({detail})")
+
+    if workers == 1 or len(inputs) <= 1:
+        for path in inputs:
+            record(extract_one(path, outputs[path]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(extract_one, path, outputs[path]) for path in inputs]
+            for future in as_completed(futures):
+                record(future.result())
+    extract_seconds = time.perf_counter() - started
+
+    # The shared skill index is written once by the parent, not by every worker
+    extracted = [r for r in results if r["status"] == "ok"]
+    masters = [(master_store.load_master(r["output"]), r["output"]) for r in extracted]
+    candidates = skill_index.update_index_many(masters, index_path) if masters else []
+
+    results.sort(key=lambda r: r["input"])
+    report = {
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "output_dir": output_dir,
+        "index": index_path,
+        "files": len(inputs),
+        "succeeded": len(extracted),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "entries": sum(r["entries"] for r in results),
+        "seconds": round(extract_seconds, 3),
+        "files_per_second": round(len(inputs) / extract_seconds, 2) if extract_seconds else None,
+        "encodings": dict(Counter(r["encoding"] or "unknown" for r in results)),
+        "candidates": candidates,
+        "results": results
+    }
+    master_store.atomic_write_json(os.path.join(output_dir, REPORT_NAME), report)
+    return report
+
+def print_summary(report):
+    print(f"\nExtracted {report['succeeded']}/{report['files']} files ({report['skipped']} skipped), {report['entries']} entries "
+          f"in {report['seconds']:.2f}s ({report['files_per_second']} files/s)")
+    print("Encodings: " + ", ".join(f"{enc}={count}" for enc, count in sorted(report['encodings'].items())))
+    for result in report['results']:
+        if result['status'] != 'ok':
+            print(f"  - {result['status']}: {result['input']} {result['error'] or ''}".rstrip())
+    print(f"Report: {os.path.join(report['output_dir'], REPORT_NAME)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract many CSV/xlsx skill sheets into master JSON files.")
+    parser.add_argument('inputs', nargs='+', help="Directories and/or glob patterns.")
+    parser.add_argument('--output-dir', default=BULK_OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count, 1 = inline).")
+    parser.add_argument('--index', default=skill_index.SKILL_INDEX_PATH)
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("Error: No CSV/xlsx inputs found.")
+        return 1
+    report = run(inputs, args.output_dir, args.workers, args.index)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_summary(report)
+    return 0 if report['failed'] == 0 and report['skipped'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
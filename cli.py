@@ -0,0 +1,230 @@
+import argparse
+import os
+import sys
+
+# Unified entry point. Subcommand modules are imported inside each handler so that
+# JSON-only paths (plan) never pay for openpyxl.
+PLAN_BUDGET_MS = 100
+
+def cmd_extract(args):
+    import extract_master_json
+    data = extract_master_json.extract_resume_data(args.input, args.output)
+    return 0 if data is not None else 1
+
+def cmd_extract_bulk(args):
+    import bulk_extract
+    return bulk_extract.main(args.inputs + ['--output-dir', args.output_dir, '--index', args.index]
+                             + (['--workers', str(args.workers)] if args.workers else []))
+
+def cmd_plan(args):
+    import planner
+    planner.main(args.master, args.draft, args.output_dir, sort_history=args.sort_history)
+    return 0
+
+def cmd_render(args):
+    import update_resume
+    output = update_resume.main(args.master, args.update, args.template, args.output, direct=args.direct, wrap=args.wrap,
+                                sort_history=args.sort_history)
+    return 0 if output else 1
+
+def cmd_batch(args):
+    import copy
+    import update_resume
+    import time
+    import master_store
+    import render_cost
+    import skill_index
+    import stamp_cache
+    import workbook_guard
+
+    update_data = update_resume.load_json(args.update) if args.update else None
+    try:
+        package, wb = update_resume.open_template(args.template)
+    except FileNotFoundError:
+        print(f"Error: Excel template not found: {args.template}")
+        return 1
+    except workbook_guard.ResourceLimitError as e:
+        print(f"Error: {args.template} rejected: {e}")
+        return 1
+    if not update_resume.check_sheets(wb):
+        return 1
+    # One template load and one stamp for the whole batch
+    stamp = stamp_cache.load_stamp(package, wb)
+    emitter = None
+    if args.direct:
+        import sheet_emitter
+        emitter = sheet_emitter.SheetEmitter(package, wb, stamp)
+    if args.wrap:
+        import text_layout
+    os.makedirs(args.output_dir, exist_ok=True)
+    try:
+        output_ids = skill_index.batch_output_ids(args.masters)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    failures = 0
+    for master_path in args.masters:
+        print(f"\n=== {master_path} ===")
+        try:
+            store = master_store.MasterStore(master_path)
+            if update_data is not None:
+                master_data = store.append_update(copy.deepcopy(update_data))
+                skill_index.update_index_file(master_data, master_path)
+            else:
+                master_data = store.load()
+            if args.wrap:
+                master_data, report = text_layout.wrap_master(master_data, stamp)
+                text_layout.print_report(report)
+            output_id = output_ids.get(master_path) or skill_index.candidate_id_for(master_data, master_path)
+            output_filename = update_resume.output_filename_for(output_id, args.output_dir)
+            started = time.perf_counter()
+            path = 'direct'
+            if emitter is None or not sheet_emitter.emit_workbook(emitter, master_data, output_filename):
+                started = time.perf_counter()
+                path = 'openpyxl'
+                update_resume.render_workbook(wb, master_data, stamp)
+                update_resume.save_workbook(wb, output_filename, package)
+            render_cost.record_render(path, master_data, stamp, time.perf_counter() - started, os.path.getsize(output_filename))
+            print(f"Success! Saved to {output_filename}")
+        except (OSError, ValueError, KeyError, master_store.ConflictError, master_store.LockTimeoutError) as e:
+            failures += 1
+            print(f"Error: {master_path}: {e}")
+    print(f"\nBatch: {len(args.masters) - failures}/{len(args.masters)} succeeded.")
+    return 0 if failures == 0 else 1
+
+def cmd_watch(args):
+    import watcher
+    argv = ['--master', args.master, '--draft', args.draft, '--template', args.template,
+            '--plan-dir', args.plan_dir, '--output-dir', args.output_dir]
+    argv += ['--direct'] * args.direct + ['--initial'] * args.initial
+    return watcher.main(argv)
+
+def cmd_regress(args):
+    import regression_harness
+    argv = ['--baseline', args.baseline, '--tolerance', str(args.tolerance)] + ['--record'] * args.record
+    return regression_harness.main(argv)
+
+def cmd_startup_check(args):
+    """Runs `plan` on a tiny master in a fresh interpreter and checks it against the time budget."""
+    import json
+    import statistics
+    import subprocess
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp:
+        entry = {
+            "no": "1",
+            "period": {"start": "2024/4", "end": "現在"},
+            "business_content": {k: ["", "", "", "", ""] for k in ('title_col_e', 'role_col_f', 'detail_col_g')},
+            "technology": {k: ["", "", "", "", ""] for k in ('environment_col_u', 'language_col_z', 'process_col_ae')}
+        }
+        master_path = os.path.join(tmp, 'resume_master.json')
+        draft_path = os.path.join(tmp, 'resume_update.json')
+        with open(master_path, 'w', encoding='utf-8') as f:
+            json.dump({"meta": {}, "work_history": [entry], "footer": {"other_col_b": []}}, f, ensure_ascii=False)
+        with open(draft_path, 'w', encoding='utf-8') as f:
+            json.dump({"update_payload": [{"action": "UPDATE", "target_no": 1, "data": entry}]}, f, ensure_ascii=False)
+
+        command = [sys.executable, '-X', 'importtime', os.path.abspath(__file__), 'plan',
+                   '--master', master_path, '--draft', draft_path, '--output-dir', os.path.join(tmp, 'out')]
+        timings = []
+        heavy = False
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = subprocess.run(command, capture_output=True, text=True)
+            timings.append((time.perf_counter() - started) * 1000)
+            if result.returncode != 0:
+                print(result.stdout + result.stderr)
+                print("Startup check: plan failed.")
+                return 1
+            heavy = heavy or 'openpyxl' in result.stderr
+
+    median = statistics.median(timings)
+    print(f"Startup check: plan median {median:.1f} ms, min {min(timings):.1f} ms over {args.runs} runs (budget {args.budget_ms} ms)")
+    if heavy:
+        print("Startup check: FAIL (plan imported openpyxl)")
+        return 1
+    if median > args.budget_ms:
+        print("Startup check: FAIL (over budget)")
+        return 1
+    print("Startup check: OK")
+    return 0
+
+def build_parser():
+    # Defaults mirror the per-script constants without importing those scripts
+    master_default = os.path.join('005_ToolOutput', '01_ResumeUpdater', 'Data', 'resume_master.json')
+    update_default = os.path.join('005_ToolOutput', '02_ResumeUpdate', 'Data', 'resume_update.json')
+    plan_dir_default = os.path.join('005_ToolOutput', '03_PlanResult')
+    template_default = '経歴書（gotou_ryujirou）202508.xlsx'
+
+    parser = argparse.ArgumentParser(prog='cli.py', description="Resume auto updater.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('extract', help="CSV skill sheet -> resume_master.json")
+    p.add_argument('--input', default=None, help="Defaults to config.INPUT_FILE.")
+    p.add_argument('--output', default=None, help="Defaults to config.OUTPUT_FILE.")
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser('extract-bulk', help="Many CSV/xlsx skill sheets -> one master each (process pool)")
+    p.add_argument('inputs', nargs='+', help="Directories and/or glob patterns.")
+    p.add_argument('--output-dir', default=os.path.join('005_ToolOutput', '01_ResumeUpdater', 'Masters'))
+    p.add_argument('--index', default=os.path.join('005_ToolOutput', '04_SkillIndex', 'skill_index.json'))
+    p.add_argument('--workers', type=int, default=None)
+    p.set_defaults(func=cmd_extract_bulk)
+
+    p = sub.add_parser('plan', help="Preview the merge of an update into the master (JSON only).")
+    p.add_argument('--master', default=master_default)
+    p.add_argument('--draft', default=update_default)
+    p.add_argument('--output-dir', default=plan_dir_default)
+    p.add_argument('--sort-history', action='store_true', help="Re-sort work history newest first after the merge.")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser('render', help="Merge the update into the master and render the workbook.")
+    p.add_argument('--master', default=master_default)
+    p.add_argument('--update', default=update_default)
+    p.add_argument('--template', default=template_default)
+    p.add_argument('--output', default=None)
+    p.add_argument('--direct', action='store_true', help="Stream the sheet XML directly (fast path).")
+    p.add_argument('--wrap', action='store_true', help="Split long detail/footer lines to their merged cell widths.")
+    p.add_argument('--sort-history', action='store_true', help="Re-sort work history newest first after the merge.")
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser('batch', help="Render many masters with one warm template.")
+    p.add_argument('masters', nargs='+')
+    p.add_argument('--update', default=None, help="Update JSON applied to every master (optional).")
+    p.add_argument('--template', default=template_default)
+    p.add_argument('--output-dir', default='.')
+    p.add_argument('--direct', action='store_true', help="Stream the sheet XML directly (fast path).")
+    p.add_argument('--wrap', action='store_true', help="Split long detail/footer lines to their merged cell widths.")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser('watch', help="Re-run plan/render whenever the master, draft or template changes.")
+    p.add_argument('--master', default=master_default)
+    p.add_argument('--draft', default=update_default)
+    p.add_argument('--template', default=template_default)
+    p.add_argument('--plan-dir', default=plan_dir_default)
+    p.add_argument('--output-dir', default='.')
+    p.add_argument('--direct', action='store_true')
+    p.add_argument('--initial', action='store_true', help="Run every stage once at startup.")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('regress', help="Round-trip synthetic fixtures and check stage times/memory against the baseline.")
+    p.add_argument('--baseline', default=os.path.join('005_ToolOutput', '98_Regression', 'baseline.json'))
+    p.add_argument('--tolerance', type=float, default=0.5)
+    p.add_argument('--record', action='store_true', help="Store this run as the new baseline.")
+    p.set_defaults(func=cmd_regress)
+
+    p = sub.add_parser('startup-check', help="Measure `plan` startup time against the budget.")
+    p.add_argument('--budget-ms', type=float, default=PLAN_BUDGET_MS)
+    p.add_argument('--runs', type=int, default=5)
+    p.set_defaults(func=cmd_startup_check)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
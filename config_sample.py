@@ -20,4 +20,12 @@ CAREER_START_DATE = "2013-04-01"
 # ==========================================
 # シート名など
 TARGET_SHEET_NAME = 'SkillSheet'
-TEMPLATE_SHEET_NAME = '_Template'
\ No newline at end of file
+TEMPLATE_SHEET_NAME = '_Template'
+
+# CSV読み込み設定
+ENCODINGS = ['utf-8-sig', 'cp932']
+START_INDEX = 20  # 職務経歴の開始行（0始まり、Excelの21行目）
+BLOCK_SIZE = 5    # 1案件あたりの行数
+
+# 入力ブックのリソース上限（workbook_guard.DEFAULT_LIMITS を上書き）
+# WORKBOOK_LIMITS = {"max_rows": 20000, "max_merges": 50000, "max_decompressed_bytes": 256 * 1024 * 1024, "stage_seconds": 30.0}
@@ -1,17 +1,48 @@
 import csv
-import json
 import os
 import datetime
-import config
+import master_store
 
-def read_csv_with_encoding(filename):
-    """utf-8-sig または cp932 でCSV読み込みを試行する"""
-    for enc in config.ENCODINGS:
+try:
+    import config
+except ImportError:
+    config = None
+
+# config.py が無い場合の既定値（config_sample.py と同じ）
+DEFAULT_SETTINGS = {
+    "INPUT_FILE": 'Resume_Template.xlsx',
+    "OUTPUT_DIR": 'output',
+    "OUTPUT_FILE": os.path.join('output', 'resume_master.json'),
+    "ENCODINGS": ['utf-8-sig', 'cp932'],
+    "START_INDEX": 20,
+    "BLOCK_SIZE": 5,
+    "TARGET_SHEET_NAME": 'SkillSheet'
+}
+XLSX_SUFFIXES = ('.xlsx', '.xlsm')
+
+def setting(name):
+    """config.py の値、無ければ既定値を返す"""
+    return getattr(config, name, DEFAULT_SETTINGS[name])
+
+def get_val(row, col_idx):
+    """値を安全に取得する"""
+    if col_idx < len(row):
+        val = row[col_idx]
+        return val if val is not None else ""
+    return ""
+
+def get_col_array(rows_subset, col_idx):
+    """5行にわたってカラムから配列を取得する"""
+    return [get_val(r, col_idx) for r in rows_subset]
+
+def read_csv_detect_encoding(filename):
+    """ENCODINGS を順に試してCSVを読み込み、(行リスト, 使用したエンコーディング) を返す"""
+    for enc in setting('ENCODINGS'):
         try:
             with open(filename, 'r', encoding=enc, newline='') as f:
                 reader = csv.reader(f)
                 data = list(reader)
-            return data
+            return data, enc
         except UnicodeDecodeError:
             continue
         except Exception as e:
@@ -19,19 +50,50 @@ def read_csv_with_encoding(filename):
             raise
     raise ValueError(f"サポートされているエンコーディングで {filename} をデコードできませんでした。")
 
-def extract_resume_data():
-    # 出力ディレクトリの作成
-    os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+def read_csv_with_encoding(filename):
+    """utf-8-sig または cp932 でCSV読み込みを試行する"""
+    return read_csv_detect_encoding(filename)[0]
 
-    # CSV読み込み
+def cell_text(value):
+    """xlsx のセル値をCSVと同じ文字列表現にする（日付は 'YYYY/M'）"""
+    if value is None:
+        return ""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return f"{value.year}/{value.month}"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def read_xlsx_rows(filename, sheet_name=None):
+    """sheet_name / TARGET_SHEET_NAME（無ければ先頭シート）をCSVと同じ行リストとして読み込む"""
+    import workbook_guard
+    # 行数・結合数・展開サイズを読み込み前に検査し、読み込み自体にも時間予算を設ける
+    wb = workbook_guard.load_workbook(filename, read_only=True, data_only=True)
+    budget = workbook_guard.StageBudget(f"reading {os.path.basename(filename)}")
     try:
-        rows = read_csv_with_encoding(config.INPUT_FILE)
-    except FileNotFoundError:
-        print(f"エラー: 入力ファイル '{config.INPUT_FILE}' が見つかりません。")
-        return
+        sheet_name = sheet_name or setting('TARGET_SHEET_NAME')
+        ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.worksheets[0]
+        rows = []
+        for row in ws.iter_rows(values_only=True):
+            rows.append([cell_text(v) for v in row])
+            if len(rows) % 1000 == 0:
+                budget.check()
+        return rows
+    finally:
+        wb.close()
+
+def read_rows(filename):
+    """入力ファイル（CSV または xlsx）を読み込み、(行リスト, エンコーディング) を返す"""
+    if filename.lower().endswith(XLSX_SUFFIXES):
+        return read_xlsx_rows(filename), 'xlsx'
+    return read_csv_detect_encoding(filename)
+
+def parse_rows(rows, source):
+    """行リストからマスタデータ（meta / work_history / footer）を組み立てる"""
+    block_size = setting('BLOCK_SIZE')
 
     # 2. 読み取りロジック
-    start_index = config.START_INDEX
+    start_index = setting('START_INDEX')
     
     # フッターの位置（"その他"）を先に検索する
     footer_marker_index = len(rows)
@@ -65,23 +127,12 @@ def extract_resume_data():
             
         # 5行分のブロックを取得できるか確認
         # ※最後のブロックがフッター行（"その他"）にかかる場合でも、5行固定ルールに従い取得する
-        if current_index + config.BLOCK_SIZE > len(rows):
+        if current_index + block_size > len(rows):
             break
             
-        block_rows = rows[current_index : current_index + config.BLOCK_SIZE]
+        block_rows = rows[current_index : current_index + block_size]
         
         # 3. カラムマッピング
-        # 値を安全に取得するヘルパー関数
-        def get_val(row, col_idx):
-            if col_idx < len(row):
-                val = row[col_idx]
-                return val if val is not None else ""
-            return ""
-
-        # 5行にわたってカラムから配列を取得するヘルパー関数
-        def get_col_array(rows_subset, col_idx):
-            return [get_val(r, col_idx) for r in rows_subset]
-
         entry = {
             "no": get_val(block_rows[0], 0),
             "period": {
@@ -103,7 +154,7 @@ def extract_resume_data():
         work_history.append(entry)
         
         # 次のブロックへ（5行進める）
-        current_index += config.BLOCK_SIZE
+        current_index += block_size
 
     # 4. フッター抽出
     footer_data = {"other_col_b": []}
@@ -113,32 +164,52 @@ def extract_resume_data():
     
     if footer_start_data_index < len(rows):
         # フッターデータとして5行取得（ファイル末尾までが5行未満の場合はあるだけ取得）
-        end_idx = min(footer_start_data_index + config.BLOCK_SIZE, len(rows))
+        end_idx = min(footer_start_data_index + block_size, len(rows))
         footer_rows = rows[footer_start_data_index : end_idx]
         
         # 5行に満たない場合、空文字で埋める必要がある場合はここで調整
         # 要件は「5行分を配列化」なので、足りない場合は空文字を追加する
         extracted_footer = [get_val(r, 1) for r in footer_rows]
-        while len(extracted_footer) < config.BLOCK_SIZE:
+        while len(extracted_footer) < block_size:
             extracted_footer.append("")
             
         footer_data["other_col_b"] = extracted_footer
 
     # 5. JSON構築
-    output_data = {
+    return {
         "meta": {
-            "source": config.INPUT_FILE,
+            "source": source,
             "extracted_at": datetime.date.today().isoformat()
         },
         "work_history": work_history,
         "footer": footer_data
     }
 
-    # JSON書き出し
-    with open(config.OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+def extract_resume_data(input_file=None, output_file=None):
+    input_file = input_file or setting('INPUT_FILE')
+    output_file = output_file or setting('OUTPUT_FILE')
+
+    # 出力ディレクトリの作成
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+
+    # CSV / xlsx 読み込み
+    try:
+        rows, _ = read_rows(input_file)
+    except FileNotFoundError:
+        print(f"エラー: 入力ファイル '{input_file}' が見つかりません。")
+        return
+    except ValueError as e:
+        # workbook_guard.ResourceLimitError: 巨大・異常なブックは読み込まずに拒否する
+        print(f"エラー: 入力ファイル '{input_file}' を拒否しました: {e}")
+        return
+
+    output_data = parse_rows(rows, input_file)
+
+    # JSON書き出し（操作ログ付きマスタストア経由で原子的に置換）
+    master_store.MasterStore(output_file).replace(output_data)
     
-    print(f"成功: {config.OUTPUT_FILE} を生成しました。")
+    print(f"成功: {output_file} を生成しました。")
+    return output_data
 
 if __name__ == "__main__":
     extract_resume_data()
@@ -0,0 +1,206 @@
+import argparse
+import glob
+import io
+import os
+import re
+import sys
+import time
+from xml.etree import ElementTree
+from xml.sax.saxutils import unescape
+import openpyxl
+from openpyxl.styles.stylesheet import write_stylesheet
+from openpyxl.xml.functions import tostring
+import master_store
+import render_service
+import sheet_emitter
+import skill_index
+import template_package
+import update_resume
+
+# Standard footer rollout: one footer_update applied to many masters in a single pass, and
+# each candidate's rendered workbook patched in place. Only the footer rows, the merges and
+# styles.xml are regenerated; history rows and every other part are copied as they are.
+SHARED_STRINGS_PART = 'xl/sharedStrings.xml'
+COLUMN_A_CELL = re.compile(rb'<c r="A(\d+)"([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+CELL_TYPE = re.compile(rb'\bt="(\w+)"')
+CELL_VALUE = re.compile(rb'<v>(.*?)</v>', re.S)
+INLINE_TEXT = re.compile(rb'<t\b[^>]*>(.*?)</t>', re.S)
+WORKBOOK_NAME = re.compile(r'^経歴書_Updated_(.+)_(\d{8})\.xlsx$')
+
+class FooterEmitter(sheet_emitter.SheetEmitter):
+    """SheetEmitter that rebuilds only the footer rows of a rendered sheet, from footer_row on."""
+
+    def __init__(self, package, wb, footer_row, stamp=None, footer_border=update_resume.FOOTER_BORDER):
+        super().__init__(package, wb, stamp, footer_border, first_row=footer_row)
+
+    def segments(self, master_data):
+        return [segment for segment in super().segments(master_data) if segment[1] == 'footer']
+
+def shared_strings(package):
+    if SHARED_STRINGS_PART not in package.names():
+        return []
+    root = ElementTree.fromstring(package.read(SHARED_STRINGS_PART))
+    ns = template_package.NS_MAIN
+    return [''.join(t.text or '' for t in si.iter(f'{ns}t')) for si in root.iter(f'{ns}si')]
+
+def column_a_text(attrs, body, strings):
+    cell_type = CELL_TYPE.search(attrs)
+    cell_type = cell_type.group(1) if cell_type else b'n'
+    if cell_type == b'inlineStr':
+        return unescape(b''.join(INLINE_TEXT.findall(body or b'')).decode('utf-8'))
+    value = CELL_VALUE.search(body or b'')
+    if value is None:
+        return ''
+    if cell_type == b's':
+        index = int(value.group(1))
+        return strings[index] if index < len(strings) else ''
+    return unescape(value.group(1).decode('utf-8'))
+
+def find_footer_row(package, xml):
+    """Row of the footer label in column A at or below START_ROW, or None."""
+    strings = None
+    for match in COLUMN_A_CELL.finditer(xml):
+        if int(match.group(1)) < update_resume.START_ROW:
+            continue
+        # Workbooks saved by Excel keep their text in sharedStrings; ours are inline
+        if strings is None and b't="s"' in match.group(2):
+            strings = shared_strings(package)
+        if column_a_text(match.group(2), match.group(3), strings or []).strip() == update_resume.FOOTER_LABEL:
+            return int(match.group(1))
+    return None
+
+def patch_footer(path, master_data, footer_border=update_resume.FOOTER_BORDER):
+    """Rewrites the footer rows of a rendered workbook in place from master_data.
+
+    Returns None on success, else why the workbook needs a full render instead (history
+    layout not matching master_data, styles that cannot be extended in place, ...).
+    """
+    package = template_package.TemplatePackage(path)
+    try:
+        part = package.sheet_paths.get(update_resume.TARGET_SHEET_NAME)
+        if part is None or update_resume.TEMPLATE_SHEET_NAME not in package.sheet_paths:
+            return "missing sheets"
+        xml = package.read(part)
+        footer_row = find_footer_row(package, xml)
+        expected_row = update_resume.START_ROW + len(master_data['work_history']) * update_resume.BLOCK_ROWS
+        if footer_row != expected_row:
+            return f"footer at row {footer_row}, master expects {expected_row}"
+        # Styles and the _Template stamp come from a copy without the rendered rows, so only
+        # the header is parsed; the stored style table is kept, new footer xfs are appended
+        stripped = io.BytesIO()
+        package.assemble(stripped, {part: sheet_emitter.truncated_sheet(xml)})
+        wb = openpyxl.load_workbook(stripped)
+        if not template_package.styles_compatible(package, wb):
+            return "style table not reusable"
+        emitter = FooterEmitter(package, wb, footer_row, footer_border=footer_border)
+        emitter.prepare(master_data)
+        out = io.BytesIO()
+        package.assemble(out, {
+            part: emitter.chunks(master_data),
+            template_package.STYLES_PART: tostring(write_stylesheet(wb)),
+        })
+    finally:
+        # The map must be gone before the file is replaced (Windows)
+        package.close()
+    master_store.atomic_write_bytes(path, out.getvalue())
+    return None
+
+def find_workbook(workbook_dir, candidate_id):
+    """Latest 経歴書_Updated_<candidate_id>_<date>.xlsx in workbook_dir, or None."""
+    found = []
+    for path in glob.glob(os.path.join(glob.escape(workbook_dir), '経歴書_Updated_*.xlsx')):
+        match = WORKBOOK_NAME.match(os.path.basename(path))
+        if match and match.group(1) == candidate_id:
+            found.append((match.group(2), path))
+    return max(found)[1] if found else None
+
+def footer_update_of(update_data):
+    """The footer_update of an update JSON (or a bare {"other_col_b": [...]})."""
+    footer_update = update_data.get('footer_update', update_data)
+    lines = footer_update.get('other_col_b')
+    if not isinstance(lines, list):
+        raise ValueError("footer payload has no other_col_b list")
+    return {"update_required": True, "other_col_b": lines}
+
+def run(master_paths, footer_update, workbook_dir=None, template_path=None, force=False):
+    """Applies footer_update to each master and patches its workbook. Returns the result list."""
+    cache = None
+    results = []
+    # Workbooks are named as the batch render named them (ids shared by several masters get the master stem)
+    output_ids = skill_index.batch_output_ids(master_paths) if workbook_dir is not None else {}
+    for master_path in master_paths:
+        started = time.perf_counter()
+        result = {"master": master_path, "master_status": None, "workbook": None, "workbook_status": None, "error": None}
+        results.append(result)
+        try:
+            store = master_store.MasterStore(master_path)
+            master_data = store.load()
+            if master_data['footer'].get('other_col_b') == footer_update['other_col_b']:
+                result["master_status"] = 'unchanged'
+                if not force:
+                    continue
+            else:
+                # An empty payload list: the merge only replaces the footer
+                master_data = store.append_update({"update_payload": [], "footer_update": footer_update}, verbose=False)
+                result["master_status"] = 'updated'
+            if workbook_dir is None:
+                continue
+            output_id = output_ids.get(master_path) or skill_index.candidate_id_for(master_data, master_path)
+            workbook = result["workbook"] = find_workbook(workbook_dir, output_id)
+            if workbook is None:
+                result["workbook_status"] = 'missing'
+                continue
+            reason = patch_footer(workbook, master_data)
+            if reason is None:
+                result["workbook_status"] = 'patched'
+            elif template_path:
+                cache = cache or render_service.TemplateCache()
+                master_store.atomic_write_bytes(workbook, render_service.render_bytes(cache, master_data, template_path=template_path))
+                result["workbook_status"] = f're-rendered ({reason})'
+            else:
+                result["workbook_status"] = f'stale ({reason})'
+        except (OSError, ValueError, KeyError, master_store.ConflictError, master_store.LockTimeoutError) as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            result["seconds"] = round(time.perf_counter() - started, 4)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply one footer to many masters and patch their rendered workbooks.")
+    parser.add_argument('masters', nargs='+')
+    parser.add_argument('--footer', required=True, help="Update JSON with footer_update, or {\"other_col_b\": [...]}.")
+    parser.add_argument('--workbooks', default=None, help="Directory of rendered 経歴書_Updated_*.xlsx to patch in place.")
+    parser.add_argument('--template', default=None, help="Re-render workbooks that cannot be patched with this template.")
+    parser.add_argument('--force', action='store_true', help="Patch workbooks even when the master footer is unchanged.")
+    args = parser.parse_args(argv)
+
+    try:
+        footer_update = footer_update_of(update_resume.load_json(args.footer))
+    except (OSError, ValueError) as e:
+        print(f"Error: {args.footer}: {e}")
+        return 1
+    started = time.perf_counter()
+    try:
+        results = run(args.masters, footer_update, args.workbooks, args.template, args.force)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        status = result["error"] or result["master_status"]
+        if result["workbook_status"]:
+            status += f", workbook {result['workbook_status']}"
+        print(f"{result['master']}: {status} ({result['seconds'] * 1000:.0f} ms)")
+    counts = {}
+    for result in results:
+        key = 'failed' if result["error"] else result["master_status"]
+        counts[key] = counts.get(key, 0) + 1
+    patched = sum(1 for r in results if r["workbook_status"] == 'patched')
+    print(f"\nFooter: {', '.join(f'{k}={v}' for k, v in sorted(counts.items()))}; "
+          f"{patched} workbooks patched in {elapsed:.2f}s")
+    failed = any(r["error"] or (r["workbook_status"] or '').startswith('stale') for r in results)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import argparse
+import bisect
+import hashlib
+import json
+import sys
+from collections import deque
+import master_store
+
+# Entry statuses, in report order
+STATUSES = ('inserted', 'deleted', 'updated', 'moved', 'unchanged')
+
+def entry_content(entry):
+    """Entry without 'no' (renumbering is not a change)."""
+    return {k: v for k, v in entry.items() if k != 'no'}
+
+def entry_hash(entry):
+    payload = json.dumps(entry_content(entry), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def flatten(value, prefix=''):
+    """{'period': {'start': x}, 'a': [y]} -> {'period.start': x, 'a[0]': y}."""
+    flat = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            flat.update(flatten(child, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        for i, child in enumerate(value):
+            flat.update(flatten(child, f"{prefix}[{i}]"))
+    else:
+        flat[prefix] = value
+    return flat
+
+def field_changes(old, new):
+    old_flat = flatten(old)
+    new_flat = flatten(new)
+    changes = []
+    for field, old_value in old_flat.items():
+        new_value = new_flat.get(field)
+        if field not in new_flat or new_value != old_value:
+            changes.append({"field": field, "old": old_value, "new": new_value})
+    for field, new_value in new_flat.items():
+        if field not in old_flat:
+            changes.append({"field": field, "old": None, "new": new_value})
+    return changes
+
+def _first_line(lines):
+    for line in lines or []:
+        if isinstance(line, str) and line.strip():
+            return line.strip()
+    return ''
+
+def identity_keys(entry):
+    """Keys used to pair an edited entry with its previous version, strongest first."""
+    start = (entry.get('period') or {}).get('start', '')
+    title = _first_line((entry.get('business_content') or {}).get('title_col_e'))
+    return (('start+title', start, title), ('start', start), ('title', title))
+
+def _pair_by(old_left, new_left, old_entries, new_entries, level, pairs):
+    buckets = {}
+    for i in old_left:
+        key = identity_keys(old_entries[i])[level]
+        if key[-1]:
+            buckets.setdefault(key, deque()).append(i)
+    for j in list(new_left):
+        key = identity_keys(new_entries[j])[level]
+        candidates = buckets.get(key)
+        if candidates:
+            i = candidates.popleft()
+            pairs[i] = j
+            del old_left[i]
+            del new_left[j]
+
+def longest_increasing(values):
+    """Set of the values in one longest strictly increasing subsequence (O(n log n))."""
+    tail_values = []  # tail_values[k]: smallest last value of an increasing run of length k+1
+    tails = []        # index of that value in values
+    previous = [None] * len(values)
+    for index, value in enumerate(values):
+        k = bisect.bisect_left(tail_values, value)
+        if k:
+            previous[index] = tails[k - 1]
+        if k == len(tails):
+            tail_values.append(value)
+            tails.append(index)
+        else:
+            tail_values[k] = value
+            tails[k] = index
+    kept = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        kept.add(values[index])
+        index = previous[index]
+    return kept
+
+def diff_masters(old_master, new_master):
+    """Compares two masters entry-by-entry. Pairing is linear (hash buckets), moves O(n log n)."""
+    old_entries = old_master.get('work_history', [])
+    new_entries = new_master.get('work_history', [])
+    old_hashes = [entry_hash(e) for e in old_entries]
+    new_hashes = [entry_hash(e) for e in new_entries]
+
+    # 1. Exact content matches (first come, first served for duplicates)
+    by_hash = {}
+    for i, h in enumerate(old_hashes):
+        by_hash.setdefault(h, deque()).append(i)
+    pairs = {}
+    new_left = []
+    for j, h in enumerate(new_hashes):
+        bucket = by_hash.get(h)
+        if bucket:
+            pairs[bucket.popleft()] = j
+        else:
+            new_left.append(j)
+    exact = set(pairs)
+
+    # 2. Edited entries: pair leftovers on identity keys
+    new_left_set = dict.fromkeys(new_left)
+    old_left_set = dict.fromkeys(i for i in range(len(old_entries)) if i not in pairs)
+    for level in range(3):
+        if not old_left_set or not new_left_set:
+            break
+        _pair_by(old_left_set, new_left_set, old_entries, new_entries, level, pairs)
+
+    # 3. Moves: the paired entries outside a longest run kept in the same relative order
+    inverse = {j: i for i, j in pairs.items()}
+    order = [inverse[j] for j in range(len(new_entries)) if j in inverse]
+    kept = longest_increasing(order)
+
+    results = []
+    for j, entry in enumerate(new_entries):
+        i = inverse.get(j)
+        if i is None:
+            results.append({"status": "inserted", "old_no": None, "new_no": entry.get('no'), "moved": False, "changes": []})
+            continue
+        moved = i not in kept
+        if i in exact:
+            status = 'moved' if moved else 'unchanged'
+            changes = []
+        else:
+            status = 'updated'
+            changes = field_changes(entry_content(old_entries[i]), entry_content(entry))
+        results.append({"status": status, "old_no": old_entries[i].get('no'), "new_no": entry.get('no'), "moved": moved, "changes": changes})
+    for i in old_left_set:
+        results.append({"status": "deleted", "old_no": old_entries[i].get('no'), "new_no": None, "moved": False, "changes": []})
+
+    summary = {status: 0 for status in STATUSES}
+    for result in results:
+        summary[result["status"]] += 1
+    return {
+        "summary": summary,
+        "entries": results,
+        "footer": field_changes(old_master.get('footer', {}), new_master.get('footer', {}))
+    }
+
+def print_diff(diff, verbose=True, indent="  "):
+    summary = diff["summary"]
+    print(indent + ", ".join(f"{status}: {summary[status]}" for status in STATUSES))
+    if not verbose:
+        return
+    for result in diff["entries"]:
+        if result["status"] == 'unchanged':
+            continue
+        print(f"{indent}[{result['status']}] No.{result['old_no']} -> No.{result['new_no']}")
+        for change in result["changes"]:
+            print(f"{indent}    {change['field']}: {change['old']!r} -> {change['new']!r}")
+    if diff["footer"]:
+        print(f"{indent}[footer] {len(diff['footer'])} lines changed")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Structural diff of two resume master JSON files.")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--json', dest='json_path', help="Write the diff as JSON to this path.")
+    parser.add_argument('--summary', action='store_true', help="Print counts only.")
+    args = parser.parse_args(argv)
+
+    # Through the store: the file itself is only the last compacted snapshot
+    old_master = master_store.load_master(args.old)
+    new_master = master_store.load_master(args.new)
+    diff = diff_masters(old_master, new_master)
+    print_diff(diff, verbose=not args.summary)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(diff, f, indent=2, ensure_ascii=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+import contextlib
+import copy
+import datetime
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+import validator
+import periods
+import payload_compaction
+
+# Store layout for a master at PATH:
+#   PATH                         compacted snapshot (meta.revision = last compacted rev,
+#                                meta.oplog_offset = log size at that point, where replay starts)
+#   PATH.oplog.jsonl             append-only log of applied updates, one record per line
+#   PATH.snapshots/rev-N.json    historic compacted snapshots
+SNAPSHOT_INTERVAL = 20
+OPLOG_SUFFIX = '.oplog.jsonl'
+SNAPSHOT_DIR_SUFFIX = '.snapshots'
+SNAPSHOT_PATTERN = re.compile(r'rev-(\d+)\.json$')
+LOCK_SUFFIX = '.lock'
+LOCK_TIMEOUT = 60.0
+LOCK_POLL_INTERVAL = 0.05
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class ConflictError(Exception):
+    """Raised when the master changed since the revision the caller read."""
+
+class LockTimeoutError(Exception):
+    """Raised when another process holds the master lock for too long."""
+
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+@contextlib.contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT):
+    """Exclusive advisory lock on path (created if missing), polled until timeout."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise LockTimeoutError(f"Timed out after {timeout}s waiting for {path}")
+            time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+def _quiet(*args, **kwargs):
+    pass
+
+def merge_data(master_data, update_data, sort_history=False, verbose=True, compact=True):
+    """Merges update_data into master_data. Optionally re-sorts history by period (newest first).
+
+    With compact, the payload is first reduced to the minimal equivalent op list
+    (payload_compaction); the merge result is the same as applying every op.
+    """
+    log = print if verbose else _quiet
+    log("Merging data...")
+    # Items are fixed and inserted into the master below; the caller's update is left untouched
+    payloads = copy.deepcopy(update_data.get('update_payload', []))
+
+    # Validate once (pads/truncates columns, rejects malformed items)
+    issues = validator.validate_payload(payloads, fix=True)
+    if verbose:
+        validator.print_report(issues)
+    rejected = validator.rejected_items(issues)
+    for idx in sorted(rejected):
+        log(f"Warning: Skipping invalid payload item {idx}.")
+    if compact and payloads:
+        payloads, report = payload_compaction.compact_payload(master_data, payloads, rejected)
+        log(payload_compaction.format_report(report))
+    else:
+        payloads = [payload for idx, payload in enumerate(payloads) if idx not in rejected]
+
+    # Process payloads
+    for payload in payloads:
+        action = payload.get('action')
+        target_no = payload.get('target_no')
+        new_data = payload.get('data')
+
+        if action == 'INSERT' and target_no == 0:
+            master_data['work_history'].insert(0, new_data)
+        elif action == 'UPDATE':
+            found = False
+            for i, entry in enumerate(master_data['work_history']):
+                if entry.get('no') == str(target_no):
+                    master_data['work_history'][i] = new_data
+                    found = True
+                    break
+            if not found:
+                log(f"Warning: Entry with no {target_no} not found for UPDATE.")
+
+    if sort_history:
+        master_data['work_history'] = periods.sort_work_history(master_data['work_history'])
+
+    # Renumber
+    for i, entry in enumerate(master_data['work_history']):
+        entry['no'] = str(i + 1)
+
+    # Update Footer
+    footer_update = update_data.get('footer_update')
+    if footer_update and footer_update.get('update_required'):
+        master_data['footer']['other_col_b'] = list(footer_update.get('other_col_b', []))
+
+    return master_data
+
+def atomic_write_json(path, data, indent=2):
+    """Writes JSON via a unique temp file in the same directory, fsync, then os.replace."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def atomic_write_bytes(path, data):
+    """Replaces path in one step (same temp-file scheme as atomic_write_json), so a workbook
+    open in Excel never sees a half-written file."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def revision_of(master_data):
+    return int(master_data.get('meta', {}).get('revision', 0))
+
+def oplog_offset_of(master_data):
+    return int(master_data.get('meta', {}).get('oplog_offset', 0))
+
+class MasterStore:
+    """Append-only operation log plus periodic compacted snapshots for one master JSON."""
+
+    def __init__(self, path, snapshot_interval=SNAPSHOT_INTERVAL, lock_timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.oplog_path = path + OPLOG_SUFFIX
+        self.snapshot_dir = path + SNAPSHOT_DIR_SUFFIX
+        self.lock_path = path + LOCK_SUFFIX
+        self.snapshot_interval = snapshot_interval
+        self.lock_timeout = lock_timeout
+
+    def lock(self):
+        """Per-candidate advisory lock held by every writer of this master."""
+        return file_lock(self.lock_path, self.lock_timeout)
+
+    # --- reading ---
+
+    def _load_json(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def records(self, after=0, upto=None, offset=0):
+        """Yields oplog records with after < rev <= upto. Torn trailing lines are ignored.
+
+        offset is a snapshot's meta.oplog_offset: every record before it is at or below the
+        snapshot revision, so reading starts there (or at 0 if it is not a line boundary).
+        """
+        if not os.path.exists(self.oplog_path):
+            return
+        with open(self.oplog_path, 'rb') as f:
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b'\n':
+                    f.seek(0)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                record = json.loads(line)
+                if record['rev'] <= after:
+                    continue
+                if upto is not None and record['rev'] > upto:
+                    break
+                yield record
+
+    def _replay(self, master_data, records):
+        for record in records:
+            if record['op'] == 'merge':
+                master_data = merge_data(master_data, record['update'], sort_history=record.get('sort_history', False), verbose=False)
+            elif record['op'] == 'replace':
+                master_data = self._load_json(self.snapshot_path(record['rev']))
+            master_data.setdefault('meta', {})['revision'] = record['rev']
+        return master_data
+
+    def _load_with_base(self):
+        master_data = self._load_json(self.path)
+        base_rev = revision_of(master_data)
+        if not os.path.exists(self.snapshot_path(base_rev)):
+            atomic_write_json(self.snapshot_path(base_rev), master_data)
+        return self._replay(master_data, self.records(after=base_rev, offset=oplog_offset_of(master_data))), base_rev
+
+    def load(self):
+        """Current master: compacted snapshot + replay of the log tail."""
+        master_data = self._load_json(self.path)
+        return self._replay(master_data, self.records(after=revision_of(master_data), offset=oplog_offset_of(master_data)))
+
+    def revision(self):
+        """Latest revision (last log record, or the snapshot if the log is empty)."""
+        master_data = self._load_json(self.path)
+        rev = revision_of(master_data)
+        for record in self.records(after=rev, offset=oplog_offset_of(master_data)):
+            rev = record['rev']
+        return rev
+
+    def snapshot_path(self, rev):
+        return os.path.join(self.snapshot_dir, f"rev-{rev:06d}.json")
+
+    def snapshot_revisions(self):
+        revs = []
+        for path in glob.glob(os.path.join(self.snapshot_dir, 'rev-*.json')):
+            match = SNAPSHOT_PATTERN.search(path)
+            if match:
+                revs.append(int(match.group(1)))
+        return sorted(revs)
+
+    def load_version(self, rev):
+        """Reconstructs revision rev from the nearest snapshot at or before it."""
+        base = [r for r in self.snapshot_revisions() if r <= rev]
+        if base:
+            master_data = self._load_json(self.snapshot_path(base[-1]))
+            after = base[-1]
+        else:
+            master_data = self._load_json(self.path)
+            after = revision_of(master_data)
+            if after > rev:
+                raise ValueError(f"Revision {rev} is older than the oldest snapshot.")
+        return self._replay(master_data, self.records(after=after, upto=rev, offset=oplog_offset_of(master_data)))
+
+    # --- writing ---
+
+    def _append(self, record):
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        os.makedirs(os.path.dirname(self.oplog_path) or '.', exist_ok=True)
+        fd = os.open(self.oplog_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while line:
+                line = line[os.write(fd, line):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _record(self, rev, op, **fields):
+        record = {"rev": rev, "op": op, "at": datetime.datetime.now().isoformat(timespec='seconds')}
+        record.update(fields)
+        return record
+
+    def append_update(self, update_data, sort_history=False, verbose=True, expected_revision=None):
+        """Applies update_data under the lock, appends one log record and returns the merged master.
+
+        If expected_revision is given and the master has moved on since, raises ConflictError
+        (the caller re-reads and retries) instead of silently merging over the other writer.
+        """
+        with self.lock():
+            master_data, base_rev = self._load_with_base()
+            current = revision_of(master_data)
+            if expected_revision is not None and current != expected_revision:
+                raise ConflictError(f"{self.path} is at revision {current}, expected {expected_revision}")
+            rev = current + 1
+            master_data = merge_data(master_data, update_data, sort_history=sort_history, verbose=verbose)
+            master_data.setdefault('meta', {})['revision'] = rev
+            self._append(self._record(rev, 'merge', update=update_data, sort_history=sort_history))
+            if rev - base_rev >= self.snapshot_interval:
+                self._compact(master_data)
+        return master_data
+
+    def replace(self, master_data, expected_revision=None):
+        """Replaces the whole master (e.g. fresh extraction) as a new revision."""
+        with self.lock():
+            current = self.revision() if os.path.exists(self.path) else None
+            if expected_revision is not None and current != expected_revision:
+                raise ConflictError(f"{self.path} is at revision {current}, expected {expected_revision}")
+            rev = 0 if current is None else current + 1
+            meta = master_data.setdefault('meta', {})
+            meta['revision'] = rev
+            # The replace record goes after every record of an earlier revision
+            meta['oplog_offset'] = self._oplog_size()
+            atomic_write_json(self.snapshot_path(rev), master_data)
+            if rev > 0:
+                self._append(self._record(rev, 'replace'))
+            atomic_write_json(self.path, master_data)
+        return master_data
+
+    def _oplog_size(self):
+        try:
+            return os.path.getsize(self.oplog_path)
+        except FileNotFoundError:
+            return 0
+
+    def _compact(self, master_data):
+        master_data.setdefault('meta', {})['oplog_offset'] = self._oplog_size()
+        atomic_write_json(self.snapshot_path(revision_of(master_data)), master_data)
+        atomic_write_json(self.path, master_data)
+        return master_data
+
+    def compact(self):
+        """Writes the current state as a snapshot and as the compacted master file."""
+        with self.lock():
+            return self._compact(self.load())
+
+def load_master(path):
+    return MasterStore(path).load()
@@ -0,0 +1,142 @@
+import argparse
+import copy
+import hashlib
+import json
+import sys
+import validator
+
+# Update payload compaction. merge_data applies every op literally; machine-generated payloads
+# repeat UPDATEs of one target_no, UPDATE entries they INSERTed earlier, or resend unchanged
+# entries. compact_payload replays the ops on entry positions only (no data is copied) and
+# emits the minimal op list that merges to the same master:
+#   - every entry is written once, with the data of the last op that reached it
+#   - UPDATEs of an INSERTed entry are folded into that INSERT
+#   - UPDATEs that match no entry, and INSERTs merge_data ignores (target_no != 0), are dropped
+#   - UPDATEs whose data equals the current entry (content hash, 'no' excluded) are dropped
+ELIMINATED = ('invalid', 'unmatched', 'superseded', 'folded', 'noop')
+
+def content_hash(entry):
+    """Hash of an entry's content without 'no' (merge_data renumbers every entry anyway)."""
+    content = {key: value for key, value in entry.items() if key != 'no'} if isinstance(entry, dict) else entry
+    return hashlib.sha1(json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _target(no):
+    """target_no that merge_data resolves back to the entry numbered `no`."""
+    return int(no) if str(int(no)) == no else no
+
+def new_report(count):
+    report = {"input": count, "output": count, "skipped": None}
+    report.update({reason: 0 for reason in ELIMINATED})
+    return report
+
+def compact_payload(master_data, payloads, rejected=()):
+    """Minimal op list equivalent to applying payloads to master_data. Returns (ops, report).
+
+    payloads must already be validated (and fixed) as merge_data does; the indices in rejected
+    are dropped. If the master has duplicate entry numbers, UPDATE targets are ambiguous: the
+    valid items are returned unchanged.
+    """
+    report = new_report(len(payloads))
+    report["invalid"] = len(rejected)
+    valid = [item for index, item in enumerate(payloads) if index not in rejected]
+
+    history = master_data.get('work_history', [])
+    numbers = [entry.get('no') for entry in history if isinstance(entry, dict) and isinstance(entry.get('no'), str)]
+    if len(set(numbers)) != len(numbers):
+        report["skipped"] = "duplicate entry numbers in master"
+        report["output"] = len(valid)
+        return valid, report
+
+    # Slots mirror work_history: [position, no, final data or None, index of the creating INSERT].
+    # INSERTs go in front, so they get decreasing negative positions; merge_data's UPDATE hits
+    # the first entry with that no, i.e. the matching slot with the lowest position.
+    slots_by_no = {}
+    for position, entry in enumerate(history):
+        no = entry.get('no') if isinstance(entry, dict) else None
+        slots_by_no.setdefault(no, []).append([position, no, None, None])
+    inserts = []
+    for item in valid:
+        action, target_no, data = item['action'], item['target_no'], item['data']
+        new_no = data.get('no') if isinstance(data, dict) else None
+        if action == 'INSERT':
+            if target_no != 0:
+                report["unmatched"] += 1
+                continue
+            slot = [-len(inserts) - 1, new_no, data, len(inserts)]
+            inserts.append(slot)
+            slots_by_no.setdefault(new_no, []).append(slot)
+            continue
+        candidates = slots_by_no.get(str(target_no))
+        if not candidates:
+            report["unmatched"] += 1
+            continue
+        slot = min(candidates, key=lambda s: s[0])
+        if slot[3] is not None:
+            report["folded"] += 1
+        elif slot[2] is not None:
+            report["superseded"] += 1
+        candidates.remove(slot)
+        slot[1], slot[2] = new_no, data
+        slots_by_no.setdefault(new_no, []).append(slot)
+
+    # UPDATEs first, from the bottom up: an UPDATE only changes the no of entries below the
+    # next target, so every emitted target_no still resolves to its original entry
+    updates = sorted((slot for slots in slots_by_no.values() for slot in slots if slot[3] is None and slot[2] is not None),
+                     key=lambda s: s[0], reverse=True)
+    ops = []
+    for position, _, data, _ in updates:
+        entry = history[position]
+        if content_hash(entry) == content_hash(data):
+            report["noop"] += 1
+            continue
+        ops.append({"action": "UPDATE", "target_no": _target(entry['no']), "data": data})
+    ops += [{"action": "INSERT", "target_no": 0, "data": data} for _, _, data, _ in inserts]
+    report["output"] = len(ops)
+    return ops, report
+
+def compact_update(master_data, update_data, verbose=True):
+    """Copy of update_data with its payload validated and compacted (footer_update kept).
+    Returns (update_data, report)."""
+    payloads = copy.deepcopy(update_data.get('update_payload', []))
+    issues = validator.validate_payload(payloads, fix=True)
+    if verbose:
+        validator.print_report(issues)
+    ops, report = compact_payload(master_data, payloads, validator.rejected_items(issues))
+    return dict(update_data, update_payload=ops), report
+
+def format_report(report):
+    eliminated = report["input"] - report["output"]
+    details = ', '.join(f"{reason} {report[reason]}" for reason in ELIMINATED if report[reason])
+    line = f"Compaction: {report['input']} ops -> {report['output']} ({eliminated} eliminated{': ' + details if details else ''})"
+    if report["skipped"]:
+        line += f"; not compacted: {report['skipped']}"
+    return line
+
+def main(argv=None):
+    import master_store
+    parser = argparse.ArgumentParser(description="Compact an update payload against a master (same merge result, fewer ops).")
+    parser.add_argument('master')
+    parser.add_argument('update')
+    parser.add_argument('--output', default=None, help="Write the compacted update JSON here.")
+    parser.add_argument('--verify', action='store_true', help="Merge both payloads and compare the results.")
+    args = parser.parse_args(argv)
+
+    master_data = master_store.load_master(args.master)
+    with open(args.update, 'r', encoding='utf-8') as f:
+        update_data = json.load(f)
+    compacted, report = compact_update(master_data, update_data)
+    print(format_report(report))
+    if args.verify:
+        literal = master_store.merge_data(copy.deepcopy(master_data), copy.deepcopy(update_data), verbose=False, compact=False)
+        merged = master_store.merge_data(copy.deepcopy(master_data), copy.deepcopy(compacted), verbose=False, compact=False)
+        same = json.dumps(literal, sort_keys=True, ensure_ascii=False) == json.dumps(merged, sort_keys=True, ensure_ascii=False)
+        print("Verify: identical merge result" if same else "Verify: MISMATCH")
+        if not same:
+            return 1
+    if args.output:
+        master_store.atomic_write_json(args.output, compacted)
+        print(f"Saved: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+import argparse
+import copy
+import datetime
+import functools
+import os
+import sys
+import time
+import unicodedata
+import zlib
+from openpyxl.utils import get_column_letter, range_boundaries
+import master_store
+import skill_index
+import stamp_cache
+import text_layout
+import update_resume
+
+# PDF export without Excel: the merged master is laid out through the same compiled block
+# stamp as the workbook (merged boxes, resolved borders) and written as a plain PDF using the
+# non-embedded Japanese CID font every PDF viewer ships (HeiseiKakuGo-W5, UniJIS-UCS2-H).
+# Layout metrics are cached per template, so exporting a roster costs only the text.
+PAGE_SIZE = (842.0, 595.0)  # A4 landscape, points
+MARGIN = 28.0
+LAST_COL = 31  # AE
+FONT_NAME = 'HeiseiKakuGo-W5'
+FONT_ENCODING = 'UniJIS-UCS2-H'
+FONT_SIZE = 7.0
+MIN_FONT_SIZE = 4.0
+CELL_PADDING = 1.5
+DEFAULT_COL_WIDTH = 8.43
+DEFAULT_ROW_HEIGHT = 15.0
+BORDER_WIDTHS = {'hair': 0.25, 'thin': 0.5, 'dotted': 0.5, 'dashed': 0.5, 'medium': 1.0, 'mediumDashed': 1.0, 'thick': 1.5, 'double': 1.5}
+PDF_OUTPUT_DIR = os.path.join('005_ToolOutput', '07_PDF')
+
+# Fixed font objects (3: Type0, 4: CIDFont, 5: descriptor), serialised once per process.
+# ASCII (CID 1-95) and half-width katakana (CID 327-389) are 500 units wide, the rest 1000.
+FONT_OBJECTS = (
+    f'<< /Type /Font /Subtype /Type0 /BaseFont /{FONT_NAME} /Encoding /{FONT_ENCODING} /DescendantFonts [4 0 R] >>',
+    f'<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{FONT_NAME} '
+    '/CIDSystemInfo << /Registry (Adobe) /Ordering (Japan1) /Supplement 2 >> '
+    '/FontDescriptor 5 0 R /DW 1000 /W [1 95 500 327 389 500] >>',
+    f'<< /Type /FontDescriptor /FontName /{FONT_NAME} /Flags 4 /FontBBox [-92 -250 1010 922] '
+    '/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 737 /StemV 93 >>',
+)
+
+@functools.lru_cache(maxsize=None)
+def char_width(ch):
+    """Advance width in 1/1000 em, matching the W array above."""
+    code = ord(ch)
+    if 0x20 <= code <= 0x7E or 0xFF61 <= code <= 0xFF9F:
+        return 500
+    if unicodedata.east_asian_width(ch) in ('Na', 'H') or unicodedata.combining(ch):
+        return 500
+    return 1000
+
+@functools.lru_cache(maxsize=65536)
+def text_units(text):
+    return sum(char_width(ch) for ch in text)
+
+def pdf_text(text):
+    """UTF-16BE hex string for UniJIS-UCS2-H; characters outside the BMP become 〓."""
+    return '<' + ''.join(ch if ord(ch) <= 0xFFFF else '〓' for ch in text).encode('utf-16-be').hex().upper() + '>'
+
+def display_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return f"{value.year}/{value.month}"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).replace('\r', '').replace('\n', ' ')
+
+class PageLayout:
+    """Page geometry and stamp-derived boxes of one template, built once and reused per export."""
+
+    def __init__(self, wb, stamp):
+        self.wb = wb
+        self.stamp = stamp
+        ws = wb[update_resume.TARGET_SHEET_NAME]
+        widths = []
+        for col in range(1, LAST_COL + 1):
+            dimension = ws.column_dimensions.get(get_column_letter(col))
+            width = dimension.width if dimension is not None and dimension.width else (ws.sheet_format.defaultColWidth or DEFAULT_COL_WIDTH)
+            # Excel column width (characters) -> pixels -> points
+            widths.append((width * 7 + 5) * 0.75)
+        content_width = PAGE_SIZE[0] - 2 * MARGIN
+        self.scale = content_width / sum(widths)
+        self.col_x = [MARGIN]
+        for width in widths:
+            self.col_x.append(self.col_x[-1] + width * self.scale)
+        self.row_height = (ws.sheet_format.defaultRowHeight or DEFAULT_ROW_HEIGHT) * self.scale
+        self.header = self._header_rows(ws)
+        self.boxes = {kind: self._boxes(self.stamp if kind == 'block' else self.stamp["footer"]) for kind in ('block', 'footer')}
+        self.alignment = {}
+        self.styles = {}
+        self.borders = {}
+
+    def _header_rows(self, ws):
+        """Rows above START_ROW as [(height, [(col, last col, row span, text, style)])]."""
+        merges = {}
+        for merged in ws.merged_cells.ranges:
+            min_col, min_row, max_col, max_row = range_boundaries(str(merged))
+            if max_row < update_resume.START_ROW:
+                merges[(min_row, min_col)] = (max_col, max_row - min_row + 1)
+        rows = []
+        for row in range(1, update_resume.START_ROW):
+            dimension = ws.row_dimensions.get(row)
+            height = (dimension.height if dimension is not None and dimension.height else ws.sheet_format.defaultRowHeight or DEFAULT_ROW_HEIGHT)
+            cells = []
+            for col in range(1, LAST_COL + 1):
+                cell = ws._cells.get((row, col))
+                if cell is None or cell.value is None:
+                    continue
+                last_col, span = merges.get((row, col), (col, 1))
+                cells.append((col, min(last_col, LAST_COL), span, display_text(cell.value), cell._style))
+            rows.append((height * self.scale, cells))
+        return rows
+
+    @staticmethod
+    def _boxes(region):
+        """(row_off, col) -> (last col, row span) for every merged anchor of a stamp region."""
+        return {(r0, c0): (c1, r1 - r0 + 1) for r0, c0, r1, c1 in region["merges"]}
+
+    def box(self, kind, row_off, col):
+        return self.boxes[kind].get((row_off, col), (col, 1))
+
+    def aligned(self, style):
+        """(horizontal, vertical) alignment of a StyleArray, cached by alignment id."""
+        key = style.alignmentId if style is not None else 0
+        alignment = self.alignment.get(key)
+        if alignment is None:
+            source = self.wb._alignments[key] if key < len(self.wb._alignments) else None
+            alignment = self.alignment[key] = ((source.horizontal if source else None) or 'left',
+                                               (source.vertical if source else None) or 'bottom')
+        return alignment
+
+    def cell_styles(self, kind, variant):
+        """(row_off, col) -> StyleArray of one resolved segment."""
+        key = (kind, variant)
+        styles = self.styles.get(key)
+        if styles is None:
+            resolved = update_resume.resolve_segment(self.stamp, kind, variant)
+            styles = self.styles[key] = {(r, c): style for r, c, style, _ in resolved["cells"]}
+        return styles
+
+    def segment_borders(self, kind, variant):
+        """Border strokes of one resolved segment as (width, x0, row0, x1, row1), row units from its top."""
+        key = (kind, variant)
+        strokes = self.borders.get(key)
+        if strokes is not None:
+            return strokes
+        strokes = []
+        for row_off, col, style, _ in update_resume.resolve_segment(self.stamp, kind, variant)["cells"]:
+            if col > LAST_COL or style is None:
+                continue
+            border = self.wb._borders[style.borderId]
+            x0, x1 = self.col_x[col - 1], self.col_x[col]
+            for side, segment in (('top', (x0, row_off, x1, row_off)), ('bottom', (x0, row_off + 1, x1, row_off + 1)),
+                                  ('left', (x0, row_off, x0, row_off + 1)), ('right', (x1, row_off, x1, row_off + 1))):
+                line = getattr(border, side)
+                line_style = line.style if line is not None else None
+                if line_style:
+                    strokes.append((BORDER_WIDTHS.get(line_style, 0.5),) + segment)
+        self.borders[key] = strokes
+        return strokes
+
+_layouts = {}
+
+def get_layout(template_path):
+    """Process-wide PageLayout per template, rebuilt when the file changes."""
+    path = os.path.abspath(template_path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _layouts.get(path)
+    if cached is None or cached[0] != mtime:
+        package, wb = update_resume.open_template(path)
+        if not update_resume.check_sheets(wb):
+            raise ValueError(f"Template {path} lacks {update_resume.TARGET_SHEET_NAME}/{update_resume.TEMPLATE_SHEET_NAME}")
+        cached = _layouts[path] = (mtime, PageLayout(wb, stamp_cache.load_stamp(package, wb)))
+    return cached[1]
+
+class Canvas:
+    """Content stream of one page."""
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, layout, x0, x1, top, height, text, style):
+        if not text:
+            return
+        width = x1 - x0 - 2 * CELL_PADDING
+        units = text_units(text)
+        # Fit the row height, then shrink to the box width down to MIN_FONT_SIZE
+        size = min(FONT_SIZE, height * 0.8)
+        if units * size / 1000 > width:
+            size = max(MIN_FONT_SIZE, width * 1000 / units)
+        if units * size / 1000 > width:
+            # Still too wide: cut at the box edge, as Excel clips the cell
+            limit = width * 1000 / size
+            total = 0
+            for end, ch in enumerate(text):
+                total += char_width(ch)
+                if total > limit:
+                    text = text[:end]
+                    break
+            units = text_units(text)
+        horizontal, vertical = layout.aligned(style)
+        text_width = units * size / 1000
+        if horizontal in ('center', 'centerContinuous'):
+            x = x0 + (x1 - x0 - text_width) / 2
+        elif horizontal == 'right':
+            x = x1 - CELL_PADDING - text_width
+        else:
+            x = x0 + CELL_PADDING
+        if vertical == 'top':
+            y = top - CELL_PADDING - size * 0.88
+        elif vertical == 'center':
+            y = top - height / 2 - size * 0.38
+        else:
+            y = top - height + CELL_PADDING + size * 0.12
+        self.ops.append(f"BT /F1 {size:.2f} Tf {x:.2f} {y:.2f} Td {pdf_text(text)} Tj ET")
+
+    def strokes(self, strokes, top, row_height):
+        current = None
+        for width, x0, r0, x1, r1 in strokes:
+            if width != current:
+                self.ops.append(f"{width:.2f} w")
+                current = width
+            self.ops.append(f"{x0:.2f} {top - r0 * row_height:.2f} m {x1:.2f} {top - r1 * row_height:.2f} l S")
+
+    def stream(self):
+        return zlib.compress('\n'.join(self.ops).encode('ascii'))
+
+def paginate(layout, master_data, footer_border=update_resume.FOOTER_BORDER):
+    """Places header rows and segments on pages. A history block (or the footer) never spans
+    a page break; pages after the first repeat the column label row."""
+    usable = PAGE_SIZE[1] - 2 * MARGIN
+    label_row = layout.header[-1] if layout.header else None
+    pages = [[('header', row) for row in layout.header]]
+    used = sum(height for height, _ in layout.header)
+    units = []
+    footer = []
+    for segment in update_resume.plan_region(master_data, update_resume.START_ROW, footer_border):
+        if segment[1] == 'block':
+            units.append([segment])
+        else:
+            footer.append(segment)
+    units.append(footer)
+    for unit in units:
+        height = sum(update_resume.BLOCK_ROWS if kind == 'block' else 1 for _, kind, _, _ in unit) * layout.row_height
+        if used + height > usable and used > (label_row[0] if label_row and len(pages) > 1 else 0):
+            pages.append([('header', label_row)] if label_row else [])
+            used = label_row[0] if label_row else 0
+        pages[-1].extend(('segment', segment) for segment in unit)
+        used += height
+    return pages
+
+def draw_page(layout, items):
+    canvas = Canvas()
+    top = PAGE_SIZE[1] - MARGIN
+    for item_kind, item in items:
+        if item_kind == 'header':
+            height, cells = item
+            for col, last_col, span, text, style in cells:
+                canvas.text(layout, layout.col_x[col - 1], layout.col_x[last_col], top, height * span, text, style)
+            top -= height
+            continue
+        _, kind, variant, values = item
+        rows = update_resume.BLOCK_ROWS if kind == 'block' else 1
+        canvas.strokes(layout.segment_borders(kind, variant), top, layout.row_height)
+        styles = layout.cell_styles(kind, variant)
+        for (row_off, col), value in values:
+            last_col, span = layout.box(kind, row_off, col)
+            canvas.text(layout, layout.col_x[col - 1], layout.col_x[min(last_col, LAST_COL)],
+                        top - row_off * layout.row_height, span * layout.row_height, display_text(value), styles.get((row_off, col)))
+        top -= rows * layout.row_height
+    return canvas.stream()
+
+def write_pdf(out, page_streams, title=''):
+    """Writes a complete PDF (objects 1-2 catalog/pages, 3-5 font, then page/content pairs)."""
+    offsets = []
+
+    def obj(body):
+        offsets.append(out.tell())
+        out.write(f"{len(offsets)} 0 obj\n".encode('ascii'))
+        out.write(body)
+        out.write(b"\nendobj\n")
+
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    first_page = 6
+    kids = ' '.join(f"{first_page + 2 * i} 0 R" for i in range(len(page_streams)))
+    obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+    obj(f"<< /Type /Pages /Kids [{kids}] /Count {len(page_streams)} >>".encode('ascii'))
+    for body in FONT_OBJECTS:
+        obj(body.encode('ascii'))
+    for i, stream in enumerate(page_streams):
+        content = first_page + 2 * i + 1
+        obj(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_SIZE[0]:g} {PAGE_SIZE[1]:g}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content} 0 R >>".encode('ascii'))
+        obj(f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode('ascii') + stream + b"\nendstream")
+    info = len(offsets) + 1
+    # Text strings outside content streams are UTF-16BE with a byte order mark
+    obj(f"<< /Title <FEFF{pdf_text(title)[1:]} /Producer (resume-auto-updater) >>".encode('ascii'))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode('ascii'))
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode('ascii'))
+    out.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R /Info {info} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('ascii'))
+
+def export_pdf(master_data, output, template_path=update_resume.TEMPLATE_EXCEL_PATH, footer_border=update_resume.FOOTER_BORDER,
+               wrap=update_resume.WRAP_TEXT):
+    """Writes master_data as a PDF to output (path or binary file). Returns the page count."""
+    layout = get_layout(template_path)
+    if wrap:
+        master_data, _ = text_layout.wrap_master(master_data, layout.stamp)
+    pages = [draw_page(layout, items) for items in paginate(layout, master_data, footer_border)]
+    title = f"経歴書 {skill_index.candidate_id_for(master_data)}"
+    if hasattr(output, 'write'):
+        write_pdf(output, pages, title)
+    else:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'wb') as f:
+            write_pdf(f, pages, title)
+    return len(pages)
+
+def pdf_filename_for(candidate_id, output_dir=PDF_OUTPUT_DIR):
+    return os.path.splitext(update_resume.output_filename_for(candidate_id, output_dir))[0] + '.pdf'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export masters as print-ready PDFs (no Excel needed).")
+    parser.add_argument('masters', nargs='+')
+    parser.add_argument('--template', default=update_resume.TEMPLATE_EXCEL_PATH)
+    parser.add_argument('--update', default=None, help="Update JSON merged in memory before exporting.")
+    parser.add_argument('--output-dir', default=PDF_OUTPUT_DIR)
+    parser.add_argument('--wrap', action='store_true', help="Split long detail/footer lines to their merged cell widths.")
+    args = parser.parse_args(argv)
+
+    update_data = update_resume.load_json(args.update) if args.update else None
+    try:
+        output_ids = skill_index.batch_output_ids(args.masters)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    started = time.perf_counter()
+    failures = 0
+    for master_path in args.masters:
+        try:
+            master_data = master_store.load_master(master_path)
+            if update_data:
+                master_data = master_store.merge_data(master_data, copy.deepcopy(update_data), verbose=False)
+            output_id = output_ids.get(master_path) or skill_index.candidate_id_for(master_data, master_path)
+            output = pdf_filename_for(output_id, args.output_dir)
+            pages = export_pdf(master_data, output, args.template, wrap=args.wrap)
+            print(f"{master_path} -> {output} ({pages} pages)")
+        except (OSError, ValueError, KeyError) as e:
+            failures += 1
+            print(f"Error: {master_path}: {e}")
+    print(f"Exported {len(args.masters) - failures}/{len(args.masters)} in {time.perf_counter() - started:.2f}s")
+    return 0 if failures == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
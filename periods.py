@@ -0,0 +1,151 @@
+import datetime
+import functools
+import re
+
+try:
+    import config
+except ImportError:
+    config = None
+
+PRESENT_LABEL = '現在'
+PERIOD_PATTERN = re.compile(r'^\s*(\d{4})\s*[/年.\-]\s*(\d{1,2})\s*月?\s*$')
+
+def month_key(year, month):
+    """Packs a year/month into one integer (months since year 0)."""
+    return year * 12 + (month - 1)
+
+def key_to_text(key):
+    """Formats a month key back to 'YYYY/M'."""
+    return f"{key // 12}/{key % 12 + 1}"
+
+def current_key(today=None):
+    today = today or datetime.date.today()
+    return month_key(today.year, today.month)
+
+def date_to_key(value):
+    """Converts 'YYYY-MM-DD' (config style) or a date to a month key."""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value)
+    return month_key(value.year, value.month)
+
+@functools.lru_cache(maxsize=4096)
+def _parse_text(text):
+    match = PERIOD_PATTERN.match(text)
+    if not match:
+        return None
+    month = int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return month_key(int(match.group(1)), month)
+
+def parse_period(value, present=None):
+    """Parses '2023/4' or '現在' into a month key. Returns None if unparseable."""
+    if not isinstance(value, str):
+        return None
+    if value.strip() == PRESENT_LABEL:
+        return current_key() if present is None else present
+    return _parse_text(value)
+
+def entry_keys(entry, present=None):
+    """Returns (start_key, end_key) for one work_history entry."""
+    period = entry.get('period') or {}
+    start = parse_period(period.get('start'), present)
+    end = parse_period(period.get('end'), present)
+    if start is not None and (end is None or end < start):
+        end = start
+    return start, end
+
+class PeriodIndex:
+    """Month keys for a work_history list, parsed once and kept sorted."""
+
+    def __init__(self, work_history, present=None):
+        self.present = current_key() if present is None else present
+        self.keys = [entry_keys(entry, self.present) for entry in work_history]
+        self.unparsed = [i for i, (start, _) in enumerate(self.keys) if start is None]
+        self.by_start = sorted(
+            (i for i, (start, _) in enumerate(self.keys) if start is not None),
+            key=lambda i: (self.keys[i][0], self.keys[i][1])
+        )
+
+    def chronological_order(self, newest_first=True):
+        """Entry positions ordered by period; unparsed entries keep their place at the end."""
+        parsed = [i for i in range(len(self.keys)) if self.keys[i][0] is not None]
+        order = sorted(parsed, key=lambda i: self.keys[i], reverse=newest_first)
+        return order + self.unparsed
+
+    def is_chronological(self, newest_first=True):
+        starts = [start for start, _ in self.keys if start is not None]
+        if newest_first:
+            return all(a >= b for a, b in zip(starts, starts[1:]))
+        return all(a <= b for a, b in zip(starts, starts[1:]))
+
+    def sweep(self):
+        """Single pass over entries by start month. Returns (overlaps, gaps, covered_months)."""
+        overlaps = []
+        gaps = []
+        covered = 0
+        run_start = run_end = run_owner = None
+        for i in self.by_start:
+            start, end = self.keys[i]
+            if run_end is None:
+                run_start, run_end, run_owner = start, end, i
+                continue
+            if start <= run_end:
+                overlaps.append((run_owner, i))
+                if end > run_end:
+                    run_end, run_owner = end, i
+            else:
+                covered += run_end - run_start + 1
+                if start > run_end + 1:
+                    gaps.append((run_end + 1, start - 1))
+                run_start, run_end, run_owner = start, end, i
+        if run_end is not None:
+            covered += run_end - run_start + 1
+        return overlaps, gaps, covered
+
+    def summary(self, career_start=None):
+        """Overlaps, gaps and total experience vs. config.CAREER_START_DATE."""
+        if career_start is None and config is not None:
+            career_start = getattr(config, 'CAREER_START_DATE', None)
+        overlaps, gaps, covered = self.sweep()
+        result = {
+            "overlaps": overlaps,
+            "gaps": gaps,
+            "covered_months": covered,
+            "unparsed": list(self.unparsed),
+            "career_months": None
+        }
+        if career_start:
+            result["career_months"] = self.present - date_to_key(career_start) + 1
+        return result
+
+def sort_work_history(work_history, newest_first=True):
+    """Returns work_history sorted by period (newest first by default)."""
+    index = PeriodIndex(work_history)
+    return [work_history[i] for i in index.chronological_order(newest_first)]
+
+def format_months(months):
+    return f"{months // 12}年{months % 12}ヶ月"
+
+def print_report(work_history, indent="  "):
+    """Prints a consistency report for one work_history list."""
+    index = PeriodIndex(work_history)
+    summary = index.summary()
+
+    def label(i):
+        return f"No.{work_history[i].get('no', '?')}"
+
+    if not index.is_chronological():
+        print(f"{indent}[Warning] Entries are not in chronological order (newest first).")
+    for a, b in summary["overlaps"]:
+        print(f"{indent}[Info] Period overlap: {label(a)} / {label(b)}")
+    for start, end in summary["gaps"]:
+        print(f"{indent}[Info] Gap: {key_to_text(start)} - {key_to_text(end)}")
+    for i in summary["unparsed"]:
+        print(f"{indent}[Warning] Unparseable period: {label(i)}")
+    print(f"{indent}Experience: {format_months(summary['covered_months'])}", end="")
+    if summary["career_months"] is not None:
+        print(f" (career: {format_months(summary['career_months'])})")
+    else:
+        print()
+    return summary
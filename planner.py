@@ -2,12 +2,20 @@ import json
 import os
 import copy
 import sys
+import validator
+import periods
+import master_diff
+import master_store
+import payload_compaction
+import render_cost
 
 # Paths
 MASTER_JSON_PATH = os.path.join('005_ToolOutput', '01_ResumeUpdater', 'Data', 'resume_master.json')
 DRAFT_JSON_PATH = os.path.join('005_ToolOutput', '02_ResumeUpdate', 'Data', 'resume_update.json')
 OUTPUT_DIR = os.path.join('005_ToolOutput', '03_PlanResult')
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, 'resume_merged_preview.json')
+DIFF_FILE = os.path.join(OUTPUT_DIR, 'resume_merged_diff.json')
+ESTIMATE_FILE = os.path.join(OUTPUT_DIR, 'resume_render_estimate.json')
 
 def load_json(path):
     try:
@@ -25,57 +33,23 @@ def save_json(path, data):
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 def validate_payload(payloads):
-    """Validates and auto-corrects the payload structure."""
+    """Validates and auto-corrects the payload structure. Drops malformed items."""
     print("Validation: Checking payload structure...")
-    fixed_count = 0
-    
-    list_fields = [
-        ('business_content', 'title_col_e'),
-        ('business_content', 'role_col_f'),
-        ('business_content', 'detail_col_g'),
-        ('technology', 'environment_col_u'),
-        ('technology', 'language_col_z'),
-        ('technology', 'process_col_ae')
-    ]
-
-    for idx, item in enumerate(payloads):
-        # Check required fields
-        if 'action' not in item or 'target_no' not in item or 'data' not in item:
-            print(f"  [Error] Item {idx}: Missing action, target_no, or data.")
-            continue
-            
-        data = item['data']
-        
-        # Check list lengths
-        for parent, field in list_fields:
-            if parent in data and field in data[parent]:
-                current_list = data[parent][field]
-                if not isinstance(current_list, list):
-                    print(f"  [Warning] Item {idx}: {field} is not a list. Converting to list.")
-                    current_list = [str(current_list)]
-                    data[parent][field] = current_list
-                    fixed_count += 1
-                
-                if len(current_list) != 5:
-                    print(f"  [Fix] Item {idx}: {field} length is {len(current_list)}. Padding/Truncating to 5.")
-                    # Pad with empty strings
-                    while len(current_list) < 5:
-                        current_list.append("")
-                    # Truncate if too long (though padding is the main requirement)
-                    if len(current_list) > 5:
-                        current_list = current_list[:5]
-                    
-                    data[parent][field] = current_list
-                    fixed_count += 1
+    issues = validator.validate_payload(payloads, fix=True)
+    validator.print_report(issues)
+    rejected = validator.rejected_items(issues)
     
+    fixed_count = sum(1 for issue in issues if issue.fixed)
     if fixed_count > 0:
         print(f"Validation: Fixed {fixed_count} issues.")
+    elif issues:
+        print(f"Validation: {len(issues)} issues found.")
     else:
         print("Validation: OK")
     
-    return payloads
+    return [item for idx, item in enumerate(payloads) if idx not in rejected]
 
-def simulate_merge(master_data, draft_data):
+def simulate_merge(master_data, draft_data, sort_history=False):
     """Simulates the merge process."""
     print("\nSimulation: Starting merge simulation...")
     
@@ -84,6 +58,10 @@ def simulate_merge(master_data, draft_data):
     
     # Validate and Fix
     payloads = validate_payload(payloads)
+
+    # Same minimal op list the real merge applies
+    payloads, report = payload_compaction.compact_payload(merged_data, payloads)
+    print(f"  {payload_compaction.format_report(report)}")
     
     initial_count = len(merged_data['work_history'])
     
@@ -109,6 +87,11 @@ def simulate_merge(master_data, draft_data):
         else:
             print(f"  [Warning] Unknown action: {action}")
 
+    # Chronological order
+    if sort_history:
+        print("  Sorting entries by period...")
+        merged_data['work_history'] = periods.sort_work_history(merged_data['work_history'])
+    
     # Renumbering
     print("  Renumbering entries...")
     for i, entry in enumerate(merged_data['work_history']):
@@ -116,6 +99,7 @@ def simulate_merge(master_data, draft_data):
         
     final_count = len(merged_data['work_history'])
     print(f"Impact: Total entries {initial_count} -> {final_count}")
+    periods.print_report(merged_data['work_history'])
     
     # Footer Update
     footer_update = draft_data.get('footer_update')
@@ -127,23 +111,53 @@ def simulate_merge(master_data, draft_data):
         
     return merged_data
 
-def main():
+def main(master_path=MASTER_JSON_PATH, draft_path=DRAFT_JSON_PATH, output_dir=OUTPUT_DIR, metrics_path=render_cost.METRICS_PATH, sort_history=False):
+    output_file = os.path.join(output_dir, os.path.basename(OUTPUT_FILE))
+    diff_file = os.path.join(output_dir, os.path.basename(DIFF_FILE))
+    estimate_file = os.path.join(output_dir, os.path.basename(ESTIMATE_FILE))
+
     # Ensure output directory exists
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
     
     # Load Data
-    print(f"Loading Master: {MASTER_JSON_PATH}")
-    master_data = load_json(MASTER_JSON_PATH)
+    print(f"Loading Master: {master_path}")
+    try:
+        master_data = master_store.load_master(master_path)
+    except FileNotFoundError:
+        print(f"Error: File not found at {master_path}")
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print(f"Error: Invalid JSON at {master_path}")
+        sys.exit(1)
+    master_issues = validator.validate_master(master_data)
+    validator.print_report(master_issues)
     
-    print(f"Loading Draft: {DRAFT_JSON_PATH}")
-    draft_data = load_json(DRAFT_JSON_PATH)
+    print(f"Loading Draft: {draft_path}")
+    draft_data = load_json(draft_path)
     
     # Simulate
-    merged_data = simulate_merge(master_data, draft_data)
+    merged_data = simulate_merge(master_data, draft_data, sort_history)
+    
+    # Diff
+    print("\nDiff: Master -> Preview")
+    diff = master_diff.diff_masters(master_data, merged_data)
+    master_diff.print_diff(diff)
+
+    # Render cost (dry run, calibrated from recorded renders)
+    print("")
+    model = render_cost.load_model(metrics_path)
+    estimates = {path: render_cost.estimate(merged_data, model, path) for path in render_cost.PATHS}
+    for estimate in estimates.values():
+        render_cost.print_estimate(estimate)
     
     # Save
-    save_json(OUTPUT_FILE, merged_data)
-    print(f"\nSaved: {OUTPUT_FILE}")
+    save_json(output_file, merged_data)
+    save_json(diff_file, diff)
+    save_json(estimate_file, estimates)
+    print(f"\nSaved: {output_file}")
+    print(f"Saved: {diff_file}")
+    print(f"Saved: {estimate_file}")
+    return merged_data
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,252 @@
+import argparse
+import ast
+import contextlib
+import copy
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import extract_master_json
+import master_store
+import planner
+import sheet_emitter
+import synthetic
+import update_resume
+
+# Round-trip and budget harness: synthetic fixtures go through extract -> plan -> merge ->
+# render (openpyxl and direct) -> re-extract, and every stage is timed against a stored baseline.
+# The legacy (archive) and current clean_sheet run side by side on a pre-rendered sheet.
+LEGACY_RENDERER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive', 'legacy_v001', 'update_resume.py')
+BASELINE_PATH = os.path.join('005_ToolOutput', '98_Regression', 'baseline.json')
+TOLERANCE = 0.5
+# Absolute headroom so millisecond stages do not fail on scheduler noise
+MIN_SLACK_SECONDS = 0.05
+MIN_SLACK_KB = 512
+FIXTURE_DEFAULTS = {"entries": 200, "updates": 20, "existing_entries": 40, "seed": synthetic.DEFAULT_SEED}
+
+class Stages:
+    """Times each stage and its tracemalloc peak. Times include tracing overhead, so compare
+    them only with baselines recorded by this harness."""
+
+    def __init__(self, quiet=True):
+        self.quiet = quiet
+        self.results = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        output = contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext()
+        started = time.perf_counter()
+        with output:
+            yield
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        self.results[name] = {"seconds": round(seconds, 4), "peak_kb": round(max(0, peak - base) / 1024, 1)}
+
+def normalize(master_data):
+    """The part of a master that survives a render: work history and footer, every column
+    padded/cut to one block, as strings."""
+    size = update_resume.BLOCK_ROWS
+
+    def column(items):
+        items = [str(v) if v is not None else '' for v in (items or [])][:size]
+        return items + [''] * (size - len(items))
+
+    history = []
+    for entry in master_data.get('work_history', []):
+        bc = entry.get('business_content', {})
+        tech = entry.get('technology', {})
+        history.append({
+            "no": str(entry.get('no') or ''),
+            "period": {k: str(entry.get('period', {}).get(k) or '') for k in ('start', 'end')},
+            "business_content": {k: column(bc.get(k)) for k in ('title_col_e', 'role_col_f', 'detail_col_g')},
+            "technology": {k: column(tech.get(k)) for k in ('environment_col_u', 'language_col_z', 'process_col_ae')}
+        })
+    return {"work_history": history, "footer": column(master_data.get('footer', {}).get('other_col_b'))}
+
+def first_difference(expected, actual):
+    """Short description of the first mismatch between two normalized masters, or None."""
+    if expected == actual:
+        return None
+    if expected['footer'] != actual['footer']:
+        return f"footer {expected['footer']} != {actual['footer']}"
+    if len(expected['work_history']) != len(actual['work_history']):
+        return f"{len(expected['work_history'])} entries != {len(actual['work_history'])}"
+    for i, (a, b) in enumerate(zip(expected['work_history'], actual['work_history'])):
+        if a != b:
+            return f"entry {i + 1}: {a} != {b}"
+    return "masters differ"
+
+def load_legacy_clean_sheet(path=LEGACY_RENDERER_PATH):
+    """clean_sheet from the archived renderer. Only the function is compiled: the module itself
+    imports config and opens debug.log at import time."""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    nodes = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == 'clean_sheet']
+    if not nodes:
+        raise ValueError(f"clean_sheet not found in {path}")
+    namespace = {"START_ROW": update_resume.START_ROW}
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), path, 'exec'), namespace)
+    return namespace['clean_sheet']
+
+def clean_leftovers(ws, start_row=update_resume.START_ROW):
+    """What a clean_sheet left behind: cells or merges from start_row, and merged-cell
+    placeholders above it that no range covers any more (they reject writes)."""
+    from openpyxl.cell.cell import MergedCell
+    problems = [f"cell {cell.coordinate}" for (row, _), cell in ws._cells.items() if row >= start_row]
+    problems += [f"merge {mr}" for mr in ws.merged_cells.ranges if mr.max_row >= start_row]
+    covered = set()
+    for mr in ws.merged_cells.ranges:
+        covered.update(mr.cells)
+    problems += [f"orphan merged cell {cell.coordinate}" for key, cell in ws._cells.items()
+                 if isinstance(cell, MergedCell) and key not in covered]
+    return problems
+
+def reextract(path):
+    rows = extract_master_json.read_xlsx_rows(path, update_resume.TARGET_SHEET_NAME)
+    return extract_master_json.parse_rows(rows, path)
+
+def run(workdir, entries, updates, existing_entries, seed, quiet=True):
+    """Runs every stage in workdir. Returns (stage results, failures)."""
+    import openpyxl
+
+    stages = Stages(quiet)
+    failures = []
+
+    def check(label, expected, actual):
+        difference = first_difference(normalize(expected), normalize(actual))
+        if difference:
+            failures.append(f"{label}: {difference}")
+
+    with stages.stage('generate'):
+        fixtures = synthetic.generate_fixtures(os.path.join(workdir, 'fixtures'), entries, updates, seed,
+                                               existing_entries, footer_stamp=True, csv_encoding='cp932')
+    source = master_store.load_master(fixtures['master'])
+    update = planner.load_json(fixtures['update'])
+    master_path = os.path.join(workdir, 'data', 'resume_master.json')
+
+    with stages.stage('extract'):
+        extracted = extract_master_json.extract_resume_data(fixtures['csv'], master_path)
+    check("extract (csv -> master)", source, extracted)
+
+    with stages.stage('plan'):
+        preview = planner.main(master_path, fixtures['update'], os.path.join(workdir, 'plan'))
+
+    with stages.stage('merge'):
+        merged = master_store.MasterStore(master_path).append_update(copy.deepcopy(update))
+    check("plan preview vs. merged master", preview, merged)
+
+    rendered_path = os.path.join(workdir, 'rendered.xlsx')
+    with stages.stage('render'):
+        package, wb = update_resume.open_template(fixtures['template'])
+        update_resume.render_workbook(wb, merged)
+        update_resume.save_workbook(wb, rendered_path, package)
+
+    direct_path = os.path.join(workdir, 'rendered_direct.xlsx')
+    with stages.stage('render_direct'):
+        package, wb = update_resume.open_template(fixtures['template'])
+        emitted = sheet_emitter.emit_workbook(sheet_emitter.SheetEmitter(package, wb), merged, direct_path)
+    if not emitted:
+        failures.append("render_direct: emitter not applicable to the synthetic template")
+
+    with stages.stage('reextract'):
+        reextracted = reextract(rendered_path)
+    check("re-extract (openpyxl render)", merged, reextracted)
+    if emitted:
+        check("re-extract (direct render)", merged, reextract(direct_path))
+        with open(rendered_path, 'rb') as expected, open(direct_path, 'rb') as actual:
+            failures += [f"direct vs. openpyxl: {d}" for d in sheet_emitter.compare_sheets(expected, actual)[:5]]
+
+    # Both clean_sheet versions on the same pre-rendered sheet, each followed by the same render
+    outputs = {}
+    for name, clean in (('clean_current', update_resume.clean_sheet), ('clean_legacy', load_legacy_clean_sheet())):
+        wb = openpyxl.load_workbook(fixtures['template'])
+        ws = wb[update_resume.TARGET_SHEET_NAME]
+        with stages.stage(name):
+            clean(ws)
+        failures += [f"{name}: {problem}" for problem in clean_leftovers(ws)[:5]]
+        stamp = update_resume.compile_template(wb[update_resume.TEMPLATE_SHEET_NAME])
+        update_resume.render_region(ws, stamp, merged)
+        outputs[name] = io.BytesIO()
+        wb.save(outputs[name])
+        outputs[name].seek(0)
+    failures += [f"render after clean_legacy vs. clean_current: {d}"
+                 for d in sheet_emitter.compare_sheets(outputs['clean_current'], outputs['clean_legacy'])[:5]]
+    return stages.results, failures
+
+def check_budget(results, baseline, tolerance):
+    """Stages over baseline * (1 + tolerance) plus the absolute slack."""
+    over = []
+    for name, measured in results.items():
+        recorded = baseline.get('stages', {}).get(name)
+        if recorded is None:
+            continue
+        limits = (("seconds", MIN_SLACK_SECONDS, "s"), ("peak_kb", MIN_SLACK_KB, " KB"))
+        for key, slack, unit in limits:
+            budget = recorded[key] * (1 + tolerance) + slack
+            if measured[key] > budget:
+                over.append(f"{name}: {key} {measured[key]}{unit} over budget {budget:.3f}{unit} (baseline {recorded[key]}{unit})")
+    return over
+
+def print_table(results, baseline):
+    stages = baseline.get('stages', {}) if baseline else {}
+    print(f"{'stage':<15}{'seconds':>10}{'baseline':>10}{'peak KB':>12}{'baseline':>12}")
+    for name, measured in results.items():
+        recorded = stages.get(name, {})
+        print(f"{name:<15}{measured['seconds']:>10.3f}{recorded.get('seconds', float('nan')):>10.3f}"
+              f"{measured['peak_kb']:>12.1f}{recorded.get('peak_kb', float('nan')):>12.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-trip and time/memory regression check on synthetic fixtures.")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--record', action='store_true', help="Store this run as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="Allowed growth over the baseline (0.5 = +50%%).")
+    parser.add_argument('--entries', type=int, default=FIXTURE_DEFAULTS['entries'])
+    parser.add_argument('--updates', type=int, default=FIXTURE_DEFAULTS['updates'])
+    parser.add_argument('--existing-entries', type=int, default=FIXTURE_DEFAULTS['existing_entries'])
+    parser.add_argument('--seed', type=int, default=FIXTURE_DEFAULTS['seed'])
+    parser.add_argument('--workdir', default=None, help="Keep fixtures and outputs here (default: temporary).")
+    parser.add_argument('--verbose', action='store_true', help="Show the stages' own output.")
+    args = parser.parse_args(argv)
+
+    fixture = {"entries": args.entries, "updates": args.updates, "existing_entries": args.existing_entries, "seed": args.seed}
+    tracemalloc.start()
+    try:
+        if args.workdir:
+            os.makedirs(args.workdir, exist_ok=True)
+            results, failures = run(args.workdir, quiet=not args.verbose, **fixture)
+        else:
+            with tempfile.TemporaryDirectory() as workdir:
+                results, failures = run(workdir, quiet=not args.verbose, **fixture)
+    finally:
+        tracemalloc.stop()
+
+    stored = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    baseline = stored if stored and stored.get('fixture') == fixture else None
+    if stored and baseline is None:
+        print(f"Baseline was recorded for {stored.get('fixture')}; budgets not checked.")
+    print_table(results, baseline)
+
+    if not failures and (args.record or stored is None):
+        record = {"recorded_at": time.strftime('%Y-%m-%dT%H:%M:%S'), "python": sys.version.split()[0],
+                  "fixture": fixture, "stages": results}
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        master_store.atomic_write_json(args.baseline, record)
+        print(f"Baseline recorded: {args.baseline}")
+    elif baseline is not None:
+        failures += check_budget(results, baseline, args.tolerance)
+
+    for failure in failures:
+        print(f"  - {failure}")
+    print(f"Regression: {'OK' if not failures else f'{len(failures)} failures'}")
+    return 0 if not failures else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
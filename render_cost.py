@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import sys
+import time
+import master_store
+
+# Render cost model. update_resume appends one metrics record per render; the planner and
+# batch tools fit per-path lines (time and output size against rows written) to those records
+# to predict a render before running it. JSON only: the planner must not import openpyxl.
+METRICS_PATH = os.path.join('005_ToolOutput', '05_RenderMetrics', 'render_metrics.jsonl')
+BLOCK_ROWS = 5  # update_resume.BLOCK_ROWS
+PATHS = ('openpyxl', 'direct')
+# Records needed before a path's fitted line replaces the default
+CALIBRATION_MIN_SAMPLES = 3
+# Only the most recent records per path are fitted, so template or code changes age out
+CALIBRATION_WINDOW = 200
+# Defaults measured on the synthetic fixture template (31 styled columns), 1-400 entries
+DEFAULT_MODEL = {
+    "openpyxl": {"fixed_seconds": 0.04, "seconds_per_row": 0.00055, "fixed_bytes": 8000, "bytes_per_row": 97},
+    "direct": {"fixed_seconds": 0.005, "seconds_per_row": 0.00004, "fixed_bytes": 8000, "bytes_per_row": 87}
+}
+# Per-row work of the same template: merges and styled cells per history block and footer row
+DEFAULT_SHAPE = {"block_merges": 18, "block_styled": 98, "footer_merges": 1, "footer_styled": 31}
+
+def template_shape(stamp):
+    """Work per history block / footer row of a compiled update_resume stamp."""
+    return {
+        "block_merges": len(stamp["merges"]),
+        "block_styled": len(stamp["styles"]),
+        "footer_merges": len(stamp["footer"]["merges"]),
+        "footer_styled": len(stamp["footer"]["styles"])
+    }
+
+def render_work(master_data, shape=None):
+    """Rows, merges and styled cells the render of master_data writes below the header."""
+    shape = shape or DEFAULT_SHAPE
+    entries = len(master_data.get('work_history', []))
+    # The label row plus one footer row per line (update_resume.plan_region)
+    footer_rows = 1 + len(master_data.get('footer', {}).get('other_col_b', []))
+    return {
+        "entries": entries,
+        "footer_rows": footer_rows,
+        "rows": entries * BLOCK_ROWS + footer_rows,
+        "merges": entries * shape["block_merges"] + footer_rows * shape["footer_merges"],
+        "styled_cells": entries * shape["block_styled"] + footer_rows * shape["footer_styled"]
+    }
+
+def record_render(path, master_data, stamp, seconds, output_bytes, metrics_path=METRICS_PATH):
+    """Appends one render measurement. Never fails the render: errors are only reported."""
+    shape = template_shape(stamp)
+    record = {"recorded_at": time.strftime('%Y-%m-%dT%H:%M:%S'), "path": path,
+              "seconds": round(seconds, 4), "output_bytes": output_bytes, "shape": shape}
+    record.update(render_work(master_data, shape))
+    try:
+        os.makedirs(os.path.dirname(metrics_path) or '.', exist_ok=True)
+        with open(metrics_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f"Warning: render metrics not recorded: {e}")
+    return record
+
+def load_metrics(metrics_path=METRICS_PATH):
+    """Recorded measurements, oldest first. Unreadable lines (e.g. a torn append) are skipped."""
+    records = []
+    try:
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('path') in PATHS and record.get('rows'):
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+def fit_line(xs, ys):
+    """Least-squares (intercept, slope), both kept non-negative. Falls back to a line through
+    the origin when every x is the same."""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return 0.0, mean_y / mean_x if mean_x else 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    if slope < 0:
+        return mean_y, 0.0
+    intercept = mean_y - slope * mean_x
+    if intercept < 0:
+        # Refit through the origin rather than predict negative costs for small sheets
+        return 0.0, sum(x * y for x, y in zip(xs, ys)) / sum(x * x for x in xs)
+    return intercept, slope
+
+def calibrate(records):
+    """Cost model from recorded measurements: per-path coefficients plus the latest template shape."""
+    model = {"paths": {}, "shape": dict(DEFAULT_SHAPE)}
+    for path in PATHS:
+        samples = [r for r in records if r['path'] == path][-CALIBRATION_WINDOW:]
+        coefficients = dict(DEFAULT_MODEL[path], samples=len(samples), calibrated=False)
+        if len(samples) >= CALIBRATION_MIN_SAMPLES:
+            rows = [r['rows'] for r in samples]
+            coefficients["fixed_seconds"], coefficients["seconds_per_row"] = fit_line(rows, [r['seconds'] for r in samples])
+            coefficients["fixed_bytes"], coefficients["bytes_per_row"] = fit_line(rows, [r['output_bytes'] for r in samples])
+            coefficients["calibrated"] = True
+        model["paths"][path] = coefficients
+    if records:
+        model["shape"] = records[-1].get('shape') or model["shape"]
+    return model
+
+def load_model(metrics_path=METRICS_PATH):
+    return calibrate(load_metrics(metrics_path))
+
+def estimate(master_data, model=None, path='openpyxl'):
+    """Predicted render work, time and output size of master_data on one render path."""
+    model = model or calibrate([])
+    coefficients = model["paths"][path]
+    result = {"path": path}
+    result.update(render_work(master_data, model["shape"]))
+    result["seconds"] = round(coefficients["fixed_seconds"] + coefficients["seconds_per_row"] * result["rows"], 3)
+    result["output_bytes"] = int(coefficients["fixed_bytes"] + coefficients["bytes_per_row"] * result["rows"])
+    result["calibrated"] = coefficients["calibrated"]
+    result["samples"] = coefficients["samples"]
+    return result
+
+def print_estimate(result, label="Render estimate"):
+    basis = f"{result['samples']} recorded runs" if result['calibrated'] else "default model"
+    print(f"{label} ({result['path']}): {result['rows']} rows, {result['merges']} merges, "
+          f"{result['styled_cells']} styled cells, ~{result['seconds']:.2f}s, ~{result['output_bytes'] / 1024:.0f} KB ({basis})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict render cost per master, most expensive first.")
+    parser.add_argument('masters', nargs='+')
+    parser.add_argument('--metrics', default=METRICS_PATH)
+    parser.add_argument('--direct', action='store_true', help="Estimate the direct emitter path.")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    model = load_model(args.metrics)
+    path = 'direct' if args.direct else 'openpyxl'
+    results = []
+    for master_path in args.masters:
+        result = estimate(master_store.load_master(master_path), model, path)
+        result["master"] = master_path
+        results.append(result)
+    results.sort(key=lambda r: r["seconds"], reverse=True)
+    if args.json:
+        print(json.dumps({"model": model, "estimates": results}, indent=2, ensure_ascii=False))
+        return 0
+    for result in results:
+        print_estimate(result, result["master"])
+    print(f"Total: ~{sum(r['seconds'] for r in results):.2f}s, ~{sum(r['output_bytes'] for r in results) / 1024:.0f} KB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import argparse
+import copy
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sheet_emitter
+import stamp_cache
+import update_resume
+from master_store import merge_data
+
+# Local render daemon: keeps template workbooks and compiled stamps warm between requests
+HOST = '127.0.0.1'
+PORT = 8765
+MAX_TEMPLATES = 8
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+class WarmTemplate:
+    """One loaded template workbook, its compiled _Template stamp and a lock (renders mutate the workbook)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        self.package, self.wb = update_resume.open_template(path)
+        if not update_resume.check_sheets(self.wb):
+            raise ValueError(f"Template {path} lacks {update_resume.TARGET_SHEET_NAME}/{update_resume.TEMPLATE_SHEET_NAME}")
+        self.stamp = stamp_cache.load_stamp(self.package, self.wb)
+        self.lock = threading.Lock()
+        self._emitter = None
+
+    def emitter(self):
+        """Direct sheet-XML emitter, built on first use (call with the lock held)."""
+        if self._emitter is None:
+            self._emitter = sheet_emitter.SheetEmitter(self.package, self.wb, self.stamp)
+        return self._emitter
+
+class TemplateCache:
+    """LRU of WarmTemplate keyed by path; reloads a template when its file changes."""
+
+    def __init__(self, max_entries=MAX_TEMPLATES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.mtime == mtime:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry
+        # Load outside the cache lock so other templates stay available meanwhile
+        entry = WarmTemplate(path)
+        with self.lock:
+            self.misses += 1
+            self.entries[path] = entry
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self.lock:
+            return {"templates": list(self.entries), "hits": self.hits, "misses": self.misses}
+
+def render_bytes(cache, master_data, update_data=None, template_path=None, direct=False):
+    """Merges (in memory only) and renders on a warm workbook. Returns the xlsx bytes."""
+    master_data = copy.deepcopy(master_data)
+    if update_data:
+        master_data = merge_data(master_data, copy.deepcopy(update_data), verbose=False)
+    template = cache.get(template_path or update_resume.TEMPLATE_EXCEL_PATH)
+    out = io.BytesIO()
+    with template.lock:
+        if direct:
+            if sheet_emitter.emit_workbook(template.emitter(), master_data, out):
+                return out.getvalue()
+        update_resume.render_workbook(template.wb, master_data, template.stamp)
+        update_resume.save_workbook(template.wb, out, template.package)
+    return out.getvalue()
+
+def make_handler(cache):
+    class RenderHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {"status": "ok", **cache.stats()})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            """POST /render {"master": {...}, "update": {...}?, "template": "path"?, "direct": bool?} -> xlsx."""
+            if self.path != '/render':
+                self._send_json(404, {"error": "not found"})
+                return
+            started = time.perf_counter()
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length).decode('utf-8'))
+                body = render_bytes(cache, request['master'], request.get('update'), request.get('template'), bool(request.get('direct')))
+            except (KeyError, ValueError, FileNotFoundError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', XLSX_MIME)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('X-Render-Ms', f"{(time.perf_counter() - started) * 1000:.1f}")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            print(f"[render_service] {self.address_string()} {format % args}")
+
+    return RenderHandler
+
+def serve(host=HOST, port=PORT, preload=(), max_templates=MAX_TEMPLATES):
+    cache = TemplateCache(max_templates)
+    for path in preload:
+        cache.get(path)
+        print(f"Preloaded template: {path}")
+    server = ThreadingHTTPServer((host, port), make_handler(cache))
+    print(f"Render service listening on http://{host}:{port} (POST /render, GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm-template render daemon for resume workbooks.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--max-templates', type=int, default=MAX_TEMPLATES)
+    parser.add_argument('--preload', nargs='*', default=[], help="Template workbooks to load at startup.")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.preload, args.max_templates)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+import master_store
+import periods
+import skill_index
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Whole-roster analytics on column arrays instead of nested master dicts. One row per
+# work_history entry; multi-valued columns (technology terms, roles, titles) are stored as
+# offsets + interned term ids. Aggregations use NumPy when installed, plain loops otherwise.
+# A binary cache (JSON header + raw int32 columns) reloads an unchanged roster without parsing JSON.
+ROSTER_CACHE_PATH = os.path.join('005_ToolOutput', '04_SkillIndex', 'roster_columns.bin')
+CACHE_MAGIC = b'RSTC'
+CACHE_VERSION = 2
+HEADER = struct.Struct('<4sII')  # magic, version, header JSON length
+NO_KEY = -1
+
+def _lines(entry, field):
+    return [line for line in (entry.get('business_content', {}).get(field) or []) if isinstance(line, str)]
+
+def tech_terms(entry):
+    """One canonical term per technology token. Unlike skill_index.entry_terms (built for search),
+    whole cells and '/' fragments are left out, so 'SAP S/4HANA' counts once as sap and s/4hana."""
+    tech = entry.get('technology', {})
+    terms = set()
+    for field in skill_index.TECH_FIELDS:
+        for line in tech.get(field, []) or []:
+            if isinstance(line, str):
+                terms.update(token for token in skill_index.TOKEN_SPLIT.split(skill_index.normalize_term(line)) if token)
+    return terms
+
+ENTRY_COLUMNS = ('candidate', 'entry_no', 'start', 'end', 'ongoing')
+TERM_COLUMNS = {
+    # column -> terms of one entry
+    'tech': tech_terms,
+    'role': lambda entry: {t for t in map(skill_index.normalize_term, _lines(entry, 'role_col_f')) if t},
+    'title': lambda entry: {t for t in map(skill_index.normalize_term, _lines(entry, 'title_col_e')) if t},
+}
+
+def source_signature(path):
+    """Stat of the master and its oplog; the cache is reused only while both are unchanged."""
+    signature = []
+    for part in (path, path + master_store.OPLOG_SUFFIX):
+        try:
+            st = os.stat(part)
+            signature.append([st.st_mtime_ns, st.st_size])
+        except FileNotFoundError:
+            signature.append(None)
+    return signature
+
+class Roster:
+    """Column arrays for many masters. Entry columns are int32 arrays of one value per entry;
+    each term column is (offsets, ids) with ids interned in vocab[column]."""
+
+    def __init__(self):
+        self.candidates = []
+        self.sources = []
+        self.signatures = []
+        self.columns = {name: array('i') for name in ENTRY_COLUMNS}
+        self.vocab = {name: [] for name in TERM_COLUMNS}
+        self.term_ids = {name: {} for name in TERM_COLUMNS}
+        self.offsets = {name: array('i', [0]) for name in TERM_COLUMNS}
+        self.ids = {name: array('i') for name in TERM_COLUMNS}
+
+    def __len__(self):
+        return len(self.columns['candidate'])
+
+    def intern(self, column, term):
+        term_id = self.term_ids[column].get(term)
+        if term_id is None:
+            term_id = self.term_ids[column][term] = len(self.vocab[column])
+            self.vocab[column].append(term)
+        return term_id
+
+    def add_master(self, master_data, path):
+        candidate = len(self.candidates)
+        self.candidates.append(skill_index.candidate_id_for(master_data, path))
+        self.sources.append(path)
+        self.signatures.append(source_signature(path))
+        columns = self.columns
+        for entry in master_data.get('work_history', []):
+            no, start, end = skill_index.entry_posting(entry)
+            columns['candidate'].append(candidate)
+            columns['entry_no'].append(int(no) if str(no).isdigit() else NO_KEY)
+            columns['start'].append(NO_KEY if start is None else start)
+            columns['end'].append(NO_KEY if end is None else end)
+            columns['ongoing'].append(1 if end is None and start is not None else 0)
+            for column, terms_of in TERM_COLUMNS.items():
+                ids = self.ids[column]
+                # Sorted so equal entries produce identical columns (stable cache bytes)
+                ids.extend(self.intern(column, term) for term in sorted(terms_of(entry)))
+                self.offsets[column].append(len(ids))
+
+    # --- cache file ---
+
+    def _arrays(self):
+        for name in ENTRY_COLUMNS:
+            yield name, self.columns[name]
+        for name in TERM_COLUMNS:
+            yield f'{name}.offsets', self.offsets[name]
+            yield f'{name}.ids', self.ids[name]
+
+    def save(self, path=ROSTER_CACHE_PATH):
+        header = {
+            "candidates": self.candidates, "sources": self.sources, "signatures": self.signatures,
+            "vocab": self.vocab, "arrays": [[name, len(values)] for name, values in self._arrays()]
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for _, values in self._arrays():
+                if sys.byteorder != 'little':
+                    values = array('i', values)
+                    values.byteswap()
+                f.write(values.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=ROSTER_CACHE_PATH):
+        """Reads a cache file, or None if it is missing, truncated, corrupt or from another format version."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            return cls._from_bytes(data)
+        except (struct.error, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def _from_bytes(cls, data):
+        magic, version, header_len = HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            return None
+        header = json.loads(data[HEADER.size:HEADER.size + header_len].decode('utf-8'))
+        roster = cls()
+        roster.candidates, roster.sources, roster.signatures = header["candidates"], header["sources"], header["signatures"]
+        roster.vocab = header["vocab"]
+        roster.term_ids = {name: {term: i for i, term in enumerate(terms)} for name, terms in roster.vocab.items()}
+        position = HEADER.size + header_len
+        for name, length in header["arrays"]:
+            values = array('i')
+            if position + length * values.itemsize > len(data):
+                raise ValueError("truncated roster cache")
+            values.frombytes(data[position:position + length * values.itemsize])
+            if sys.byteorder != 'little':
+                values.byteswap()
+            position += length * values.itemsize
+            column, _, part = name.partition('.')
+            if part == 'offsets':
+                roster.offsets[column] = values
+            elif part == 'ids':
+                roster.ids[column] = values
+            else:
+                roster.columns[name] = values
+        return roster
+
+    def is_current(self, paths):
+        return self.sources == list(paths) and all(source_signature(p) == s for p, s in zip(paths, self.signatures))
+
+def build_roster(paths):
+    roster = Roster()
+    for path in paths:
+        roster.add_master(master_store.load_master(path), path)
+    return roster
+
+def load_roster(paths, cache_path=ROSTER_CACHE_PATH, refresh=False):
+    """Roster for paths, from the cache while every master (and oplog) is unchanged.
+    Returns (roster, from_cache)."""
+    paths = list(paths)
+    if not refresh:
+        roster = Roster.load(cache_path)
+        if roster is not None and roster.is_current(paths):
+            return roster, True
+    roster = build_roster(paths)
+    if cache_path:
+        roster.save(cache_path)
+    return roster, False
+
+# --- queries ---
+
+def entry_months(roster, present=None):
+    """Months per entry (inclusive; ongoing entries run to `present`), 0 when undated."""
+    present = periods.current_key() if present is None else present
+    start, end, ongoing = (roster.columns[name] for name in ('start', 'end', 'ongoing'))
+    if numpy is not None:
+        start = numpy.asarray(start, dtype=numpy.int64)
+        end = numpy.where(numpy.asarray(ongoing, dtype=bool), present, numpy.asarray(end, dtype=numpy.int64))
+        return numpy.where(start == NO_KEY, 0, numpy.maximum(end - start + 1, 0))
+    return [0 if s == NO_KEY else max((present if o else e) - s + 1, 0) for s, e, o in zip(start, end, ongoing)]
+
+def term_entries(roster, column):
+    """(entry index per term posting, term id per posting) of one term column."""
+    offsets, ids = roster.offsets[column], roster.ids[column]
+    if numpy is not None:
+        counts = numpy.diff(numpy.asarray(offsets, dtype=numpy.int64))
+        return numpy.repeat(numpy.arange(len(counts)), counts), numpy.asarray(ids, dtype=numpy.int64)
+    entries = [i for i in range(len(offsets) - 1) for _ in range(offsets[i + 1] - offsets[i])]
+    return entries, ids
+
+def years_per_term(roster, column='tech', present=None):
+    """{term: entry-years}: months of every entry using the term, summed (parallel projects add up)."""
+    months = entry_months(roster, present)
+    entries, ids = term_entries(roster, column)
+    if numpy is not None:
+        totals = numpy.bincount(ids, weights=months[entries], minlength=len(roster.vocab[column]))
+        return {term: round(float(total) / 12, 2) for term, total in zip(roster.vocab[column], totals) if total}
+    totals = [0] * len(roster.vocab[column])
+    for entry, term_id in zip(entries, ids):
+        totals[term_id] += months[entry]
+    return {term: round(total / 12, 2) for term, total in zip(roster.vocab[column], totals) if total}
+
+def term_counts(roster, column='role'):
+    """{term: number of entries carrying it}."""
+    ids = roster.ids[column]
+    if numpy is not None:
+        counts = numpy.bincount(numpy.asarray(ids, dtype=numpy.int64), minlength=len(roster.vocab[column]))
+        return {term: int(count) for term, count in zip(roster.vocab[column], counts) if count}
+    counts = [0] * len(roster.vocab[column])
+    for term_id in ids:
+        counts[term_id] += 1
+    return {term: count for term, count in zip(roster.vocab[column], counts) if count}
+
+def active_projects(roster):
+    """{candidate id: ongoing (現在) entries}, candidates without any omitted."""
+    if numpy is not None:
+        candidates = numpy.asarray(roster.columns['candidate'], dtype=numpy.int64)
+        counts = numpy.bincount(candidates, weights=numpy.asarray(roster.columns['ongoing']), minlength=len(roster.candidates))
+        return {cid: int(count) for cid, count in zip(roster.candidates, counts) if count}
+    counts = [0] * len(roster.candidates)
+    for candidate, ongoing in zip(roster.columns['candidate'], roster.columns['ongoing']):
+        counts[candidate] += ongoing
+    return {cid: count for cid, count in zip(roster.candidates, counts) if count}
+
+def top(mapping, limit):
+    return sorted(mapping.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roster statistics from many masters via column arrays.")
+    parser.add_argument('masters', nargs='+')
+    parser.add_argument('--cache', default=ROSTER_CACHE_PATH)
+    parser.add_argument('--refresh', action='store_true', help="Rebuild the cache even if it is current.")
+    parser.add_argument('--query', choices=('years', 'roles', 'titles', 'active'), default='years')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    roster, cached = load_roster(args.masters, args.cache, args.refresh)
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    if args.query == 'years':
+        result = years_per_term(roster, 'tech')
+    elif args.query == 'roles':
+        result = term_counts(roster, 'role')
+    elif args.query == 'titles':
+        result = term_counts(roster, 'title')
+    else:
+        result = active_projects(roster)
+    queried = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(dict(top(result, args.top)), indent=2, ensure_ascii=False))
+        return 0
+    print(f"Roster: {len(roster.candidates)} candidates, {len(roster)} entries "
+          f"({'cache' if cached else 'parsed'} in {loaded * 1000:.0f} ms, query {queried * 1000:.1f} ms, "
+          f"{'numpy' if numpy is not None else 'array'} backend)")
+    for term, value in top(result, args.top):
+        print(f"  {value:>8}  {term}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,429 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import master_store
+import render_cost
+import skill_index
+import update_resume
+
+# Local render job scheduler for roster-wide regeneration (template or footer changes).
+# The queue lives in one JSON file, so an interrupted run resumes where it stopped; jobs run
+# in a process pool (one warm template per worker), most urgent first, within a worker and
+# estimated-memory budget, with retries and backoff for transient failures.
+SCHEDULER_DIR = os.path.join('005_ToolOutput', '06_Scheduler')
+QUEUE_PATH = os.path.join(SCHEDULER_DIR, 'queue.json')
+METRICS_NAME = 'metrics.json'
+RUN_LOCK_SUFFIX = '.run.lock'
+PRIORITIES = {'urgent': 0, 'normal': 1, 'bulk': 2}
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 5.0
+POLL_INTERVAL = 0.5
+DEFAULT_MEMORY_MB = 2048
+# Per-job memory estimate: worker process with openpyxl and a warm template, plus the sheet.
+# Measured with tracemalloc/RSS on the synthetic fixtures (about 15 MB per 1000 rows).
+WORKER_BASE_MB = 80
+MB_PER_1000_ROWS = 16
+
+class JobQueue:
+    """The persisted queue. New jobs only go in through enqueue(), which appends them on disk
+    under the queue lock; the runner, the only writer of existing jobs, saves its view with
+    sync(), which also picks up jobs enqueued from another process meanwhile."""
+
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        self.lock_path = path + master_store.LOCK_SUFFIX
+        self.jobs = {}
+        self.next_id = 1
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"next_id": 1, "jobs": []}
+
+    def load(self):
+        with master_store.file_lock(self.lock_path):
+            state = self._read()
+        self.next_id = state["next_id"]
+        self.jobs = {job["id"]: job for job in state["jobs"]}
+        return self
+
+    def sync(self):
+        """Writes this process's view, merged with jobs added on disk since the last sync."""
+        with master_store.file_lock(self.lock_path):
+            state = self._read()
+            for job in state["jobs"]:
+                self.jobs.setdefault(job["id"], job)
+            self.next_id = max(self.next_id, state["next_id"])
+            master_store.atomic_write_json(self.path, {"next_id": self.next_id, "jobs": list(self.jobs.values())})
+
+    def enqueue(self, jobs):
+        """Appends jobs to the queue file. Ids come from the on-disk next_id inside one locked
+        read-modify-write, so concurrent enqueues never share an id, and jobs already on disk
+        are written back exactly as read (a running scheduler's states are never reverted)."""
+        with master_store.file_lock(self.lock_path):
+            state = self._read()
+            for job in jobs:
+                job["id"] = state["next_id"]
+                state["next_id"] += 1
+                state["jobs"].append(job)
+            master_store.atomic_write_json(self.path, state)
+        self.next_id = state["next_id"]
+        self.jobs = {job["id"]: job for job in state["jobs"]}
+        return jobs
+
+    def recover(self):
+        """Jobs left 'running' by an interrupted run go back to the queue."""
+        recovered = 0
+        for job in self.jobs.values():
+            if job["state"] == 'running':
+                job["state"] = 'queued'
+                recovered += 1
+        return recovered
+
+    def runnable(self, now):
+        """Queued jobs due now: by priority, then longest estimate first (shortens the tail)."""
+        due = [job for job in self.jobs.values() if job["state"] == 'queued' and job["retry_at"] <= now]
+        return sorted(due, key=lambda job: (job["priority"], -job["estimate"]["seconds"], job["id"]))
+
+    def next_retry(self):
+        waiting = [job["retry_at"] for job in self.jobs.values() if job["state"] == 'queued']
+        return min(waiting) if waiting else None
+
+    def counts(self):
+        counts = {state: 0 for state in ('queued', 'running', 'done', 'failed')}
+        for job in self.jobs.values():
+            counts[job["state"]] += 1
+        return counts
+
+def estimate_memory_mb(rows):
+    return WORKER_BASE_MB + rows * MB_PER_1000_ROWS / 1000
+
+def new_job(master_path, update_path=None, template_path=update_resume.TEMPLATE_EXCEL_PATH, output_dir='.',
+            priority='normal', direct=False, model=None, output_id=None):
+    """A queued job for one master, with its render estimate (raises if the master is unreadable).
+    output_id names the output file (default: the candidate id)."""
+    store = master_store.MasterStore(master_path)
+    master_data = store.load()
+    estimate = render_cost.estimate(master_data, model, 'direct' if direct else 'openpyxl')
+    return {
+        "master": master_path,
+        "update": update_path,
+        "template": template_path,
+        "output_dir": output_dir,
+        "output_id": output_id or skill_index.candidate_id_for(master_data, master_path),
+        "direct": direct,
+        "priority": PRIORITIES[priority],
+        "state": 'queued',
+        "attempts": 0,
+        "retry_at": 0,
+        # An update is applied only on top of the revision seen at enqueue time, so a retry
+        # after a crash cannot merge it twice (it fails with a conflict instead)
+        "base_revision": master_data.get('meta', {}).get('revision', 0) if update_path else None,
+        "applied_revision": None,
+        "estimate": {"seconds": estimate["seconds"], "rows": estimate["rows"],
+                     "memory_mb": round(estimate_memory_mb(estimate["rows"]), 1)},
+        "enqueued_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "output": None,
+        "error": None
+    }
+
+# --- worker process ---
+
+_cache = None
+
+def _template_cache():
+    global _cache
+    if _cache is None:
+        import render_service
+        _cache = render_service.TemplateCache()
+    return _cache
+
+def is_transient(error):
+    """Failures worth retrying: locks held elsewhere, files open in Excel, timeouts."""
+    return isinstance(error, (master_store.LockTimeoutError, PermissionError, TimeoutError, InterruptedError, BlockingIOError))
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def run_job(job):
+    """Worker: applies the job's update (once) and renders its master. Never raises; returns a result dict."""
+    import render_service
+
+    started = time.perf_counter()
+    result = {"id": job["id"], "status": 'done', "error": None, "transient": False,
+              "applied_revision": job["applied_revision"], "output": None, "bytes": 0}
+    try:
+        # The render's own progress lines would interleave across workers
+        with contextlib.redirect_stdout(io.StringIO()):
+            store = master_store.MasterStore(job["master"])
+            if job["update"] and job["applied_revision"] is None:
+                update_data = update_resume.load_json(job["update"])
+                master_data = store.append_update(update_data, verbose=False, expected_revision=job["base_revision"])
+                result["applied_revision"] = master_store.revision_of(master_data)
+                skill_index.update_index_file(master_data, job["master"])
+            else:
+                master_data = store.load()
+            body = render_service.render_bytes(_template_cache(), master_data, template_path=job["template"], direct=job["direct"])
+        output_id = job.get("output_id") or skill_index.candidate_id_for(master_data, job["master"])
+        output = update_resume.output_filename_for(output_id, job["output_dir"])
+        master_store.atomic_write_bytes(output, body)
+        result["output"] = output
+        result["bytes"] = len(body)
+    except Exception as e:
+        result["status"] = 'failed'
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["transient"] = is_transient(e)
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+# --- scheduler ---
+
+class RunStats:
+    """Progress and throughput of one run."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.started = time.monotonic()
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rows = 0
+        self.bytes = 0
+        self.render_seconds = 0.0
+        self.peak_rss_mb = None
+
+    def record(self, job, result):
+        if result["status"] == 'done':
+            self.completed += 1
+            self.rows += job["estimate"]["rows"]
+            self.bytes += result["bytes"]
+        elif job["state"] == 'queued':
+            self.retries += 1
+        else:
+            self.failed += 1
+        self.render_seconds += result.get("seconds", 0)
+        if result.get("peak_rss_mb") is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0, result["peak_rss_mb"])
+
+    def metrics(self, workers):
+        elapsed = time.monotonic() - self.started
+        remaining = [job["estimate"]["seconds"] for job in self.queue.jobs.values() if job["state"] in ('queued', 'running')]
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": round(elapsed, 2),
+            "workers": workers,
+            "jobs": self.queue.counts(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "jobs_per_minute": round(self.completed * 60 / elapsed, 2) if elapsed else None,
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed else None,
+            "output_bytes": self.bytes,
+            "worker_peak_rss_mb": self.peak_rss_mb,
+            "eta_seconds": round(sum(remaining) / max(1, workers), 1)
+        }
+
+def finish(job, result, max_attempts, retry_delay):
+    """Applies a worker result to its job: done, re-queued with backoff, or failed."""
+    job["applied_revision"] = result["applied_revision"]
+    job["error"] = result["error"]
+    job["finished_at"] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    if result["status"] == 'done':
+        job["state"] = 'done'
+        job["output"] = result["output"]
+    elif result["transient"] and job["attempts"] < max_attempts:
+        job["state"] = 'queued'
+        job["retry_at"] = time.time() + retry_delay * 2 ** (job["attempts"] - 1)
+    else:
+        job["state"] = 'failed'
+
+def run(queue_path=QUEUE_PATH, workers=None, memory_mb=DEFAULT_MEMORY_MB, max_attempts=MAX_ATTEMPTS,
+        retry_delay=RETRY_DELAY, stop=None):
+    """Runs queued jobs until none are left (or stop, a threading.Event, is set). Returns the metrics."""
+    workers = workers or os.cpu_count() or 1
+    queue = JobQueue(queue_path).load()
+    metrics_path = os.path.join(os.path.dirname(queue_path) or '.', METRICS_NAME)
+    # One runner per queue; enqueue stays possible meanwhile (it only takes the queue lock)
+    with master_store.file_lock(queue_path + RUN_LOCK_SUFFIX, timeout=0):
+        recovered = queue.recover()
+        if recovered:
+            print(f"Resuming: {recovered} interrupted jobs re-queued")
+        stats = RunStats(queue)
+        running = {}
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            while not (stop and stop.is_set()):
+                queue.sync()
+                used_mb = sum(job["estimate"]["memory_mb"] for job in running.values())
+                for job in queue.runnable(time.time()):
+                    if len(running) >= workers:
+                        break
+                    # A job that does not fit waits for memory; smaller ones may still go ahead
+                    if running and used_mb + job["estimate"]["memory_mb"] > memory_mb:
+                        continue
+                    job["state"] = 'running'
+                    job["attempts"] += 1
+                    job["started_at"] = time.strftime('%Y-%m-%dT%H:%M:%S')
+                    used_mb += job["estimate"]["memory_mb"]
+                    running[pool.submit(run_job, job)] = job
+                queue.sync()
+                if not running:
+                    next_retry = queue.next_retry()
+                    if next_retry is None:
+                        break
+                    time.sleep(min(max(0.0, next_retry - time.time()), POLL_INTERVAL))
+                    continue
+
+                done, _ = wait(running, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        # A worker died (e.g. killed for memory); every job it shared the pool with is retried
+                        broken = True
+                        result = {"status": 'failed', "error": f"BrokenProcessPool: {e}", "transient": True,
+                                  "applied_revision": job["applied_revision"]}
+                    finish(job, result, max_attempts, retry_delay)
+                    stats.record(job, result)
+                    print_progress(job, result, stats.metrics(workers))
+                if broken and not running:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                queue.sync()
+                master_store.atomic_write_json(metrics_path, stats.metrics(workers))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Jobs still in flight (stop or Ctrl+C) are re-queued by the next run's recover()
+            queue.sync()
+        metrics = stats.metrics(workers)
+        master_store.atomic_write_json(metrics_path, metrics)
+    return metrics
+
+def print_progress(job, result, metrics):
+    jobs = metrics["jobs"]
+    total = sum(jobs.values())
+    state = job["state"] if result["status"] != 'done' else 'done'
+    detail = result["output"] if result["status"] == 'done' else result["error"]
+    print(f"[{jobs['done'] + jobs['failed']}/{total}] {state} #{job['id']} {job['master']} ({result.get('seconds', 0):.2f}s): {detail}")
+    print(f"  {metrics['jobs_per_minute']} jobs/min, {metrics['rows_per_second']} rows/s, ETA ~{metrics['eta_seconds']:.0f}s")
+
+def print_status(queue_path=QUEUE_PATH):
+    queue = JobQueue(queue_path).load()
+    counts = queue.counts()
+    print("Jobs: " + ", ".join(f"{state}={count}" for state, count in counts.items()))
+    remaining = [job for job in queue.jobs.values() if job["state"] in ('queued', 'running')]
+    if remaining:
+        print(f"Remaining estimate: ~{sum(job['estimate']['seconds'] for job in remaining):.1f}s render time")
+    for job in queue.jobs.values():
+        if job["state"] == 'failed':
+            print(f"  - failed #{job['id']} {job['master']} after {job['attempts']} attempts: {job['error']}")
+    metrics_path = os.path.join(os.path.dirname(queue_path) or '.', METRICS_NAME)
+    if os.path.exists(metrics_path):
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+        print(f"Last run: {metrics['started_at']}, {metrics['completed']} done, {metrics['failed']} failed, "
+              f"{metrics['retries']} retries, {metrics['jobs_per_minute']} jobs/min")
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queue and run render jobs with priorities and resource limits.")
+    parser.add_argument('--queue', default=QUEUE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('enqueue', help="Queue one render job per master.")
+    p.add_argument('masters', nargs='+')
+    p.add_argument('--update', default=None, help="Update JSON merged into each master before rendering.")
+    p.add_argument('--template', default=update_resume.TEMPLATE_EXCEL_PATH)
+    p.add_argument('--output-dir', default='.')
+    p.add_argument('--priority', choices=list(PRIORITIES), default='normal')
+    p.add_argument('--direct', action='store_true')
+    p.add_argument('--metrics', default=render_cost.METRICS_PATH, help="Render metrics used for the estimates.")
+
+    p = sub.add_parser('run', help="Run queued jobs until the queue is empty.")
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_MB, help="Budget for the running jobs' estimated memory.")
+    p.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+    p.add_argument('--retry-delay', type=float, default=RETRY_DELAY)
+
+    sub.add_parser('status', help="Show queue counts, failures and the last run's metrics.")
+    sub.add_parser('retry-failed', help="Re-queue failed jobs.")
+    sub.add_parser('clear', help="Drop finished jobs from the queue.")
+    args = parser.parse_args(argv)
+
+    if args.command == 'enqueue':
+        model = render_cost.load_model(args.metrics)
+        queue = JobQueue(args.queue).load()
+        try:
+            output_ids = skill_index.batch_output_ids(args.masters)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        # Outputs still to be written by other masters' jobs
+        pending = {(os.path.abspath(job["output_dir"]), job.get("output_id")): job for job in queue.jobs.values()
+                   if job["state"] in ('queued', 'running')}
+        failures = 0
+        jobs = []
+        for master_path in args.masters:
+            taken = pending.get((os.path.abspath(args.output_dir), output_ids.get(master_path)))
+            if taken and os.path.abspath(taken["master"]) != os.path.abspath(master_path):
+                failures += 1
+                print(f"Error: {master_path}: would write the same output as queued job #{taken['id']} ({taken['master']})")
+                continue
+            try:
+                jobs.append(new_job(master_path, args.update, args.template, args.output_dir, args.priority, args.direct, model,
+                                    output_ids.get(master_path)))
+            except (OSError, ValueError, KeyError) as e:
+                failures += 1
+                print(f"Error: {master_path}: {e}")
+        for job in queue.enqueue(jobs):
+            print(f"Queued #{job['id']} {job['master']} ({args.priority}, ~{job['estimate']['seconds']:.2f}s, ~{job['estimate']['memory_mb']:.0f} MB)")
+        return 0 if failures == 0 else 1
+    if args.command == 'run':
+        try:
+            metrics = run(args.queue, args.workers, args.memory_mb, args.max_attempts, args.retry_delay)
+        except master_store.LockTimeoutError:
+            print(f"Error: another scheduler is already running {args.queue}")
+            return 1
+        except KeyboardInterrupt:
+            print("Interrupted; the next run resumes the remaining jobs.")
+            return 1
+        print(f"\nRun: {metrics['completed']} done, {metrics['failed']} failed, {metrics['retries']} retries "
+              f"in {metrics['elapsed_seconds']:.1f}s ({metrics['jobs_per_minute']} jobs/min)")
+        return 0 if metrics['failed'] == 0 else 1
+    if args.command == 'status':
+        print_status(args.queue)
+        return 0
+
+    # retry-failed / clear rewrite finished jobs, so they wait for any running scheduler
+    queue = JobQueue(args.queue)
+    with master_store.file_lock(args.queue + RUN_LOCK_SUFFIX), master_store.file_lock(queue.lock_path):
+        state = queue._read()
+        if args.command == 'retry-failed':
+            for job in state["jobs"]:
+                if job["state"] == 'failed':
+                    job.update(state='queued', attempts=0, retry_at=0)
+        else:
+            state["jobs"] = [job for job in state["jobs"] if job["state"] not in ('done', 'failed')]
+        master_store.atomic_write_json(queue.path, state)
+    print_status(args.queue)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
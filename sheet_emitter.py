@@ -0,0 +1,294 @@
+import argparse
+import io
+import re
+import sys
+import time
+from xml.sax.saxutils import escape, quoteattr
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, ERROR_CODES
+from openpyxl.compat import safe_string
+from openpyxl.styles.stylesheet import write_stylesheet
+from openpyxl.utils import get_column_letter, range_boundaries
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.xml.functions import tostring
+import template_package
+import update_resume
+
+# Fast path: the target sheet's history and footer rows are streamed as XML straight from
+# a per-workbook block stamp and the master data, without one openpyxl Cell per coordinate.
+# Rows above START_ROW, the sheet header and every other package part are kept verbatim.
+ROW_PATTERN = re.compile(rb'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+ROW_NUMBER = re.compile(rb'\br="(\d+)"')
+ROW_EXTRA_ATTRS = re.compile(rb'\s(?:r|spans)="[^"]*"')
+ROW_START_TAG = re.compile(rb'^<row\b([^>]*?)\s*/?>')
+MERGE_CELLS = re.compile(rb'<mergeCells\b[^>]*?(?:/>|>(.*?)</mergeCells>)', re.S)
+MERGE_REF = re.compile(rb'<mergeCell\s+ref="([^"]+)"\s*/>')
+DIMENSION = re.compile(rb'<dimension\s+ref="([^"]+)"\s*/>')
+SHEET_DATA = re.compile(rb'<sheetData\s*/>|<sheetData>(.*?)</sheetData>', re.S)
+PRE_MERGE_ELEMENTS = (b'<sheetCalcPr', b'<sheetProtection', b'<protectedRanges', b'<scenarios', b'<autoFilter',
+                      b'<sortState', b'<dataConsolidate', b'<customSheetViews')
+
+def split_sheet(xml, first_row=update_resume.START_ROW, part='worksheet'):
+    """Worksheet XML split around sheetData: rows and merges above first_row verbatim, only
+    the height/format attributes of the rows from first_row on, and where mergeCells goes."""
+    data = SHEET_DATA.search(xml)
+    if data is None:
+        raise ValueError(f"{part} has no sheetData")
+    parts = {"head": xml[:data.start()], "tail": xml[data.end():], "kept_rows": [], "row_attrs": {}, "kept_merges": []}
+    for match in ROW_PATTERN.finditer(data.group(1) or b''):
+        row = match.group(0)
+        number = int(ROW_NUMBER.search(row).group(1))
+        if number < first_row:
+            parts["kept_rows"].append(row)
+            continue
+        # Rows below the header are rebuilt; only their height/format attributes survive,
+        # as openpyxl keeps row_dimensions across clean_sheet
+        attrs = ROW_EXTRA_ATTRS.sub(b'', ROW_START_TAG.match(row).group(1)).strip()
+        if attrs:
+            parts["row_attrs"][number] = ' ' + attrs.decode('utf-8')
+    merges = MERGE_CELLS.search(parts["tail"])
+    if merges is not None:
+        for ref in MERGE_REF.findall(merges.group(1) or b''):
+            if range_boundaries(ref.decode('ascii'))[3] < first_row:
+                parts["kept_merges"].append(ref.decode('ascii'))
+        parts["merge_span"] = merges.span()
+    elif parts["tail"].lstrip().startswith(PRE_MERGE_ELEMENTS):
+        raise ValueError(f"Cannot place mergeCells in {part}")
+    else:
+        # mergeCells directly follows sheetData when none of PRE_MERGE_ELEMENTS is present
+        parts["merge_span"] = (0, 0)
+    return parts
+
+def merge_cells_xml(refs):
+    refs = list(refs)
+    if not refs:
+        return b''
+    merges = ''.join(f'<mergeCell ref="{ref}"/>' for ref in refs)
+    return f'<mergeCells count="{len(refs)}">{merges}</mergeCells>'.encode('utf-8')
+
+def truncated_sheet(xml, first_row=update_resume.START_ROW):
+    """The worksheet without its rows and merges from first_row on."""
+    parts = split_sheet(xml, first_row)
+    start, end = parts["merge_span"]
+    return b''.join([parts["head"], b'<sheetData>', *parts["kept_rows"], b'</sheetData>',
+                     parts["tail"][:start], merge_cells_xml(parts["kept_merges"]), parts["tail"][end:]])
+
+def cell_xml(ref, style_attr, value):
+    """One <c> element with the same typing rules openpyxl applies on assignment."""
+    if value is None or value == '':
+        return f'<c r="{ref}"{style_attr}/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style_attr} t="n"><v>{safe_string(value)}</v></c>'
+    if not isinstance(value, str):
+        raise ValueError(f"Cannot convert {value!r} to Excel")
+    value = value[:32767]
+    if ILLEGAL_CHARACTERS_RE.search(value):
+        raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+    if len(value) > 1 and value.startswith('='):
+        return f'<c r="{ref}"{style_attr}><f>{escape(value[1:])}</f><v></v></c>'
+    if value in ERROR_CODES:
+        return f'<c r="{ref}"{style_attr} t="e"><v>{escape(value)}</v></c>'
+    space = ' xml:space="preserve"' if value.strip() and value.strip() != value else ''
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+
+class SheetEmitter:
+    """Block stamp resolved to cell xf ids of one workbook, plus the template sheet XML split
+    around sheetData. Valid for workbooks opened from `package` whose style table it extends.
+    Sheet rows from first_row on are rebuilt (START_ROW, or later to keep rendered rows)."""
+
+    def __init__(self, package, wb, stamp=None, footer_border=update_resume.FOOTER_BORDER, first_row=update_resume.START_ROW):
+        self.package = package
+        self.wb = wb
+        self.first_row = first_row
+        self.part = package.sheet_paths.get(update_resume.TARGET_SHEET_NAME)
+        if stamp is None:
+            stamp = update_resume.compile_template(wb[update_resume.TEMPLATE_SHEET_NAME])
+        self.stamp = stamp
+        self.footer_border = footer_border
+        self.layouts = {}
+        self._split_sheet(package.read(self.part))
+
+    def layout(self, kind, variant, coords):
+        """Per-row cell layout of one segment: [(column letter, style attr, value position)].
+
+        Built once per (kind, border variant, written coordinates) from update_resume's
+        resolved segment, so style ids and merged-cell skips match the openpyxl path.
+        """
+        key = (kind, variant, coords)
+        layout = self.layouts.get(key)
+        if layout is not None:
+            return layout
+        resolved = update_resume.resolve_segment(self.stamp, kind, variant)
+        region = self.stamp if kind == 'block' else self.stamp["footer"]
+        cells = {}
+        for row_off, col, style, merged in resolved["cells"]:
+            # Default-style cells are written without s, as openpyxl does
+            style_attr = f' s="{self.wb._cell_styles.add(style)}"' if any(style) else ''
+            cells[(row_off, col)] = [style_attr, None]
+        for position, coord in enumerate(coords):
+            if coord not in resolved["merged"]:
+                cells.setdefault(coord, ['', None])[1] = position
+        layout = [[] for _ in range(region["rows"])]
+        for (row_off, col), (style_attr, position) in sorted(cells.items()):
+            if style_attr or position is not None:
+                layout[row_off].append((get_column_letter(col), style_attr, position))
+        self.layouts[key] = layout
+        return layout
+
+    def _split_sheet(self, xml):
+        parts = split_sheet(xml, self.first_row, self.part)
+        self.head, self.tail, self.merge_span = parts["head"], parts["tail"], parts["merge_span"]
+        self.kept_rows, self.row_attrs, self.kept_merges = parts["kept_rows"], parts["row_attrs"], parts["kept_merges"]
+
+    def _row(self, number, cells):
+        return f'<row r="{number}"{self.row_attrs.get(number, "")}>{"".join(cells)}</row>'
+
+    def segments(self, master_data):
+        return update_resume.plan_region(master_data, update_resume.START_ROW, self.footer_border)
+
+    def prepare(self, master_data):
+        """Resolves every layout master_data needs, so new xfs exist before styles.xml is written."""
+        for _, kind, variant, values in self.segments(master_data):
+            self.layout(kind, variant, tuple(coord for coord, _ in values))
+
+    def rows(self, master_data):
+        """Yields <row> XML for the history blocks and the footer."""
+        row = update_resume.START_ROW
+        for row, kind, variant, values in self.segments(master_data):
+            layout = self.layout(kind, variant, tuple(coord for coord, _ in values))
+            for row_off, cells in enumerate(layout):
+                number = row + row_off
+                yield self._row(number, (
+                    cell_xml(f'{col}{number}', style_attr, None if position is None else values[position][1])
+                    for col, style_attr, position in cells
+                ))
+            row += len(layout)
+        # Styled but empty rows further down, as openpyxl writes them from row_dimensions
+        for number in sorted(n for n in self.row_attrs if n >= row):
+            yield self._row(number, [])
+
+    def last_row(self, master_data):
+        last = update_resume.START_ROW - 1
+        for row, kind, _, _ in self.segments(master_data):
+            last = row + (update_resume.BLOCK_ROWS if kind == 'block' else 1) - 1
+        return max([last, *self.row_attrs])
+
+    def merge_refs(self, master_data):
+        yield from self.kept_merges
+        for row, kind, _, _ in self.segments(master_data):
+            region = self.stamp if kind == 'block' else self.stamp["footer"]
+            for r0, c0, r1, c1 in region["merges"]:
+                yield f'{get_column_letter(c0)}{row + r0}:{get_column_letter(c1)}{row + r1}'
+
+    def _head(self, master_data):
+        match = DIMENSION.search(self.head)
+        if match is None:
+            return self.head
+        min_col, min_row, max_col, _ = range_boundaries(match.group(1).decode('ascii'))
+        ref = f'{get_column_letter(min_col)}{min_row}:{get_column_letter(max(max_col, 31))}{self.last_row(master_data)}'
+        return self.head[:match.start()] + f'<dimension ref={quoteattr(ref)}/>'.encode('utf-8') + self.head[match.end():]
+
+    def chunks(self, master_data):
+        """The whole worksheet part as a stream of byte chunks."""
+        yield self._head(master_data)
+        yield b'<sheetData>'
+        yield from self.kept_rows
+        for row in self.rows(master_data):
+            yield row.encode('utf-8')
+        yield b'</sheetData>'
+        yield self.tail[:self.merge_span[0]]
+        yield merge_cells_xml(self.merge_refs(master_data))
+        yield self.tail[self.merge_span[1]:]
+
+def can_emit(package, wb):
+    """The fast path needs the target sheet part and an untouched style table prefix."""
+    return package.sheet_paths.get(update_resume.TARGET_SHEET_NAME) is not None and package.can_assemble(wb)
+
+def emit_workbook(emitter, master_data, output):
+    """Writes the rendered package for master_data to output (path or binary file).
+    Returns False when the caller must use the openpyxl path instead."""
+    if not can_emit(emitter.package, emitter.wb):
+        return False
+    emitter.prepare(master_data)
+    replacements = {
+        emitter.part: emitter.chunks(master_data),
+        template_package.STYLES_PART: tostring(write_stylesheet(emitter.wb)),
+    }
+    if hasattr(output, 'write'):
+        emitter.package.assemble(output, replacements)
+    else:
+        with open(output, 'wb') as out:
+            emitter.package.assemble(out, replacements)
+    return True
+
+def _style_key(wb, cell):
+    style = cell._style
+    if style is None:
+        return None
+    return (wb._fonts[style.fontId], wb._fills[style.fillId], wb._borders[style.borderId],
+            wb._alignments[style.alignmentId], wb._protections[style.protectionId], cell.number_format)
+
+def compare_sheets(expected, actual, sheet_name=update_resume.TARGET_SHEET_NAME):
+    """Reopens two rendered workbooks (paths or binary files) and lists differences in
+    values, merged ranges and resolved cell styles of one sheet."""
+    import openpyxl
+    wb_a, wb_b = openpyxl.load_workbook(expected), openpyxl.load_workbook(actual)
+    ws_a, ws_b = wb_a[sheet_name], wb_b[sheet_name]
+    differences = []
+    merges_a = {str(r) for r in ws_a.merged_cells.ranges}
+    merges_b = {str(r) for r in ws_b.merged_cells.ranges}
+    for ref in sorted(merges_a - merges_b):
+        differences.append(f"merge {ref} missing")
+    for ref in sorted(merges_b - merges_a):
+        differences.append(f"merge {ref} unexpected")
+    for row in range(1, max(ws_a.max_row, ws_b.max_row) + 1):
+        for col in range(1, max(ws_a.max_column, ws_b.max_column) + 1):
+            cell_a, cell_b = ws_a.cell(row, col), ws_b.cell(row, col)
+            if cell_a.value != cell_b.value:
+                differences.append(f"{cell_a.coordinate}: value {cell_a.value!r} != {cell_b.value!r}")
+            elif _style_key(wb_a, cell_a) != _style_key(wb_b, cell_b):
+                differences.append(f"{cell_a.coordinate}: style differs")
+    return differences
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a master with the direct sheet-XML emitter.")
+    parser.add_argument('master')
+    parser.add_argument('--template', default=update_resume.TEMPLATE_EXCEL_PATH)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--verify', action='store_true', help="Also render via openpyxl and compare the results.")
+    args = parser.parse_args(argv)
+
+    import master_store
+    master_data = master_store.load_master(args.master)
+    package, wb = update_resume.open_template(args.template)
+    if not update_resume.check_sheets(wb):
+        return 1
+    emitter = SheetEmitter(package, wb)
+
+    started = time.perf_counter()
+    direct = io.BytesIO()
+    if not emit_workbook(emitter, master_data, direct):
+        print("Error: Direct emitter not applicable to this template/master; use update_resume.")
+        return 1
+    print(f"Direct emitter: {(time.perf_counter() - started) * 1000:.1f} ms")
+    output = args.output or update_resume.output_filename_for()
+    with open(output, 'wb') as f:
+        f.write(direct.getvalue())
+    print(f"Saved to {output}")
+
+    if args.verify:
+        started = time.perf_counter()
+        legacy = io.BytesIO()
+        update_resume.render_workbook(wb, master_data, emitter.stamp)
+        update_resume.save_workbook(wb, legacy, package)
+        print(f"openpyxl path: {(time.perf_counter() - started) * 1000:.1f} ms")
+        differences = compare_sheets(legacy, io.BytesIO(direct.getvalue()))
+        for line in differences[:20]:
+            print(f"  - {line}")
+        print(f"Verify: {'OK' if not differences else f'{len(differences)} differences'}")
+        return 0 if not differences else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import unicodedata
+import periods
+import master_store
+
+# Inverted index: technology term -> master key -> [[no, start_key, end_key], ...]. Masters are keyed
+# by their path (index_key), not by candidate id: masters extracted from one source share an id.
+SKILL_INDEX_PATH = os.path.join('005_ToolOutput', '04_SkillIndex', 'skill_index.json')
+INDEX_VERSION = 2
+TECH_FIELDS = ('environment_col_u', 'language_col_z', 'process_col_ae')
+TOKEN_SPLIT = re.compile(r'[\s、,，・;；]+')
+
+_loaded = {}
+
+def normalize_term(text):
+    """NFKC + casefold + collapsed spaces ('Ｓ４/HANA　1709' -> 's4/hana 1709')."""
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+def cell_terms(text):
+    """Terms for one technology cell: the whole cell, each token, and '/' parts of tokens."""
+    cell = normalize_term(text)
+    if not cell:
+        return set()
+    terms = {cell}
+    for token in TOKEN_SPLIT.split(cell):
+        if token:
+            terms.add(token)
+            terms.update(part for part in token.split('/') if part)
+    return terms
+
+def entry_terms(entry):
+    tech = entry.get('technology', {})
+    terms = set()
+    for field in TECH_FIELDS:
+        for line in tech.get(field, []) or []:
+            if isinstance(line, str):
+                terms |= cell_terms(line)
+    return terms
+
+def entry_posting(entry):
+    """[no, start_key, end_key]; end_key is None while the entry is ongoing (現在)."""
+    period = entry.get('period') or {}
+    start = periods.parse_period(period.get('start'))
+    end_text = period.get('end')
+    if isinstance(end_text, str) and end_text.strip() == periods.PRESENT_LABEL:
+        end = None
+    else:
+        end = periods.parse_period(end_text)
+        if end is None:
+            end = start
+    return [entry.get('no'), start, end]
+
+def candidate_id_for(master_data, path=None):
+    """meta.candidate_id, else the source file stem, else the master file stem."""
+    meta = master_data.get('meta', {})
+    if meta.get('candidate_id'):
+        return str(meta['candidate_id'])
+    source = meta.get('source') or path or 'unknown'
+    return os.path.splitext(os.path.basename(source))[0]
+
+def output_ids(candidates):
+    """{master path: id used in output file names} for masters rendered together, from
+    {master path: candidate id}. An id shared by several masters (e.g. two masters extracted
+    from one source) gets the master file stem appended; ValueError if ids still collide."""
+    shared = {}
+    for candidate_id in candidates.values():
+        shared[candidate_id] = shared.get(candidate_id, 0) + 1
+    owners = {}
+    ids = {}
+    for path, candidate_id in candidates.items():
+        output_id = candidate_id
+        if shared[candidate_id] > 1:
+            output_id = f"{candidate_id}_{os.path.splitext(os.path.basename(path))[0]}"
+        if output_id in owners:
+            raise ValueError(f"{path} and {owners[output_id]} would write the same output ({output_id})")
+        owners[output_id] = path
+        ids[path] = output_id
+    return ids
+
+def batch_output_ids(paths):
+    """output_ids of master files, read from their stores. Unreadable masters are left out;
+    rendering them reports the error."""
+    candidates = {}
+    for path in paths:
+        try:
+            candidates[path] = candidate_id_for(master_store.load_master(path), path)
+        except (OSError, ValueError, KeyError):
+            continue
+    return output_ids(candidates)
+
+def index_key(master_path):
+    """Index key of a master: its absolute path."""
+    return os.path.abspath(master_path)
+
+def new_index():
+    return {"version": INDEX_VERSION, "terms": {}, "candidates": {}}
+
+def remove_candidate(index, key):
+    """Drops every posting of one master (touches only that master's terms)."""
+    info = index["candidates"].pop(key, None)
+    if not info:
+        return
+    for term in info["terms"]:
+        postings = index["terms"].get(term)
+        if postings is None:
+            continue
+        postings.pop(key, None)
+        if not postings:
+            del index["terms"][term]
+
+def update_candidate(index, master_path, master_data):
+    """Replaces one master's postings from its current work_history."""
+    key = index_key(master_path)
+    remove_candidate(index, key)
+    terms = index["terms"]
+    seen = set()
+    for entry in master_data.get('work_history', []):
+        posting = entry_posting(entry)
+        for term in entry_terms(entry):
+            terms.setdefault(term, {}).setdefault(key, []).append(posting)
+            seen.add(term)
+    index["candidates"][key] = {
+        "candidate_id": candidate_id_for(master_data, master_path),
+        "source": master_path,
+        "updated_at": datetime.datetime.now().isoformat(timespec='seconds'),
+        "entries": len(master_data.get('work_history', [])),
+        "terms": sorted(seen)
+    }
+    return index
+
+def load_index(path=SKILL_INDEX_PATH):
+    """Loads the index file; reuses the parsed copy while the file is unchanged."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return new_index()
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        print(f"Warning: Skill index version mismatch at {path}. Rebuilding from scratch.")
+        index = new_index()
+    _loaded[path] = (mtime, index)
+    return index
+
+def save_index(index, path=SKILL_INDEX_PATH):
+    """Writes the index atomically (temp file + rename)."""
+    master_store.atomic_write_json(path, index, indent=None)
+    _loaded.pop(path, None)
+
+def update_index_file(master_data, master_path, index_path=SKILL_INDEX_PATH):
+    """Incrementally re-indexes one master after merge_data and persists the index."""
+    candidate_id = candidate_id_for(master_data, master_path)
+    # The index is shared by all candidates, so parallel workers serialise on its lock
+    with master_store.file_lock(index_path + master_store.LOCK_SUFFIX):
+        _loaded.pop(index_path, None)
+        index = load_index(index_path)
+        update_candidate(index, master_path, master_data)
+        save_index(index, index_path)
+    return candidate_id
+
+def update_index_many(masters, index_path=SKILL_INDEX_PATH):
+    """Re-indexes several (master_data, master_path) pairs with one load/save of the index."""
+    candidate_ids = []
+    with master_store.file_lock(index_path + master_store.LOCK_SUFFIX):
+        _loaded.pop(index_path, None)
+        index = load_index(index_path)
+        for master_data, master_path in masters:
+            candidate_id = candidate_id_for(master_data, master_path)
+            update_candidate(index, master_path, master_data)
+            candidate_ids.append(candidate_id)
+        save_index(index, index_path)
+    return candidate_ids
+
+def query(index, terms, years=None, present=None):
+    """Candidates having one entry that mentions ALL terms, optionally within the last N years
+    (years=0: entries running in the current month). Undated entries never match a years filter.
+
+    Returns {master key: [no, ...]} (index["candidates"][key] has its candidate_id and path).
+    """
+    present = periods.current_key() if present is None else present
+    since = present - max(years * 12 - 1, 0) if years is not None else None
+    postings_per_term = []
+    for term in terms:
+        postings = index["terms"].get(normalize_term(term))
+        if not postings:
+            return {}
+        postings_per_term.append(postings)
+    postings_per_term.sort(key=len)
+
+    result = {}
+    for key, first in postings_per_term[0].items():
+        matching = {tuple(p) for p in first}
+        for postings in postings_per_term[1:]:
+            other = postings.get(key)
+            if other is None:
+                matching = None
+                break
+            matching &= {tuple(p) for p in other}
+            if not matching:
+                break
+        if not matching:
+            continue
+        nos = []
+        for no, start, end in matching:
+            if since is not None and (start is None or (present if end is None else end) < since):
+                continue
+            nos.append(no)
+        if nos:
+            result[key] = sorted(nos, key=lambda no: int(no) if str(no).isdigit() else 0)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Technology skill index over resume masters.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="(Re)index master JSON files.")
+    build.add_argument('masters', nargs='+')
+    find = sub.add_parser('query', help="Find candidates by technology terms.")
+    find.add_argument('terms', nargs='+')
+    find.add_argument('--years', type=int, default=None)
+    for p in (build, find):
+        p.add_argument('--index', default=SKILL_INDEX_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        masters = [(master_store.load_master(path), path) for path in args.masters]
+        for candidate_id, path in zip(update_index_many(masters, args.index), args.masters):
+            print(f"Indexed: {candidate_id} ({path})")
+        index = load_index(args.index)
+        print(f"Saved: {args.index} ({len(index['terms'])} terms, {len(index['candidates'])} candidates)")
+        return 0
+
+    if not os.path.exists(args.index):
+        print(f"Error: Skill index not found at {args.index}")
+        return 1
+    index = load_index(args.index)
+    hits = query(index, args.terms, args.years)
+    for key, nos in sorted(hits.items()):
+        info = index["candidates"].get(key, {})
+        print(f"{info.get('candidate_id', key)}: No.{', No.'.join(str(no) for no in nos)} ({info.get('source')})")
+    print(f"Matches: {len(hits)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
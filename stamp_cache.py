@@ -0,0 +1,161 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import openpyxl
+from openpyxl.styles.borders import Border
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils import get_column_letter
+from openpyxl.xml.functions import fromstring, tostring
+import master_store
+import template_package
+import update_resume
+
+# Compiled _Template stamps persisted across processes. The key is a fingerprint of the
+# _Template sheet XML and styles.xml (style ids in a stamp index the load-time style tables),
+# so editing the template workbook selects a new entry and the old one is never read again.
+# Entries also keep every border variant resolve_segment has built; borders are stored by
+# value because resolution appends them to the workbook's table.
+STAMP_CACHE_DIR = os.path.join('005_ToolOutput', '08_TemplateCache')
+# Bump when compile_template / resolve_segment / draw_border change what they produce
+CACHE_VERSION = 1
+MAX_ENTRIES = 20
+BORDER_ID = 2  # StyleArray.borderId
+
+def fingerprint(package):
+    """sha256 of the _Template sheet XML, styles.xml and everything else a stamp depends on."""
+    digest = hashlib.sha256()
+    for part in (package.sheet_paths[update_resume.TEMPLATE_SHEET_NAME], template_package.STYLES_PART):
+        data = package.read(part)
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    digest.update(f"{CACHE_VERSION}|{openpyxl.__version__}|{update_resume.BLOCK_ROWS}|{update_resume.FOOTER_TEMPLATE_ROW}".encode('ascii'))
+    return digest.hexdigest()
+
+def cache_path(key, cache_dir=STAMP_CACHE_DIR):
+    return os.path.join(cache_dir, f"{key}.json")
+
+def _region_to_json(region):
+    return {"styles": [[row_off, col, list(style)] for row_off, col, style in region["styles"]],
+            "merges": [list(merge) for merge in region["merges"]], "rows": region["rows"]}
+
+def _region_from_json(data):
+    return {"styles": [(row_off, col, StyleArray(style)) for row_off, col, style in data["styles"]],
+            "merges": [tuple(merge) for merge in data["merges"]], "rows": data["rows"]}
+
+def _variant_name(key):
+    kind, (top, bottom, outlined) = key
+    return f"{kind}|{int(top)}|{int(bottom)}|{int(outlined)}"
+
+def _variant_key(name):
+    kind, top, bottom, outlined = name.split('|')
+    return kind, (top == '1', bottom == '1', outlined == '1')
+
+def _resolved_to_json(wb, resolved):
+    """Resolved cells with borderId replaced by an index into a list of border XML."""
+    borders, border_index, cells = [], {}, []
+    for row_off, col, style, merged in resolved["cells"]:
+        values = list(style)
+        border_id = values[BORDER_ID]
+        if border_id not in border_index:
+            border_index[border_id] = len(borders)
+            borders.append(tostring(wb._borders[border_id].to_tree()).decode('utf-8'))
+        values[BORDER_ID] = border_index[border_id]
+        cells.append([row_off, col, values, merged])
+    return {"borders": borders, "cells": cells}
+
+def _resolved_loader(wb, data):
+    """Builds the resolved segment on first use, registering its borders with wb as a live
+    resolution would, so unused variants add nothing to the output's style table."""
+    def load():
+        border_ids = [wb._borders.add(Border.from_tree(fromstring(xml))) for xml in data["borders"]]
+        cells = []
+        for row_off, col, values, merged in data["cells"]:
+            style = StyleArray(values)
+            style.borderId = border_ids[values[BORDER_ID]]
+            cells.append((row_off, col, style, merged))
+        return {"cells": cells, "merged": {(r, c) for r, c, _, merged in cells if merged}}
+    return load
+
+def read_entry(key, cache_dir=STAMP_CACHE_DIR):
+    """Stored entry for a fingerprint, or None (missing, unreadable or another version)."""
+    try:
+        with open(cache_path(key, cache_dir), 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("version") != CACHE_VERSION or entry.get("fingerprint") != key:
+        return None
+    return entry
+
+def write_entry(entry, cache_dir=STAMP_CACHE_DIR):
+    """Writes one entry and drops the oldest beyond MAX_ENTRIES. Never fails the render."""
+    try:
+        master_store.atomic_write_json(cache_path(entry["fingerprint"], cache_dir), entry, indent=None)
+        names = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.json')]
+        for path in sorted(names, key=os.path.getmtime)[:-MAX_ENTRIES]:
+            os.remove(path)
+    except OSError as e:
+        print(f"Warning: template stamp not cached: {e}")
+
+def load_stamp(package, wb, cache_dir=STAMP_CACHE_DIR):
+    """Compiled stamp of wb's _Template, from the disk cache when the template is unchanged.
+
+    wb must be a workbook opened from package. On a miss the template is analysed with
+    compile_template and stored; border variants resolved later are added to the entry.
+    """
+    key = fingerprint(package)
+    entry = read_entry(key, cache_dir)
+    if entry is None:
+        stamp = update_resume.compile_template(wb[update_resume.TEMPLATE_SHEET_NAME])
+        entry = {"version": CACHE_VERSION, "fingerprint": key, "template": package.path,
+                 "block": _region_to_json(stamp), "footer": _region_to_json(stamp["footer"]), "resolved": {}}
+        write_entry(entry, cache_dir)
+        stamp["cache_hit"] = False
+    else:
+        stamp = _region_from_json(entry["block"])
+        stamp["footer"] = _region_from_json(entry["footer"])
+        stamp["workbook"] = wb
+        stamp["resolved"] = {}
+        stamp["cached"] = {_variant_key(name): _resolved_loader(wb, data) for name, data in entry["resolved"].items()}
+        stamp["cache_hit"] = True
+    stamp["fingerprint"] = key
+
+    def on_resolve(variant_key, resolved):
+        entry["resolved"][_variant_name(variant_key)] = _resolved_to_json(wb, resolved)
+        write_entry(entry, cache_dir)
+
+    stamp["on_resolve"] = on_resolve
+    return stamp
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show a template's fingerprint, compiled stamp and cache entry.")
+    parser.add_argument('template', nargs='?', default=update_resume.TEMPLATE_EXCEL_PATH)
+    parser.add_argument('--cache-dir', default=STAMP_CACHE_DIR)
+    parser.add_argument('--merges', action='store_true', help="List the block and footer merges.")
+    args = parser.parse_args(argv)
+
+    package = template_package.get_package(args.template)
+    if update_resume.TEMPLATE_SHEET_NAME not in package.sheet_paths:
+        print(f"Error: {args.template} has no {update_resume.TEMPLATE_SHEET_NAME} sheet")
+        return 1
+    key = fingerprint(package)
+    entry = read_entry(key, args.cache_dir)
+    print(f"Template: {args.template}")
+    print(f"Fingerprint: {key}")
+    if entry is None:
+        print("Cache: miss (the next render compiles and stores the stamp)")
+        return 0
+    print(f"Cache: {cache_path(key, args.cache_dir)}")
+    for name in ('block', 'footer'):
+        region = entry[name]
+        print(f"  {name}: {region['rows']} rows, {len(region['styles'])} styled cells, {len(region['merges'])} merges")
+        if args.merges:
+            for min_row_off, min_col, max_row_off, max_col in sorted(region["merges"]):
+                print(f"    {get_column_letter(min_col)}:{get_column_letter(max_col)}, rows +{min_row_off}..+{max_row_off}")
+    print(f"  resolved variants: {', '.join(sorted(entry['resolved'])) or 'none yet'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import argparse
+import csv
+import datetime
+import json
+import os
+import random
+import sys
+
+# Deterministic synthetic fixtures (masters, update payloads, template workbooks, CSV skill
+# sheets) for load tests and benchmarks. Same seed and sizes -> same content, no network.
+DEFAULT_SEED = 20250801
+ANCHOR_MONTH = (2025, 10)       # newest project starts here; no dependency on today's date
+FIXED_TIMESTAMP = datetime.datetime(2025, 8, 1, 9, 0, 0)
+BLOCK_SIZE = 5
+START_ROW = 21
+LAST_COL = 31                   # AE
+
+INDUSTRIES = ['製造（化粧品）', '製造（医療機器）', '流通（食品卸）', '小売（アパレル）', '金融（リース）',
+              '物流（3PL）', '化学（樹脂）', '電機（半導体装置）', '建設（設備）', '公共（水道局）']
+MODULES = ['FI', 'CO', 'MM', 'SD', 'PP', 'QM', 'PM', 'WM', 'HCM', 'BW']
+PROJECT_KINDS = ['導入', '既存改修', 'バージョンアップ', 'S/4HANA移行', '保守・運用', 'ロールアウト', 'アドオン開発']
+TASKS = ['要件定義', '基本設計', '詳細設計', '開発', '単体テスト', '結合テスト管理', 'システムテスト管理（IF／マスタ関連）',
+         'UAT支援', '移行計画策定', 'データ移行', '初期流動対応', '運用保守', '性能改善', '技術的負債の解消（リファクタリング）',
+         'コード解析、影響調査、見積', 'ベンダーコントロール', '進捗・課題管理']
+ENVIRONMENTS = ['SAP ECC 6.0', 'S4/HANA　1709', 'S/4HANA 2020', 'S/4HANA 2022', 'Linux', 'Windows Server 2019',
+                'Oracle 19c', 'SAP HANA 2.0', 'AWS', 'Azure', 'SAP BTP']
+LANGUAGES = ['ABAP', 'ABAP/4', 'ABAP OO', 'SQL', 'Java', 'Python', 'JavaScript', 'SAPUI5', 'CDS View', 'AMDP']
+ROLES = ['アプリ開発チーム', 'SAPコンサルタント', '開発リーダ', 'PMO', 'チームリーダ', 'アーキテクト', 'テストリーダ']
+FOOTER_PHRASES = ['・FI/MM等、複数モジュールにおける要件定義から保守までの経験があります。',
+                  '・10名程度のチームリード実績があります。',
+                  '・開発・検証・移行の各局面において、技術的な観点から課題解決を支援した経験があります。',
+                  '・英語での仕様調整（読み書き）に対応可能です。',
+                  '・資格：応用情報技術者、SAP認定コンサルタント（FI）']
+
+def month_text(key):
+    return f"{key // 12}/{key % 12 + 1}"
+
+def long_text(rng, minimum):
+    """Japanese detail text of at least `minimum` characters, built from TASKS."""
+    parts = []
+    while sum(len(p) + 1 for p in parts) < minimum:
+        parts.append(rng.choice(TASKS))
+    return '、'.join(parts)
+
+def pick(rng, pool, count):
+    return rng.sample(pool, min(count, len(pool)))
+
+def generate_entry(rng, start_key, end_key, present=False, detail_chars=40):
+    """One work_history entry; columns are always 5 lines, like extracted masters."""
+    modules = '/'.join(sorted(pick(rng, MODULES, rng.randint(1, 3))))
+    title = f"{rng.choice(INDUSTRIES)}SAP（{modules}）{rng.choice(PROJECT_KINDS)}"
+    details = [long_text(rng, detail_chars) for _ in range(rng.randint(1, 3))]
+    envs = pick(rng, ENVIRONMENTS, rng.randint(1, 3))
+    langs = pick(rng, LANGUAGES, rng.randint(1, 2))
+    roles = pick(rng, ROLES, rng.randint(1, 3))
+
+    def lines(items, offset=0):
+        column = [''] * offset + items
+        return (column + [''] * BLOCK_SIZE)[:BLOCK_SIZE]
+
+    return {
+        "no": "",
+        "period": {"start": month_text(start_key), "end": "現在" if present else month_text(end_key)},
+        "business_content": {
+            "title_col_e": lines([title]),
+            "role_col_f": lines(["主な役割"], offset=1),
+            "detail_col_g": lines(details, offset=2)
+        },
+        "technology": {
+            "environment_col_u": lines(envs),
+            "language_col_z": lines(langs),
+            "process_col_ae": lines(roles)
+        }
+    }
+
+def generate_master(entries=200, seed=DEFAULT_SEED, footer_lines=3, detail_chars=40):
+    """Newest-first, non-overlapping history ending at ANCHOR_MONTH (the first entry is ongoing)."""
+    rng = random.Random(seed)
+    key = ANCHOR_MONTH[0] * 12 + ANCHOR_MONTH[1] - 1
+    history = []
+    for i in range(entries):
+        length = rng.randint(2, 18)
+        start = key - length + 1
+        history.append(generate_entry(rng, start, key, present=(i == 0), detail_chars=detail_chars))
+        key = start - rng.randint(1, 3)
+    for i, entry in enumerate(history):
+        entry['no'] = str(i + 1)
+    footer = [FOOTER_PHRASES[i % len(FOOTER_PHRASES)] for i in range(footer_lines)]
+    footer += [''] * (BLOCK_SIZE - len(footer))
+    return {
+        "meta": {
+            "source": f"synthetic_{entries}_{seed}.csv",
+            "candidate_id": f"synthetic_{entries}_{seed}",
+            "extracted_at": FIXED_TIMESTAMP.date().isoformat()
+        },
+        "work_history": history,
+        "footer": {"other_col_b": footer}
+    }
+
+def generate_update(master_data, items=20, seed=DEFAULT_SEED, insert_ratio=0.3, detail_chars=120, footer=True):
+    """Mixed INSERT (target_no 0, newest-first) / UPDATE (existing no) payload with long text."""
+    rng = random.Random(seed + 1)
+    history = master_data['work_history']
+    key = ANCHOR_MONTH[0] * 12 + ANCHOR_MONTH[1] + 1
+    payload = []
+    for _ in range(items):
+        if rng.random() < insert_ratio or not history:
+            length = rng.randint(1, 6)
+            payload.append({"action": "INSERT", "target_no": 0,
+                            "data": generate_entry(rng, key, key + length - 1, detail_chars=detail_chars)})
+            key += length + 1
+        else:
+            target = rng.randint(1, len(history))
+            period = history[target - 1]['period']
+            entry = generate_entry(rng, 0, 0, detail_chars=detail_chars)
+            entry['period'] = dict(period)
+            payload.append({"action": "UPDATE", "target_no": target, "data": entry})
+    update = {"update_payload": payload}
+    if footer:
+        update["footer_update"] = {"update_required": True,
+                                   "other_col_b": [long_text(rng, 60) for _ in range(BLOCK_SIZE)]}
+    return update
+
+def build_template_workbook(path, header_rows=START_ROW - 1, existing_entries=0, footer_stamp=False, seed=DEFAULT_SEED):
+    """Writes a workbook with a styled スキルシート header and a 5-row _Template block.
+
+    existing_entries pre-renders that many blocks below the header, as a previously updated
+    sheet would have (exercises clean_sheet). footer_stamp styles _Template row 6.
+    """
+    import openpyxl
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+    thin = Side(style='thin', color='000000')
+    font = Font(name='ＭＳ ゴシック', size=9)
+    wrap = Alignment(vertical='top', wrap_text=True)
+    header_fill = PatternFill('solid', fgColor='DDEBF7')
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'スキルシート'
+    ws['A1'] = '技術経歴書'
+    ws['A1'].font = Font(name='ＭＳ ゴシック', size=14, bold=True)
+    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=LAST_COL)
+    for row in range(2, header_rows):
+        ws.cell(row, 1, f'項目{row - 1}').font = font
+        ws.cell(row, 5, '').font = font
+        ws.merge_cells(start_row=row, start_column=5, end_row=row, end_column=20)
+    labels = {1: 'No', 2: '期間', 5: '業務内容', 21: '環境', 26: '言語', 31: '担当工程'}
+    for col in range(1, LAST_COL + 1):
+        cell = ws.cell(header_rows, col, labels.get(col))
+        cell.font, cell.fill = font, header_fill
+        cell.border = Border(top=thin, bottom=thin, left=thin, right=thin)
+    for letter, width in (('A', 4), ('B', 3), ('C', 3), ('D', 3), ('E', 30), ('F', 12)):
+        ws.column_dimensions[letter].width = width
+
+    t = wb.create_sheet('_Template')
+    block_merges = ['A1:A5', 'B1:D2', 'B3:D5'] + [f'G{r}:T{r}' for r in range(1, 6)] \
+        + [f'U{r}:Y{r}' for r in range(1, 6)] + [f'Z{r}:AD{r}' for r in range(1, 6)]
+    for row in range(1, BLOCK_SIZE + 1):
+        for col in range(1, LAST_COL + 1):
+            cell = t.cell(row, col)
+            cell.font, cell.alignment = font, wrap
+            cell.border = Border(left=thin, right=thin, top=thin if row == 1 else None, bottom=thin if row == BLOCK_SIZE else None)
+    for ref in block_merges:
+        t.merge_cells(ref)
+    if footer_stamp:
+        for col in range(1, LAST_COL + 1):
+            cell = t.cell(BLOCK_SIZE + 1, col)
+            cell.font, cell.alignment = font, wrap
+            cell.border = Border(bottom=Side(style='hair', color='000000'))
+        t.merge_cells(start_row=BLOCK_SIZE + 1, start_column=2, end_row=BLOCK_SIZE + 1, end_column=LAST_COL)
+
+    if existing_entries:
+        # A previously rendered sheet, rendered the same way update_resume does
+        import update_resume
+        master = generate_master(existing_entries, seed=seed + 2)
+        update_resume.render_workbook(wb, master)
+
+    wb.properties.created = wb.properties.modified = FIXED_TIMESTAMP
+    wb.properties.creator = 'synthetic'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    wb.save(path)
+    return path
+
+def skill_sheet_rows(master_data, header_rows=START_ROW - 1):
+    """The master laid out as CSV rows (as exported from the skill sheet) for extract_master_json."""
+    rows = [['技術経歴書'] + [''] * (LAST_COL - 1)]
+    rows += [[''] * LAST_COL for _ in range(header_rows - 1)]
+    columns = (('business_content', 'title_col_e', 4), ('business_content', 'role_col_f', 5),
+               ('business_content', 'detail_col_g', 6), ('technology', 'environment_col_u', 20),
+               ('technology', 'language_col_z', 25), ('technology', 'process_col_ae', 30))
+    for entry in master_data['work_history']:
+        block = [[''] * LAST_COL for _ in range(BLOCK_SIZE)]
+        block[0][0] = entry['no']
+        block[0][1] = entry['period']['start']
+        block[2][1] = entry['period']['end']
+        for section, field, col in columns:
+            for i, line in enumerate(entry[section][field][:BLOCK_SIZE]):
+                block[i][col] = line
+        rows += block
+    # Footer: the label row, then one line per row below it
+    label = [''] * LAST_COL
+    label[0] = 'その他'
+    rows.append(label)
+    for line in master_data['footer'].get('other_col_b', []):
+        row = [''] * LAST_COL
+        row[1] = line
+        rows.append(row)
+    return rows
+
+def write_skill_sheet_csv(master_data, path, encoding='utf-8-sig'):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        csv.writer(f).writerows(skill_sheet_rows(master_data))
+    return path
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return path
+
+def generate_fixtures(output_dir, entries=200, updates=20, seed=DEFAULT_SEED, existing_entries=0,
+                      footer_stamp=False, csv_encoding='utf-8-sig'):
+    """Writes a full fixture set into output_dir and returns {name: path}."""
+    master = generate_master(entries, seed)
+    update = generate_update(master, updates, seed)
+    return {
+        "master": write_json(os.path.join(output_dir, 'resume_master.json'), master),
+        "update": write_json(os.path.join(output_dir, 'resume_update.json'), update),
+        "csv": write_skill_sheet_csv(master, os.path.join(output_dir, 'skill_sheet.csv'), csv_encoding),
+        "template": build_template_workbook(os.path.join(output_dir, 'template.xlsx'), existing_entries=existing_entries,
+                                            footer_stamp=footer_stamp, seed=seed)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic resume fixtures.")
+    parser.add_argument('--output-dir', default=os.path.join('005_ToolOutput', '99_Synthetic'))
+    parser.add_argument('--entries', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--existing-entries', type=int, default=0, help="Blocks already rendered in the template sheet.")
+    parser.add_argument('--footer-stamp', action='store_true', help="Style _Template row 6 as the footer stamp.")
+    parser.add_argument('--csv-encoding', default='utf-8-sig')
+    args = parser.parse_args(argv)
+    paths = generate_fixtures(args.output_dir, args.entries, args.updates, args.seed, args.existing_entries,
+                              args.footer_stamp, args.csv_encoding)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
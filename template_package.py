@@ -0,0 +1,238 @@
+import io
+import mmap
+import os
+import posixpath
+import struct
+import threading
+import time
+import weakref
+import zipfile
+import zlib
+from xml.etree import ElementTree
+import workbook_guard
+
+# Template .xlsx read once into a memory map; unchanged parts are copied as-is
+# (still compressed) into each output package, only replaced parts are deflated.
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+STYLES_PART = 'xl/styles.xml'
+CALC_CHAIN_PART = 'xl/calcChain.xml'
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD = struct.Struct('<IHHHHIIH')
+LOCAL_SIG = 0x04034b50
+CENTRAL_SIG = 0x02014b50
+END_SIG = 0x06054b50
+FLAG_DATA_DESCRIPTOR = 0x08
+
+_packages = {}
+_packages_lock = threading.Lock()
+
+class MappedReader(io.RawIOBase):
+    """Independent seekable reader over a shared mmap (no copy, no disk I/O)."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._buffer) + offset
+        return self._pos
+
+    def readinto(self, b):
+        chunk = self._buffer[self._pos:self._pos + len(b)]
+        b[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+class TemplatePackage:
+    """A template workbook package: mapped once, parts decompressed at most once."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._zip = zipfile.ZipFile(MappedReader(self._map))
+            # Rejects oversized or bomb-like packages before any part is parsed
+            self.guard_report = workbook_guard.inspect_workbook(self._zip)
+        except (zipfile.BadZipFile, workbook_guard.ResourceLimitError):
+            self._map.close()
+            raise
+        self.infos = self._zip.infolist()
+        self._parts = {}
+        self._lock = threading.Lock()
+        self._compatible = weakref.WeakKeyDictionary()
+        self.sheet_paths = self._read_sheet_paths()
+
+    def names(self):
+        return [info.filename for info in self.infos]
+
+    def read(self, name):
+        """Decompressed part, cached for the life of the package."""
+        with self._lock:
+            data = self._parts.get(name)
+            if data is None:
+                data = self._parts[name] = self._zip.read(name)
+        return data
+
+    def raw(self, info):
+        """Compressed bytes of one member, sliced straight from the map."""
+        name_len, extra_len = struct.unpack('<HH', self._map[info.header_offset + 26:info.header_offset + 30])
+        start = info.header_offset + LOCAL_HEADER.size + name_len + extra_len
+        return self._map[start:start + info.compress_size]
+
+    def _read_sheet_paths(self):
+        """{sheet name: part name} from workbook.xml and its rels."""
+        rels = ElementTree.fromstring(self.read('xl/_rels/workbook.xml.rels'))
+        targets = {}
+        for rel in rels.iter(f'{NS_PKG_REL}Relationship'):
+            target = rel.get('Target')
+            if target.startswith('/'):
+                targets[rel.get('Id')] = target[1:]
+            else:
+                targets[rel.get('Id')] = posixpath.normpath(posixpath.join('xl', target))
+        workbook = ElementTree.fromstring(self.read('xl/workbook.xml'))
+        paths = {}
+        for sheet in workbook.iter(f'{NS_MAIN}sheet'):
+            paths[sheet.get('name')] = targets.get(sheet.get(f'{NS_REL}id'))
+        return paths
+
+    def style_counts(self):
+        """Entry counts of the style tables, used to check openpyxl kept indices stable."""
+        styles = ElementTree.fromstring(self.read(STYLES_PART))
+        counts = {}
+        for tag in ('fonts', 'fills', 'borders', 'cellXfs', 'cellStyles'):
+            node = styles.find(f'{NS_MAIN}{tag}')
+            counts[tag] = 0 if node is None else len(node)
+        return counts
+
+    def open_workbook(self):
+        """Parses the mapped package with openpyxl (no disk read)."""
+        import openpyxl
+        wb = openpyxl.load_workbook(MappedReader(self._map))
+        # Checked on the pristine workbook, before renders append new styles
+        self._compatible[wb] = styles_compatible(self, wb)
+        return wb
+
+    def can_assemble(self, wb):
+        return self._compatible.get(wb, False)
+
+    def assemble(self, out, replacements):
+        """Writes a new package to out: replaced parts deflated, everything else copied raw.
+
+        A replacement is bytes or an iterable of byte chunks (deflated as they arrive).
+        """
+        central = []
+        offset = 0
+        now_time, now_date = _dos_datetime(time.localtime()[:6])
+        for info in self.infos:
+            name = info.filename.encode('utf-8')
+            flags = (info.flag_bits & ~FLAG_DATA_DESCRIPTOR) | 0x800
+            if info.filename in replacements:
+                data = replacements[info.filename]
+                if isinstance(data, (bytes, bytearray)):
+                    data = (data,)
+                compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+                compressed, crc, size = [], 0, 0
+                for chunk in data:
+                    compressed.append(compressor.compress(chunk))
+                    crc = zlib.crc32(chunk, crc)
+                    size += len(chunk)
+                compressed.append(compressor.flush())
+                payload = b''.join(compressed)
+                method = zipfile.ZIP_DEFLATED
+                mod_time, mod_date = now_time, now_date
+            else:
+                payload = self.raw(info)
+                crc, size, method = info.CRC, info.file_size, info.compress_type
+                mod_time, mod_date = _dos_datetime(info.date_time)
+            out.write(LOCAL_HEADER.pack(LOCAL_SIG, 20, flags, method, mod_time, mod_date, crc, len(payload), size, len(name), 0))
+            out.write(name)
+            out.write(payload)
+            central.append(CENTRAL_HEADER.pack(CENTRAL_SIG, 20, 20, flags, method, mod_time, mod_date, crc, len(payload), size, len(name), 0, 0, 0, 0, info.external_attr, offset) + name)
+            offset += LOCAL_HEADER.size + len(name) + len(payload)
+        directory = b''.join(central)
+        out.write(directory)
+        out.write(END_RECORD.pack(END_SIG, 0, 0, len(central), len(central), len(directory), offset, 0))
+
+    def close(self):
+        self._zip.close()
+        self._map.close()
+
+def get_package(path):
+    """Process-wide package cache keyed by path; re-maps when the file changes."""
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    with _packages_lock:
+        package = _packages.get(path)
+        if package is None or package.mtime != mtime:
+            package = _packages[path] = TemplatePackage(path)
+        return package
+
+def styles_compatible(package, wb):
+    """True when openpyxl loaded the style tables without merging duplicates, so style
+    ids in untouched sheets still match a re-serialised styles.xml. Entries openpyxl
+    appends on load (e.g. merged-cell borders) are fine; reordering is not."""
+    from openpyxl.styles.stylesheet import Stylesheet
+    if CALC_CHAIN_PART in package.names():
+        return False
+    counts = package.style_counts()
+    raw = Stylesheet.from_tree(ElementTree.fromstring(package.read(STYLES_PART)))
+    if len(raw.cell_styles) != counts['cellXfs'] or len(raw.named_styles) != counts['cellStyles']:
+        return False
+    for loaded, original in ((wb._fonts, raw.fonts), (wb._fills, raw.fills), (wb._borders, raw.borders), (wb._cell_styles, raw.cell_styles)):
+        if list(loaded[:len(original)]) != list(original):
+            return False
+    return True
+
+def sheet_xml(ws):
+    """Serialises one worksheet with openpyxl's writer (inline strings). None if it needs new rels."""
+    from openpyxl.worksheet._writer import WorksheetWriter
+    writer = WorksheetWriter(ws, out=io.BytesIO())
+    writer.write()
+    if len(writer._rels) or ws.legacy_drawing is not None or ws.tables:
+        return None
+    return writer.read()
+
+def save_with_package(package, wb, sheet_name, output):
+    """Saves wb (opened via package.open_workbook) regenerating only sheet_name and styles.xml.
+
+    output is a path or a writable binary file. Returns False if a full wb.save is required.
+    """
+    from openpyxl.styles.stylesheet import write_stylesheet
+    from openpyxl.xml.functions import tostring
+    part = package.sheet_paths.get(sheet_name)
+    if part is None or not package.can_assemble(wb):
+        return False
+    xml = sheet_xml(wb[sheet_name])
+    if xml is None:
+        return False
+    replacements = {part: xml, STYLES_PART: tostring(write_stylesheet(wb))}
+    if hasattr(output, 'write'):
+        package.assemble(output, replacements)
+    else:
+        with open(output, 'wb') as out:
+            package.assemble(out, replacements)
+    return True
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The tools are top-level scripts, not a package
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip('openpyxl')
+
+import regression_harness
+import synthetic
+
+def test_generate_fixtures_is_deterministic(tmp_path):
+    first = synthetic.generate_fixtures(str(tmp_path / 'a'), entries=20, updates=5)
+    second = synthetic.generate_fixtures(str(tmp_path / 'b'), entries=20, updates=5)
+    for key in ('master', 'update', 'csv'):
+        with open(first[key], 'rb') as a, open(second[key], 'rb') as b:
+            assert a.read() == b.read(), key
+
+def test_pipeline_round_trips_synthetic_master(tmp_path):
+    results, failures = regression_harness.run(str(tmp_path), entries=20, updates=5, existing_entries=4,
+                                               seed=synthetic.DEFAULT_SEED)
+    assert failures == []
+    assert results
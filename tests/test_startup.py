@@ -0,0 +1,40 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import cli
+import synthetic
+from conftest import REPO_ROOT
+
+RUNS = 5
+
+# Runs `plan` through cli.main in a fresh interpreter, then reports whether openpyxl got loaded
+PLAN_PROBE = (
+    "import sys\n"
+    "sys.path.insert(0, sys.argv[1])\n"
+    "import cli\n"
+    "code = cli.main(sys.argv[2:])\n"
+    "sys.exit(3 if 'openpyxl' in sys.modules else code)\n"
+)
+
+def plan_argv(tmp_path):
+    master = synthetic.generate_master(entries=3)
+    update = synthetic.generate_update(master, items=2)
+    master_path = tmp_path / 'resume_master.json'
+    draft_path = tmp_path / 'resume_update.json'
+    synthetic.write_json(str(master_path), master)
+    synthetic.write_json(str(draft_path), update)
+    return ['plan', '--master', str(master_path), '--draft', str(draft_path), '--output-dir', str(tmp_path / 'out')]
+
+def test_plan_stays_under_startup_budget(tmp_path):
+    command = [sys.executable, '-c', PLAN_PROBE, REPO_ROOT] + plan_argv(tmp_path)
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True, cwd=str(tmp_path))
+        timings.append((time.perf_counter() - started) * 1000)
+        assert result.returncode != 3, "plan imported openpyxl"
+        assert result.returncode == 0, result.stdout + result.stderr
+    assert statistics.median(timings) < cli.PLAN_BUDGET_MS, timings
@@ -0,0 +1,145 @@
+import functools
+import re
+import unicodedata
+from openpyxl.utils import get_column_letter
+import update_resume
+
+# Render-time text layout for the free-text columns: detail lines (G, merged G:T per block
+# row) and footer lines (B, merged across the footer row). Lines are width-normalised and
+# split to the merged region's width so they no longer overflow; the master JSON is never
+# changed. Splits are memoised on (text, width), so a roster re-render repeats no work.
+WRAP_TARGETS = {
+    # field -> (segment kind, column the text is written to)
+    'detail_col_g': ('block', 7),
+    'other_col_b': ('footer', 2),
+}
+DEFAULT_COL_WIDTH = 8.43
+# Columns of width units kept free in each region (cell padding, proportional fonts)
+WRAP_MARGIN = 1
+# Characters a line may not start with (kinsoku); the split moves back one character
+NO_LINE_START = frozenset('、。，．,.)）」』】〕〉》・ー－ゝゞ々ぁぃぅぇぉっゃゅょァィゥェォッャュョ？！?!:;：；%％')
+# Full-width ASCII and spaces, half-width katakana; runs of these are NFKC-folded
+# (ＦＩ -> FI, 'ＳＡＰ　ＨＡＮＡ' -> 'SAP HANA', ｶﾞ -> ガ)
+FOLD_RUN = re.compile('[\u3000！-～｡-ﾟ]+')
+
+@functools.lru_cache(maxsize=None)
+def char_units(ch):
+    """Width in Excel column units: 2 for wide (and ambiguous, as in Japanese fonts), else 1."""
+    if unicodedata.combining(ch):
+        return 0
+    return 2 if unicodedata.east_asian_width(ch) in ('W', 'F', 'A') else 1
+
+def display_width(text):
+    return sum(char_units(ch) for ch in text)
+
+def normalize_line(text):
+    """Full-width ASCII and spaces to half-width, half-width katakana to full-width; trailing spaces dropped."""
+    return FOLD_RUN.sub(lambda m: unicodedata.normalize('NFKC', m.group(0)), text).rstrip()
+
+def _cut(text, width):
+    """Index after the longest prefix of text that fits width (at least one character)."""
+    used = 0
+    for index, ch in enumerate(text):
+        used += char_units(ch)
+        if used > width:
+            cut = max(index, 1)
+            break
+    else:
+        return len(text)
+    # Keep ASCII words whole when a space earlier on the line allows it
+    if cut < len(text) and text[cut].isascii() and text[cut].isalnum() and text[cut - 1].isascii() and text[cut - 1].isalnum():
+        space = text.rfind(' ', 0, cut)
+        if space > 0:
+            return space + 1
+    if cut > 1 and text[cut] in NO_LINE_START:
+        cut -= 1
+    return cut
+
+@functools.lru_cache(maxsize=65536)
+def wrap_line(text, width):
+    """Normalised text as a tuple of lines each fitting width units. Memoised on (text, width)."""
+    text = normalize_line(text)
+    if width <= 0 or display_width(text) <= width:
+        return (text,)
+    lines = []
+    while text:
+        cut = _cut(text, width)
+        lines.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    return tuple(lines)
+
+def region_width(ws, region, col):
+    """Width units of the merged range anchored at (row 0, col) of a stamp region, or of col alone."""
+    last_col = col
+    for min_row_off, min_col, _, max_col in region["merges"]:
+        if min_row_off == 0 and min_col == col:
+            last_col = max_col
+    total = 0.0
+    for c in range(col, last_col + 1):
+        dimension = ws.column_dimensions.get(get_column_letter(c))
+        width = dimension.width if dimension is not None and dimension.width else None
+        total += width or ws.sheet_format.defaultColWidth or DEFAULT_COL_WIDTH
+    return max(int(total) - WRAP_MARGIN, 1)
+
+def wrap_widths(stamp):
+    """{field: width units} for one compiled template, computed once and kept on the stamp."""
+    widths = stamp.get("wrap_widths")
+    if widths is None:
+        ws = stamp["workbook"][update_resume.TARGET_SHEET_NAME]
+        widths = stamp["wrap_widths"] = {
+            field: region_width(ws, stamp if kind == 'block' else stamp["footer"], col)
+            for field, (kind, col) in WRAP_TARGETS.items()
+        }
+    return widths
+
+def wrap_slots(lines, width, slots=update_resume.BLOCK_ROWS):
+    """Wraps positional block lines. A split line flows into the empty slots below it; returns
+    None when the wrapped text does not fit the block (the caller keeps the lines as they are)."""
+    out = []
+    for index, line in enumerate(lines):
+        if not isinstance(line, str) or not line:
+            # An empty slot already taken by the line above is absorbed
+            if len(out) <= index:
+                out.append(line)
+            continue
+        out.extend(wrap_line(line, width))
+    if len(out) > slots:
+        return None
+    return out + [''] * (len(lines) - len(out))
+
+def wrap_master(master_data, stamp):
+    """Copy of master_data with detail and footer lines wrapped for the template of stamp.
+
+    Only the touched entries are copied. Returns (master_data, report); report counts split
+    lines and lists the entries whose detail text does not fit its block even when wrapped.
+    """
+    widths = wrap_widths(stamp)
+    report = {"split_lines": 0, "overflow": []}
+
+    def count_splits(lines, width):
+        report["split_lines"] += sum(1 for line in lines if isinstance(line, str) and line and len(wrap_line(line, width)) > 1)
+
+    history = []
+    for entry in master_data.get('work_history', []):
+        bc = entry.get('business_content', {})
+        details = bc.get('detail_col_g') or []
+        wrapped = wrap_slots(details, widths['detail_col_g'])
+        if wrapped is None:
+            report["overflow"].append(entry.get('no'))
+        elif wrapped != details:
+            count_splits(details, widths['detail_col_g'])
+            entry = dict(entry, business_content=dict(bc, detail_col_g=wrapped))
+        history.append(entry)
+    footer = master_data.get('footer', {})
+    lines = footer.get('other_col_b', [])
+    footer_lines = [part for line in lines for part in (wrap_line(line, widths['other_col_b']) if isinstance(line, str) and line else (line,))]
+    if footer_lines != lines:
+        count_splits(lines, widths['other_col_b'])
+        footer = dict(footer, other_col_b=footer_lines)
+    return dict(master_data, work_history=history, footer=footer), report
+
+def print_report(report):
+    info = wrap_line.cache_info()
+    print(f"Wrapped {report['split_lines']} long lines (split cache {info.hits} hits / {info.misses} misses)")
+    if report["overflow"]:
+        print(f"Warning: detail text longer than its block, left unwrapped: entries {', '.join(map(str, report['overflow']))}")
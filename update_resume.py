@@ -1,12 +1,19 @@
 import json
-import openpyxl
-from openpyxl.styles import Border, Side
-from openpyxl.utils import range_boundaries
+from openpyxl.styles import Side
+from openpyxl.utils import get_column_letter, range_boundaries
+from openpyxl.worksheet.cell_range import CellRange
 from openpyxl.cell.cell import MergedCell
+from openpyxl.worksheet.merge import MergedCellRange
+from openpyxl.worksheet.worksheet import Worksheet
 import os
 import datetime
 import copy
-import sys
+import time
+import skill_index
+import render_cost
+import master_store
+import template_package
+import workbook_guard
 
 # Configuration
 MASTER_JSON_PATH = os.path.join('005_ToolOutput', '01_ResumeUpdater', 'Data', 'resume_master.json')
@@ -15,6 +22,14 @@ TEMPLATE_EXCEL_PATH = '経歴書（gotou_ryujirou）202508.xlsx'
 TEMPLATE_SHEET_NAME = '_Template'
 TARGET_SHEET_NAME = 'スキルシート'
 START_ROW = 21
+BLOCK_ROWS = 5
+FOOTER_LABEL = "その他"
+# Optional footer row stamp: _Template row 6 (one row per footer line), unused if unstyled
+FOOTER_TEMPLATE_ROW = 6
+# Whether the medium outline also encloses the footer (legacy: history only)
+FOOTER_BORDER = False
+# Whether detail/footer lines are normalised and split to their merged widths (text_layout)
+WRAP_TEXT = False
 
 def load_json(path):
     with open(path, 'r', encoding='utf-8') as f:
@@ -24,40 +39,6 @@ def save_json(path, data):
     with open(path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-def merge_data(master_data, update_data):
-    """Merges update_data into master_data."""
-    print("Merging data...")
-    payloads = update_data.get('update_payload', [])
-    
-    # Process payloads
-    for payload in payloads:
-        action = payload.get('action')
-        target_no = payload.get('target_no')
-        new_data = payload.get('data')
-
-        if action == 'INSERT' and target_no == 0:
-            master_data['work_history'].insert(0, new_data)
-        elif action == 'UPDATE':
-            found = False
-            for i, entry in enumerate(master_data['work_history']):
-                if entry.get('no') == str(target_no):
-                    master_data['work_history'][i] = new_data
-                    found = True
-                    break
-            if not found:
-                print(f"Warning: Entry with no {target_no} not found for UPDATE.")
-
-    # Renumber
-    for i, entry in enumerate(master_data['work_history']):
-        entry['no'] = str(i + 1)
-        
-    # Update Footer
-    footer_update = update_data.get('footer_update')
-    if footer_update and footer_update.get('update_required'):
-        master_data['footer']['other_col_b'] = footer_update.get('other_col_b', [])
-
-    return master_data
-
 def clean_sheet(ws):
     """Clears content and removes merged cells from START_ROW onwards."""
     print(f"Cleaning sheet from row {START_ROW}...")
@@ -83,115 +64,171 @@ def clean_sheet(ws):
         except Exception as e:
             print(f"Warning: Failed to remove merged range {mr}: {e}")
 
-def copy_style(src_cell, dst_cell):
-    if src_cell.has_style:
-        dst_cell.font = copy.copy(src_cell.font)
-        dst_cell.border = copy.copy(src_cell.border)
-        dst_cell.fill = copy.copy(src_cell.fill)
-        dst_cell.number_format = copy.copy(src_cell.number_format)
-        dst_cell.protection = copy.copy(src_cell.protection)
-        dst_cell.alignment = copy.copy(src_cell.alignment)
-
-def safe_write(ws, row, col, value):
-    """Writes value to cell ONLY if it is NOT a MergedCell."""
-    cell = ws.cell(row=row, column=col)
-    if isinstance(cell, MergedCell):
-        # Skip writing to merged cells (read-only)
-        return
-    cell.value = value
-
-def apply_template_and_write_data(ws, template_ws, entry, start_row):
-    """Applies template and writes data for one entry (5 rows)."""
-    
-    # 1. Copy Template (Styles & Merges)
-    for row_idx in range(1, 6):
+def _compile_rows(template_ws, first_row, last_row):
+    """Styled cells (A:AE) and merged ranges within template rows first_row..last_row, as row offsets."""
+    styles = []
+    for row_idx in range(first_row, last_row + 1):
         for col_idx in range(1, 32): # A to AE
             src_cell = template_ws.cell(row=row_idx, column=col_idx)
-            dst_cell = ws.cell(row=start_row + row_idx - 1, column=col_idx)
-            copy_style(src_cell, dst_cell)
+            if src_cell.has_style:
+                styles.append((row_idx - first_row, col_idx, copy.copy(src_cell._style)))
 
-    # Copy Merges
+    merges = []
     for merged_range in template_ws.merged_cells.ranges:
         min_col, min_row, max_col, max_row = range_boundaries(str(merged_range))
-        new_min_row = min_row + start_row - 1
-        new_max_row = max_row + start_row - 1
-        ws.merge_cells(start_row=new_min_row, start_column=min_col, end_row=new_max_row, end_column=max_col)
+        if min_row >= first_row and max_row <= last_row:
+            merges.append((min_row - first_row, min_col, max_row - first_row, max_col))
 
-    # 2. Write Data using safe_write
-    
-    # No (A)
-    safe_write(ws, start_row, 1, entry.get('no'))
-    
-    # Period (B)
-    safe_write(ws, start_row, 2, entry.get('period', {}).get('start'))
-    safe_write(ws, start_row + 2, 2, entry.get('period', {}).get('end'))
-    
-    # Business Content
-    bc = entry.get('business_content', {})
-    titles = bc.get('title_col_e', [])
-    roles = bc.get('role_col_f', [])
-    details = bc.get('detail_col_g', [])
-    
-    # Ensure lists have 5 elements (padding)
-    titles += [''] * (5 - len(titles))
-    roles += [''] * (5 - len(roles))
-    details += [''] * (5 - len(details))
-    
-    for i in range(5):
-        safe_write(ws, start_row + i, 5, titles[i])
-        safe_write(ws, start_row + i, 6, roles[i])
-        safe_write(ws, start_row + i, 7, details[i])
+    return {"styles": styles, "merges": merges, "rows": last_row - first_row + 1}
+
+def compile_template(template_ws):
+    """Reads the _Template regions once: the history block (A1:AE5) and the footer row stamp.
+
+    Border-resolved variants of each region are filled in lazily by resolve_segment.
+    """
+    stamp = _compile_rows(template_ws, 1, BLOCK_ROWS)
+    stamp["footer"] = _compile_rows(template_ws, FOOTER_TEMPLATE_ROW, FOOTER_TEMPLATE_ROW)
+    stamp["workbook"] = template_ws.parent
+    stamp["resolved"] = {}
+    return stamp
 
-    # Technology
+def block_values(entry):
+    """((row offset, column), value) for one history block."""
+    bc = entry.get('business_content', {})
     tech = entry.get('technology', {})
-    envs = tech.get('environment_col_u', [])
-    langs = tech.get('language_col_z', [])
-    procs = tech.get('process_col_ae', [])
-    
-    envs += [''] * (5 - len(envs))
-    langs += [''] * (5 - len(langs))
-    procs += [''] * (5 - len(procs))
-    
-    for i in range(5):
-        safe_write(ws, start_row + i, 21, envs[i])
-        safe_write(ws, start_row + i, 26, langs[i])
-        safe_write(ws, start_row + i, 31, procs[i])
-
-def write_footer(ws, footer_data, start_row):
-    print("Writing footer...")
-    others = footer_data.get('other_col_b', [])
-    
-    safe_write(ws, start_row, 1, "その他")
-    
-    for i, line in enumerate(others):
-        safe_write(ws, start_row + i, 2, line)
+    values = [((0, 1), entry.get('no')),
+              ((0, 2), entry.get('period', {}).get('start')),
+              ((2, 2), entry.get('period', {}).get('end'))]
+    for col, items in ((5, bc.get('title_col_e', [])), (6, bc.get('role_col_f', [])), (7, bc.get('detail_col_g', [])),
+                       (21, tech.get('environment_col_u', [])), (26, tech.get('language_col_z', [])), (31, tech.get('process_col_ae', []))):
+        for i in range(BLOCK_ROWS):
+            values.append(((i, col), items[i] if i < len(items) else ''))
+    return values
+
+def footer_values(lines, index):
+    """((row offset, column), value) for footer row `index`: the label alone on the first row,
+    then one line per row (the skill sheet layout extract_master_json reads)."""
+    if index == 0:
+        return [((0, 1), FOOTER_LABEL)]
+    return [((0, 2), lines[index - 1])]
+
+def plan_region(master_data, start_row=START_ROW, footer_border=FOOTER_BORDER):
+    """The target area as segments: (row, kind, (top, bottom, outlined), values).
+
+    History blocks come first, then the footer label row and one footer row per line.
+    The outline covers the history, plus the footer when footer_border is set.
+    """
+    history = master_data['work_history']
+    lines = master_data['footer'].get('other_col_b', [])
+    segments = [('block', block_values(entry)) for entry in history]
+    segments += [('footer', footer_values(lines, i)) for i in range(1 + len(lines))]
+    outlined = len(segments) if footer_border else len(history)
+    row = start_row
+    for index, (kind, values) in enumerate(segments):
+        inside = index < outlined
+        yield row, kind, (inside and index == 0, inside and index == outlined - 1, inside), values
+        row += BLOCK_ROWS if kind == 'block' else 1
 
-def draw_border(ws, start_row, end_row):
-    print("Drawing borders...")
+def resolve_segment(stamp, kind, variant):
+    """Final cells of one segment kind for one border variant, resolved once per workbook.
+
+    The segment is stamped on a detached sheet of the same workbook with merge_cells and
+    draw_border, so merged-cell edge formatting and outline edges are exactly those of the
+    per-cell path. Returns {"cells": [(row_off, col, style, merged)], "merged": {(row_off, col)}}.
+    Stamps from stamp_cache carry variants resolved by earlier processes ("cached") and
+    a hook that stores new ones ("on_resolve").
+    """
+    key = (kind, variant)
+    resolved = stamp["resolved"].get(key)
+    if resolved is not None:
+        return resolved
+    cached = stamp.get("cached", {}).pop(key, None)
+    if cached is not None:
+        resolved = stamp["resolved"][key] = cached()
+        return resolved
+    region = stamp if kind == 'block' else stamp["footer"]
+    top, bottom, outlined = variant
+    ws = Worksheet(stamp["workbook"], title='_Resolve')
+    for row_off, col_idx, style in region["styles"]:
+        ws.cell(row=1 + row_off, column=col_idx)._style = copy.copy(style)
+    for min_row_off, min_col, max_row_off, max_col in region["merges"]:
+        ws.merge_cells(start_row=1 + min_row_off, start_column=min_col, end_row=1 + max_row_off, end_column=max_col)
+    if outlined:
+        draw_border(ws, 1, region["rows"], top=top, bottom=bottom, verbose=False)
+    cells = [(row - 1, col, copy.copy(cell._style), isinstance(cell, MergedCell))
+             for (row, col), cell in sorted(ws._cells.items())]
+    resolved = {"cells": cells, "merged": {(r, c) for r, c, _, merged in cells if merged}}
+    stamp["resolved"][key] = resolved
+    if stamp.get("on_resolve") is not None:
+        stamp["on_resolve"](key, resolved)
+    return resolved
+
+def _merged_range(ws, ref):
+    """MergedCellRange over cells already styled by resolve_segment. Skips the constructor's
+    border fix-up on the anchor, which the resolved styles include already."""
+    merged = MergedCellRange.__new__(MergedCellRange)
+    CellRange.__init__(merged, range_string=ref)
+    merged.ws = ws
+    merged.start_cell = ws.cell(row=merged.min_row, column=merged.min_col)
+    return merged
+
+def render_region(ws, stamp, master_data, start_row=START_ROW, footer_border=FOOTER_BORDER):
+    """Renders history and footer in one sweep from resolved segments. Returns the last row."""
+    last_row = start_row - 1
+    for row, kind, variant, values in plan_region(master_data, start_row, footer_border):
+        resolved = resolve_segment(stamp, kind, variant)
+        region = stamp if kind == 'block' else stamp["footer"]
+        for row_off, col_idx, style, merged in resolved["cells"]:
+            if merged:
+                cell = ws._cells[(row + row_off, col_idx)] = MergedCell(ws, row=row + row_off, column=col_idx)
+            else:
+                cell = ws.cell(row=row + row_off, column=col_idx)
+            cell._style = copy.copy(style)
+        # clean_sheet cleared every range from start_row and segments never overlap, so the
+        # ranges go straight into the set (MultiCellRange.add re-checks containment: O(n^2))
+        for min_row_off, min_col, max_row_off, max_col in region["merges"]:
+            ws.merged_cells.ranges.add(_merged_range(ws, f"{get_column_letter(min_col)}{row + min_row_off}:{get_column_letter(max_col)}{row + max_row_off}"))
+        for (row_off, col_idx), value in values:
+            if (row_off, col_idx) not in resolved["merged"]:
+                ws.cell(row=row + row_off, column=col_idx).value = value
+        last_row = row + region["rows"] - 1
+    return last_row
+
+def draw_border(ws, start_row, end_row, top=True, bottom=True, verbose=True):
+    if verbose:
+        print("Drawing borders...")
     medium = Side(border_style="medium", color="000000")
-    
+
+    # Merge anchors of the bordered rows, looked up once instead of per cell
+    anchors = {}
+    for mr in ws.merged_cells.ranges:
+        if mr.max_row >= start_row and mr.min_row <= end_row:
+            for r in range(mr.min_row, mr.max_row + 1):
+                for c in range(mr.min_col, mr.max_col + 1):
+                    anchors[(r, c)] = (mr.min_row, mr.min_col)
+
     # Helper to get style-able cell (top-left if merged)
     def get_style_cell(r, c):
         cell = ws.cell(row=r, column=c)
-        if isinstance(cell, MergedCell):
-            for mr in ws.merged_cells.ranges:
-                if cell.coordinate in mr:
-                    return ws.cell(row=mr.min_row, column=mr.min_col)
+        if isinstance(cell, MergedCell) and (r, c) in anchors:
+            return ws.cell(*anchors[(r, c)])
         return cell
 
     # Top & Bottom
     for col in range(1, 32):
         # Top
-        cell = get_style_cell(start_row, col)
-        new_border = copy.copy(cell.border)
-        new_border.top = medium
-        cell.border = new_border
-        
+        if top:
+            cell = get_style_cell(start_row, col)
+            new_border = copy.copy(cell.border)
+            new_border.top = medium
+            cell.border = new_border
+
         # Bottom
-        cell = get_style_cell(end_row, col)
-        new_border = copy.copy(cell.border)
-        new_border.bottom = medium
-        cell.border = new_border
+        if bottom:
+            cell = get_style_cell(end_row, col)
+            new_border = copy.copy(cell.border)
+            new_border.bottom = medium
+            cell.border = new_border
 
     # Left & Right
     for row in range(start_row, end_row + 1):
@@ -207,68 +244,102 @@ def draw_border(ws, start_row, end_row):
         new_border.right = medium
         cell.border = new_border
 
-def main():
-    # 1. Load & Merge
-    try:
-        master_data = load_json(MASTER_JSON_PATH)
-        update_data = load_json(UPDATE_JSON_PATH)
-    except FileNotFoundError as e:
-        print(f"Error: {e}")
-        return
-
-    master_data = merge_data(master_data, update_data)
-    save_json(MASTER_JSON_PATH, master_data)
-    print(f"Updated {MASTER_JSON_PATH}")
+def open_template(template_path):
+    """Opens the template from the process-wide memory-mapped package cache. Returns (package, wb)."""
+    package = template_package.get_package(template_path)
+    return package, package.open_workbook()
 
-    # 2. Open Excel
-    try:
-        wb = openpyxl.load_workbook(TEMPLATE_EXCEL_PATH)
-    except FileNotFoundError:
-        print(f"Error: Excel template not found: {TEMPLATE_EXCEL_PATH}")
+def save_workbook(wb, output, package=None):
+    """Saves wb; with its template package only the target sheet and styles are regenerated."""
+    if package is not None and template_package.save_with_package(package, wb, TARGET_SHEET_NAME, output):
         return
+    wb.save(output)
 
+def check_sheets(wb):
     if TARGET_SHEET_NAME not in wb.sheetnames or TEMPLATE_SHEET_NAME not in wb.sheetnames:
         print(f"Error: Missing sheets. Required: {TARGET_SHEET_NAME}, {TEMPLATE_SHEET_NAME}")
         print(f"Available sheets: {wb.sheetnames}")
-        return
+        return False
+    return True
 
+def render_workbook(wb, master_data, stamp=None, footer_border=FOOTER_BORDER):
+    """Cleans the target sheet and renders history, footer and border. Safe to repeat on one workbook."""
     ws = wb[TARGET_SHEET_NAME]
-    template_ws = wb[TEMPLATE_SHEET_NAME]
+    if stamp is None:
+        stamp = compile_template(wb[TEMPLATE_SHEET_NAME])
 
     # 3. Clean
     clean_sheet(ws)
 
-    # 4. Render
-    current_row = START_ROW
-    print("Rendering history...")
-    for entry in master_data['work_history']:
-        apply_template_and_write_data(ws, template_ws, entry, current_row)
-        current_row += 5
+    # 4-6. History blocks, footer and border in one pass (borders pre-resolved per segment variant)
+    print("Rendering history and footer...")
+    render_region(ws, stamp, master_data, START_ROW, footer_border)
+    return wb
 
-    # 5. Footer
-    write_footer(ws, master_data['footer'], current_row)
-    
-    # 6. Border
-    # Footer length
-    footer_len = len(master_data['footer'].get('other_col_b', []))
-    # Border covers history + footer? Usually just history in this context, 
-    # but let's assume history area based on previous context.
-    # Actually, looking at the template, the border usually wraps the whole content.
-    # Let's wrap up to the last row written.
-    last_row = current_row + max(0, footer_len - 1)
-    if footer_len == 0: last_row = current_row - 1 # Just history
-    
-    # Wait, the user requirement said "业务履歴エリア全体 (No.1〜最終行)".
-    # This implies the border should enclose the work history blocks.
-    # Footer usually has its own style or is outside.
-    # Let's stick to history area: START_ROW to current_row - 1.
-    draw_border(ws, START_ROW, current_row - 1)
+def output_filename_for(candidate_id=None, output_dir='.'):
+    timestamp = datetime.datetime.now().strftime('%Y%m%d')
+    if candidate_id:
+        return os.path.join(output_dir, f"経歴書_Updated_{candidate_id}_{timestamp}.xlsx")
+    return os.path.join(output_dir, f"経歴書_Updated_{timestamp}.xlsx")
+
+def main(master_path=MASTER_JSON_PATH, update_path=UPDATE_JSON_PATH, template_path=TEMPLATE_EXCEL_PATH, output_path=None, direct=False, wrap=WRAP_TEXT, sort_history=False):
+    # 1. Load & Merge (appends one record to the master's operation log)
+    store = master_store.MasterStore(master_path)
+    try:
+        update_data = load_json(update_path)
+        master_data = store.append_update(update_data, sort_history=sort_history)
+    except (FileNotFoundError, master_store.LockTimeoutError, master_store.ConflictError) as e:
+        print(f"Error: {e}")
+        return None
+
+    print(f"Updated {master_path} (revision {master_store.revision_of(master_data)})")
+    candidate_id = skill_index.update_index_file(master_data, master_path)
+    print(f"Updated skill index for {candidate_id}")
+
+    # 2. Open Excel
+    try:
+        package, wb = open_template(template_path)
+    except FileNotFoundError:
+        print(f"Error: Excel template not found: {template_path}")
+        return None
+    except workbook_guard.ResourceLimitError as e:
+        print(f"Error: {template_path} rejected: {e}")
+        return None
+
+    if not check_sheets(wb):
+        return None
+
+    output_filename = output_path or output_filename_for()
+    # Compiled stamp from the on-disk cache while the template is unchanged
+    import stamp_cache
+    stamp = stamp_cache.load_stamp(package, wb)
+    print(f"Template stamp: {'cached' if stamp['cache_hit'] else 'compiled'} ({stamp['fingerprint'][:12]})")
+    if wrap:
+        # Render-only: the stored master keeps the lines as written
+        import text_layout
+        master_data, report = text_layout.wrap_master(master_data, stamp)
+        text_layout.print_report(report)
+    started = time.perf_counter()
+
+    # Optional fast path: stream the sheet XML without building cells
+    if direct:
+        import sheet_emitter
+        if sheet_emitter.emit_workbook(sheet_emitter.SheetEmitter(package, wb, stamp), master_data, output_filename):
+            render_cost.record_render('direct', master_data, stamp, time.perf_counter() - started, os.path.getsize(output_filename))
+            print(f"Success! Saved to {output_filename} (direct)")
+            return output_filename
+        print("Direct emitter not applicable; rendering with openpyxl.")
+        started = time.perf_counter()
+
+    # 3-6. Clean, Render, Footer, Border
+    render_workbook(wb, master_data, stamp)
 
     # 7. Save
-    timestamp = datetime.datetime.now().strftime('%Y%m%d')
-    output_filename = f"経歴書_Updated_{timestamp}.xlsx"
-    wb.save(output_filename)
+    save_workbook(wb, output_filename, package)
+    # Calibrates the planner's render estimate (render_cost)
+    render_cost.record_render('openpyxl', master_data, stamp, time.perf_counter() - started, os.path.getsize(output_filename))
     print(f"Success! Saved to {output_filename}")
+    return output_filename
 
 if __name__ == "__main__":
     main()
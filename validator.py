@@ -0,0 +1,147 @@
+from collections import namedtuple
+import periods
+
+# Schema for master / update documents
+BLOCK_SIZE = 5
+ACTIONS = ('INSERT', 'UPDATE')
+
+LIST_FIELDS = [
+    ('business_content', 'title_col_e'),
+    ('business_content', 'role_col_f'),
+    ('business_content', 'detail_col_g'),
+    ('technology', 'environment_col_u'),
+    ('technology', 'language_col_z'),
+    ('technology', 'process_col_ae')
+]
+
+PERIOD_FIELDS = [
+    ('period', 'start'),
+    ('period', 'end')
+]
+
+ValidationIssue = namedtuple('ValidationIssue', ['index', 'field', 'code', 'message', 'severity', 'fixed'])
+
+def is_valid_period(value):
+    """Returns True for any period periods.parse_period accepts ('2020/4', '2020年4月', '現在', ...)."""
+    return periods.parse_period(value, present=0) is not None
+
+def _check_list(parent, field):
+    """Builds a check for one 5-line list column."""
+    def check(entry, index, fix, issues):
+        section = entry.get(parent)
+        if not isinstance(section, dict) or field not in section:
+            issues.append(ValidationIssue(index, field, 'missing', f"{parent}.{field} is missing.", 'warning', False))
+            return
+        value = section[field]
+        if not isinstance(value, list):
+            if fix:
+                value = [] if value is None else [str(value)]
+                section[field] = value
+            issues.append(ValidationIssue(index, field, 'not_list', f"{field} is not a list. Converting to list.", 'warning', fix))
+        if isinstance(value, list) and len(value) != BLOCK_SIZE:
+            length = len(value)
+            if fix:
+                section[field] = value[:BLOCK_SIZE] + [""] * (BLOCK_SIZE - length)
+            issues.append(ValidationIssue(index, field, 'width', f"{field} length is {length}. Padding/Truncating to {BLOCK_SIZE}.", 'warning', fix))
+    return check
+
+def _check_period(parent, field):
+    """Builds a check for one period cell."""
+    def check(entry, index, fix, issues):
+        section = entry.get(parent)
+        value = section.get(field) if isinstance(section, dict) else None
+        if value is None or value == "":
+            issues.append(ValidationIssue(index, f"{parent}.{field}", 'missing', f"{parent}.{field} is empty.", 'warning', False))
+        elif not isinstance(value, str) or not is_valid_period(value.strip()):
+            issues.append(ValidationIssue(index, f"{parent}.{field}", 'period_format', f"{parent}.{field} '{value}' is not YYYY/M or {periods.PRESENT_LABEL}.", 'warning', False))
+        elif fix and value != value.strip():
+            section[field] = value.strip()
+    return check
+
+def compile_entry_checks(require_no):
+    """Compiles the entry schema into a flat tuple of check functions."""
+    checks = []
+    if require_no:
+        def check_no(entry, index, fix, issues):
+            if not str(entry.get('no', '')).strip():
+                issues.append(ValidationIssue(index, 'no', 'missing', "no is missing.", 'warning', False))
+        checks.append(check_no)
+    checks.extend(_check_period(p, f) for p, f in PERIOD_FIELDS)
+    checks.extend(_check_list(p, f) for p, f in LIST_FIELDS)
+    return tuple(checks)
+
+# Compiled once at import, shared by planner and update_resume
+MASTER_ENTRY_CHECKS = compile_entry_checks(require_no=True)
+PAYLOAD_ENTRY_CHECKS = compile_entry_checks(require_no=False)
+
+def validate_entries(entries, checks=MASTER_ENTRY_CHECKS, fix=False):
+    """Runs compiled checks over all entries in one pass and collects issues."""
+    issues = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            issues.append(ValidationIssue(index, None, 'not_object', "Entry is not an object.", 'error', False))
+            continue
+        for check in checks:
+            check(entry, index, fix, issues)
+    return issues
+
+def validate_master(master_data, fix=False):
+    """Validates a master document (work_history + footer)."""
+    issues = []
+    work_history = master_data.get('work_history')
+    if not isinstance(work_history, list):
+        issues.append(ValidationIssue(None, 'work_history', 'not_list', "work_history is not a list.", 'error', False))
+    else:
+        issues.extend(validate_entries(work_history, MASTER_ENTRY_CHECKS, fix))
+    footer = master_data.get('footer')
+    if not isinstance(footer, dict) or not isinstance(footer.get('other_col_b'), list):
+        issues.append(ValidationIssue(None, 'footer.other_col_b', 'not_list', "footer.other_col_b is not a list.", 'error', False))
+    return issues
+
+def validate_payload(payloads, fix=False):
+    """Validates update_payload items (action, target_no, data)."""
+    issues = []
+    entries = []
+    positions = []
+    for index, item in enumerate(payloads):
+        if not isinstance(item, dict) or 'action' not in item or 'target_no' not in item or 'data' not in item:
+            issues.append(ValidationIssue(index, None, 'missing', "Missing action, target_no, or data.", 'error', False))
+            continue
+        if item['action'] not in ACTIONS:
+            issues.append(ValidationIssue(index, 'action', 'unknown_action', f"Unknown action: {item['action']}", 'error', False))
+            continue
+        if not str(item['target_no']).isdigit():
+            issues.append(ValidationIssue(index, 'target_no', 'target_no', f"target_no '{item['target_no']}' is not a number.", 'error', False))
+            continue
+        entries.append(item['data'])
+        positions.append(index)
+    for issue in validate_entries(entries, PAYLOAD_ENTRY_CHECKS, fix):
+        issues.append(issue._replace(index=positions[issue.index]))
+    issues.sort(key=lambda issue: issue.index)
+    return issues
+
+def validate_update(update_data, fix=False):
+    """Validates an update document (update_payload + footer_update)."""
+    issues = []
+    payloads = update_data.get('update_payload', [])
+    if not isinstance(payloads, list):
+        issues.append(ValidationIssue(None, 'update_payload', 'not_list', "update_payload is not a list.", 'error', False))
+    else:
+        issues.extend(validate_payload(payloads, fix))
+    footer_update = update_data.get('footer_update')
+    if footer_update and footer_update.get('update_required') and not isinstance(footer_update.get('other_col_b'), list):
+        issues.append(ValidationIssue(None, 'footer_update.other_col_b', 'not_list', "footer_update.other_col_b is not a list.", 'error', False))
+    return issues
+
+def rejected_items(issues):
+    """Returns indices of items with unfixed errors."""
+    return {issue.index for issue in issues if issue.severity == 'error' and issue.index is not None}
+
+def format_issue(issue):
+    label = '[Fix]' if issue.fixed else ('[Error]' if issue.severity == 'error' else '[Warning]')
+    where = f"Item {issue.index}: " if issue.index is not None else ""
+    return f"{label} {where}{issue.message}"
+
+def print_report(issues, indent="  "):
+    for issue in issues:
+        print(f"{indent}{format_issue(issue)}")
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+import master_store
+import planner
+import render_service
+import skill_index
+import update_resume
+
+# Watch mode: polls the data directories and the template, debounces bursts of writes and
+# runs only the stages the changed inputs feed. Renders reuse render_service's warm templates.
+POLL_INTERVAL = 0.5
+DEBOUNCE_SECONDS = 1.0
+STAGE_ORDER = ('plan', 'render')
+HASH_CHUNK = 1 << 20
+
+class WatchedInput:
+    """A named group of files whose combined content decides whether its stages rerun."""
+
+    def __init__(self, name, paths, stages):
+        self.name = name
+        self.paths = paths
+        self.stages = stages
+        self.signature = None
+        self.digest = None
+
+    def stat_signature(self):
+        """Cheap per-poll check; a rename-over (atomic write) changes the inode even if mtime does not."""
+        signature = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def content_digest(self):
+        digest = hashlib.sha1()
+        for path in self.paths:
+            digest.update(path.encode('utf-8') + b'\0')
+            try:
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                        digest.update(chunk)
+            except FileNotFoundError:
+                digest.update(b'<missing>')
+        return digest.hexdigest()
+
+class Watcher:
+    def __init__(self, master_path=update_resume.MASTER_JSON_PATH, draft_path=planner.DRAFT_JSON_PATH,
+                 template_path=update_resume.TEMPLATE_EXCEL_PATH, plan_dir=planner.OUTPUT_DIR, output_dir='.',
+                 interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS, direct=False):
+        self.master_path = master_path
+        self.draft_path = draft_path
+        self.template_path = template_path
+        self.plan_dir = plan_dir
+        self.output_dir = output_dir
+        self.interval = interval
+        self.debounce = debounce
+        self.direct = direct
+        self.cache = render_service.TemplateCache()
+        self.inputs = [
+            # A draft only changes the preview; rendering it would apply the update to the master
+            WatchedInput('draft', [draft_path], {'plan'}),
+            WatchedInput('master', [master_path, master_path + master_store.OPLOG_SUFFIX], {'plan', 'render'}),
+            WatchedInput('template', [template_path], {'render'}),
+        ]
+        self.runs = {stage: 0 for stage in STAGE_ORDER}
+
+    def prime(self):
+        """Records the current state so only later edits trigger stages."""
+        for watched in self.inputs:
+            watched.signature = watched.stat_signature()
+            watched.digest = watched.content_digest()
+
+    def poll(self, pending, now):
+        for watched in self.inputs:
+            signature = watched.stat_signature()
+            if signature != watched.signature:
+                watched.signature = signature
+                pending[watched.name] = now
+
+    def settle(self, pending):
+        """Stages due for the settled inputs; no-op saves (same content) are dropped."""
+        stages = set()
+        for watched in self.inputs:
+            if watched.name not in pending:
+                continue
+            del pending[watched.name]
+            digest = watched.content_digest()
+            if digest == watched.digest:
+                print(f"[watch] {watched.name}: saved without changes, ignored")
+                continue
+            watched.digest = digest
+            print(f"[watch] {watched.name} changed")
+            stages |= watched.stages
+        return [stage for stage in STAGE_ORDER if stage in stages]
+
+    def run_plan(self):
+        if not os.path.exists(self.master_path) or not os.path.exists(self.draft_path):
+            print("[watch] plan skipped: master or draft missing")
+            return False
+        try:
+            planner.main(self.master_path, self.draft_path, self.plan_dir)
+        except SystemExit:
+            # planner exits on unreadable input; the next save retriggers it
+            print("[watch] plan failed")
+            return False
+        return True
+
+    def run_render(self):
+        master_data = master_store.load_master(self.master_path)
+        body = render_service.render_bytes(self.cache, master_data, template_path=self.template_path, direct=self.direct)
+        candidate_id = skill_index.candidate_id_for(master_data, self.master_path)
+        output_filename = update_resume.output_filename_for(candidate_id, self.output_dir)
+        master_store.atomic_write_bytes(output_filename, body)
+        print(f"[watch] rendered {output_filename}")
+        return True
+
+    def run_stages(self, stages):
+        for stage in stages:
+            started = time.perf_counter()
+            try:
+                if not getattr(self, f"run_{stage}")():
+                    continue
+            except Exception as e:
+                # Keep watching (and keep the template warm) after a bad edit
+                print(f"[watch] {stage} failed: {type(e).__name__}: {e}")
+                continue
+            self.runs[stage] += 1
+            print(f"[watch] {stage} done in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def watch(self, initial=False, stop=None):
+        """Polls until stop (a threading.Event) is set or Ctrl+C."""
+        stop = stop or threading.Event()
+        self.prime()
+        if os.path.exists(self.template_path):
+            self.cache.get(self.template_path)
+        if initial:
+            self.run_stages(list(STAGE_ORDER))
+        print(f"[watch] watching {', '.join(p for w in self.inputs for p in w.paths)}")
+        pending = {}
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                self.poll(pending, now)
+                # One debounce window for all inputs, so a burst touching master and
+                # draft together runs each stage once
+                if pending and now - max(pending.values()) >= self.debounce:
+                    self.run_stages(self.settle(pending))
+                stop.wait(self.interval)
+        except KeyboardInterrupt:
+            pass
+        return self.runs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run plan/render when the master, draft or template changes.")
+    parser.add_argument('--master', default=update_resume.MASTER_JSON_PATH)
+    parser.add_argument('--draft', default=planner.DRAFT_JSON_PATH)
+    parser.add_argument('--template', default=update_resume.TEMPLATE_EXCEL_PATH)
+    parser.add_argument('--plan-dir', default=planner.OUTPUT_DIR)
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS)
+    parser.add_argument('--direct', action='store_true', help="Render with the direct sheet-XML emitter.")
+    parser.add_argument('--initial', action='store_true', help="Run every stage once at startup.")
+    args = parser.parse_args(argv)
+    watcher = Watcher(args.master, args.draft, args.template, args.plan_dir, args.output_dir,
+                      args.interval, args.debounce, args.direct)
+    watcher.watch(initial=args.initial)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import argparse
+import re
+import sys
+import time
+import zipfile
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# Resource guards for input workbooks. The zip directory and a streaming scan of each sheet's
+# XML are checked before openpyxl parses anything, so a workbook with a huge used range,
+# thousands of merges or a decompression bomb is rejected in milliseconds with a report
+# instead of stalling a batch worker. Limits can be overridden with config.WORKBOOK_LIMITS.
+DEFAULT_LIMITS = {
+    "max_rows": 20000,                            # per sheet (a 5-row block per entry: ~4000 entries)
+    "max_merges": 50000,                          # per sheet (18 per entry on the standard template)
+    "max_decompressed_bytes": 256 * 1024 * 1024,  # all parts together
+    "max_compression_ratio": 200,                 # per part, for parts over RATIO_MIN_BYTES
+    "stage_seconds": 30.0                         # per guarded stage (scan, streaming read)
+}
+RATIO_MIN_BYTES = 1024 * 1024
+SCAN_CHUNK = 256 * 1024
+SHEET_PART = re.compile(r'^xl/worksheets/[^/]+\.xml$')
+# r is optional on <row> and <c> (and may be single-quoted): the row count of a sheet is the
+# larger of its <row> start tags and the highest row any row or cell reference names
+ROW_TAG = re.compile(rb'<(?:\w+:)?row\b')
+ROW_REF = re.compile(rb'<(?:\w+:)?row\b[^>]*?\sr=["\'](\d+)["\']')
+CELL_REF = re.compile(rb'<(?:\w+:)?c\b[^>]*?\sr=["\'][A-Za-z]{1,3}(\d+)["\']')
+MERGE_TAG = re.compile(rb'<(?:\w+:)?mergeCell\b')
+
+class ResourceLimitError(ValueError):
+    """Raised when a workbook or a stage exceeds a configured resource limit."""
+
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+def limits_from_config(overrides=None):
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(getattr(config, 'WORKBOOK_LIMITS', None) or {})
+    limits.update(overrides or {})
+    return limits
+
+class StageBudget:
+    """Wall-clock budget of one stage; check() raises once it is spent."""
+
+    def __init__(self, stage, seconds=None):
+        self.stage = stage
+        self.seconds = limits_from_config()["stage_seconds"] if seconds is None else seconds
+        self.started = time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def check(self):
+        if self.elapsed() > self.seconds:
+            raise ResourceLimitError(f"{self.stage} exceeded its {self.seconds:g}s budget")
+
+def _count_rows(text, stats):
+    stats["row_tags"] += len(ROW_TAG.findall(text))
+    refs = ROW_REF.findall(text) + CELL_REF.findall(text)
+    if refs:
+        stats["max_ref"] = max(stats["max_ref"], max(map(int, refs)))
+    stats["rows"] = max(stats["row_tags"], stats["max_ref"])
+
+def _scan_sheet(zf, info, limits, budget, remaining):
+    """Rows, merges and decompressed bytes of one sheet part, stopping at the first limit hit."""
+    stats = {"rows": 0, "merges": 0, "bytes": 0}
+    counts = {"rows": 0, "row_tags": 0, "max_ref": 0}
+    carry = b''
+    with zf.open(info) as stream:
+        while True:
+            chunk = stream.read(SCAN_CHUNK)
+            if not chunk:
+                break
+            stats["bytes"] += len(chunk)
+            if stats["bytes"] > remaining:
+                # The declared sizes lied: the part inflates beyond the total budget
+                raise ResourceLimitError(f"{info.filename}: decompresses past {limits['max_decompressed_bytes']} bytes")
+            # Only complete tags are matched; the text from the last '<' waits for the next chunk
+            buffer = carry + chunk
+            cut = buffer.rfind(b'<')
+            if cut < 0:
+                cut = len(buffer)
+            complete, carry = buffer[:cut], buffer[cut:]
+            _count_rows(complete, counts)
+            stats["rows"] = counts["rows"]
+            stats["merges"] += len(MERGE_TAG.findall(complete))
+            if stats["rows"] > limits["max_rows"]:
+                raise ResourceLimitError(f"{info.filename}: row {stats['rows']} is past the {limits['max_rows']} row limit")
+            if stats["merges"] > limits["max_merges"]:
+                raise ResourceLimitError(f"{info.filename}: more than {limits['max_merges']} merged ranges")
+            budget.check()
+    _count_rows(carry, counts)
+    stats["rows"] = counts["rows"]
+    stats["merges"] += len(MERGE_TAG.findall(carry))
+    return stats
+
+def inspect_workbook(source, limits=None):
+    """Checks a workbook (path or open ZipFile) against the limits without parsing it.
+
+    Returns {"parts", "declared_bytes", "sheets": {part: {"rows", "merges", "bytes"}}, "seconds"};
+    raises ResourceLimitError naming the first limit exceeded.
+    """
+    limits = limits_from_config(limits)
+    budget = StageBudget('workbook scan', limits["stage_seconds"])
+    zf = source if isinstance(source, zipfile.ZipFile) else zipfile.ZipFile(source)
+    try:
+        infos = zf.infolist()
+        report = {"parts": len(infos), "declared_bytes": sum(info.file_size for info in infos), "sheets": {}}
+        if report["declared_bytes"] > limits["max_decompressed_bytes"]:
+            raise ResourceLimitError(f"parts decompress to {report['declared_bytes']} bytes "
+                                     f"(limit {limits['max_decompressed_bytes']})", report)
+        for info in infos:
+            if info.file_size > RATIO_MIN_BYTES and info.file_size > limits["max_compression_ratio"] * max(info.compress_size, 1):
+                raise ResourceLimitError(f"{info.filename}: compression ratio over {limits['max_compression_ratio']}", report)
+        remaining = limits["max_decompressed_bytes"]
+        for info in infos:
+            if not SHEET_PART.match(info.filename):
+                continue
+            try:
+                stats = _scan_sheet(zf, info, limits, budget, remaining)
+            except ResourceLimitError as e:
+                e.report = report
+                raise
+            remaining -= stats["bytes"]
+            report["sheets"][info.filename] = stats
+        report["seconds"] = round(budget.elapsed(), 4)
+        return report
+    finally:
+        if zf is not source:
+            zf.close()
+
+def load_workbook(path, limits=None, **kwargs):
+    """openpyxl.load_workbook after inspect_workbook has accepted the file."""
+    import openpyxl
+    inspect_workbook(path, limits)
+    return openpyxl.load_workbook(path, **kwargs)
+
+def print_report(path, report):
+    print(f"{path}: {report['parts']} parts, {report['declared_bytes'] / 1024:.0f} KB uncompressed, scanned in {report['seconds'] * 1000:.0f} ms")
+    for part, stats in report["sheets"].items():
+        print(f"  {part}: rows {stats['rows']}, merges {stats['merges']}, {stats['bytes'] / 1024:.0f} KB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check workbooks against the resource limits without loading them.")
+    parser.add_argument('workbooks', nargs='+')
+    parser.add_argument('--max-rows', type=int, default=None)
+    parser.add_argument('--max-merges', type=int, default=None)
+    parser.add_argument('--max-mb', type=float, default=None, help="Maximum decompressed size in MB.")
+    parser.add_argument('--seconds', type=float, default=None, help="Time budget for the scan of one workbook.")
+    args = parser.parse_args(argv)
+
+    overrides = {key: value for key, value in (
+        ("max_rows", args.max_rows), ("max_merges", args.max_merges), ("stage_seconds", args.seconds),
+        ("max_decompressed_bytes", int(args.max_mb * 1024 * 1024) if args.max_mb else None)) if value is not None}
+    rejected = 0
+    for path in args.workbooks:
+        try:
+            print_report(path, inspect_workbook(path, overrides))
+        except (ResourceLimitError, zipfile.BadZipFile, OSError) as e:
+            rejected += 1
+            print(f"{path}: REJECTED: {e}")
+    return 1 if rejected else 0
+
+if __name__ == "__main__":
+    sys.exit(main())